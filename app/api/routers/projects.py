@@ -1,7 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form,status
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Request, status
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from app.schemas.project import ProjectCreate, ProjectResponse,ProjectCheckRequest,ProjectCheckResponse, ProjectRequest
-from app.services.project_service import get_project, create_project, process_uploaded_file,get_all_projects
+from app.schemas.project import (
+    ProjectCreate, ProjectResponse,ProjectCheckRequest,ProjectCheckResponse, ProjectRequest, StreamUploadResponse,
+    ProjectCreateResponse, ProjectUploadResponse,
+)
+from app.services.project_service import (
+    get_project, create_project, get_all_projects, stream_uploaded_file, start_chunked_upload, extract_uploaded_zip,
+    upload_project_files, upload_report,
+)
 from app.db.session import get_db
 from typing import Union
 from datetime import date,datetime
@@ -12,6 +19,11 @@ import os
 import logging
 import time
 from app.services.converter import upload_sas_files
+from app.services.import_jobs import registry as import_jobs
+from app.schemas.import_job import ImportJobCreated, ImportJobStatus
+from app.schemas.upload import ChunkedUploadComplete, ChunkedUploadCreate, ChunkedUploadStatus, ChunkReceived
+from app.services import chunked_upload
+from app.utils.azure_blob import ChecksumMismatch
 # Set up logging
 log_file = "logs/upload.log"
 os.makedirs(os.path.dirname(log_file), exist_ok=True)
@@ -84,7 +96,7 @@ def list_projects(db: Session = Depends(get_db)):
         logger.error(f"[ERROR] Failed to list projects: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail="Error retrieving projects")
 
-@router.post("/create", response_model=ProjectCreate)
+@router.post("/create", response_model=ProjectCreateResponse)
 def create_project_with_upload(
     ProjectNumber: str = Form(...),
     ProjectName: str = Form(...),
@@ -128,10 +140,8 @@ def create_project_with_upload(
             deleted_at = datetime.fromisoformat(DeletedAt)
         # Process file upload and Azure Blob Storage upload
         # Rest of your implementation
-        if uploaded_files:
-            IsDatasetUploaded = process_uploaded_file(ProjectNumber, uploaded_files)
-        else:
-            IsDatasetUploaded = False
+        upload_results = upload_project_files(ProjectNumber, uploaded_files) if uploaded_files else []
+        IsDatasetUploaded = any(result.ok for result in upload_results)
         
         
         # Create project in database
@@ -159,11 +169,14 @@ def create_project_with_upload(
         db.commit()
         db.refresh(db_project)
         
-        return db_project
+        return {
+            **ProjectCreate.model_validate(db_project, from_attributes=True).model_dump(),
+            **upload_report(upload_results),
+        }
     except ValueError as e:
         raise HTTPException(status_code=422, detail=str(e))
     
-@router.put("/edit/{ProjectNumber}", response_model=ProjectResponse)
+@router.put("/edit/{ProjectNumber}", response_model=ProjectUploadResponse)
 def edit_project_by_number(
     ProjectNumber: str,
     ProjectName: str = Form(None),
@@ -223,17 +236,139 @@ def edit_project_by_number(
             project.DeletedBy = DeletedBy
 
         # Handle file upload and update IsDatasetUploaded
+        upload_results = []
         if uploaded_files:
-            project.IsDatasetUploaded = process_uploaded_file(ProjectNumber, uploaded_files)
+            upload_results = upload_project_files(ProjectNumber, uploaded_files)
+            project.IsDatasetUploaded = any(result.ok for result in upload_results)
 
         db.commit()
         db.refresh(project)
 
-        return ProjectResponse.from_orm(project)
+        return {**ProjectResponse.from_orm(project).model_dump(), **upload_report(upload_results)}
 
     except ValueError as e:
         raise HTTPException(status_code=422, detail=str(e))
     
+@router.put("/upload/{ProjectNumber}/{filename}", response_model=StreamUploadResponse)
+async def stream_upload(ProjectNumber: str, filename: str, request: Request, db: Session = Depends(get_db)):
+    """
+    Upload one file as the raw request body (e.g. curl -T adsl.sas7bdat).
+
+    Unlike the multipart form on /create and /edit, the body is staged to blob
+    storage block by block as it arrives and is never spooled to local disk.
+    A Content-MD5 header is checked against the body (400 and nothing committed
+    if it differs); a body the blob already holds is not committed again.
+    """
+    project = await run_in_threadpool(get_project, db, ProjectNumber)
+    if not project:
+        raise HTTPException(status_code=404, detail=f"Project with number {ProjectNumber} not found.")
+    try:
+        result = await stream_uploaded_file(
+            ProjectNumber, filename, request.stream(), request.headers.get("content-md5")
+        )
+    except ChecksumMismatch as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail=str(e))
+    except Exception as e:
+        logger.error(f"[ERROR] Streamed upload of {filename} failed: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=f"Upload to blob storage failed: {str(e)}")
+
+    project.IsDatasetUploaded = True
+    await run_in_threadpool(db.commit)
+    return result
+
+@router.post("/uploads", response_model=ChunkedUploadStatus, status_code=status.HTTP_201_CREATED)
+def start_upload(req: ChunkedUploadCreate, db: Session = Depends(get_db)):
+    """Start a resumable upload; then PUT each chunk, POST complete, and GET the status to resume"""
+    if not get_project(db, req.ProjectNumber):
+        raise HTTPException(status_code=404, detail=f"Project with number {req.ProjectNumber} not found.")
+    try:
+        session = start_chunked_upload(
+            req.ProjectNumber, req.filename, req.size_bytes, req.chunk_size_mb, req.content_md5
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return session.as_dict()
+
+def get_upload_session(upload_id: str):
+    session = chunked_upload.registry.get(upload_id)
+    if not session:
+        raise HTTPException(status_code=404, detail=f"Upload {upload_id} not found.")
+    return session
+
+@router.get("/uploads/{upload_id}", response_model=ChunkedUploadStatus)
+def get_upload(upload_id: str):
+    """Chunks received so far; a client resuming after a failure sends the missing_chunks"""
+    return get_upload_session(upload_id).as_dict()
+
+@router.put("/uploads/{upload_id}/chunks/{index}", response_model=ChunkReceived)
+async def put_upload_chunk(upload_id: str, index: int, request: Request):
+    """Chunk index as the raw request body, staged as one block; an optional Content-MD5 header is checked"""
+    session = await run_in_threadpool(get_upload_session, upload_id)
+    if session.state != "uploading":
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Upload {upload_id} is already {session.state}.")
+    try:
+        data = await chunked_upload.read_chunk(request.stream(), session.chunk_size)
+        content_md5 = await run_in_threadpool(
+            chunked_upload.stage_chunk, session, index, data, request.headers.get("content-md5")
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return {"upload_id": upload_id, "index": index, "size_bytes": len(data), "content_md5": content_md5}
+
+@router.post("/uploads/{upload_id}/complete", response_model=ChunkedUploadStatus)
+def complete_upload(upload_id: str, req: ChunkedUploadComplete = None, db: Session = Depends(get_db)):
+    """Commit the chunks into the blob; 409 while chunks are missing, 422 if they do not match content_md5"""
+    session = get_upload_session(upload_id)
+    content_md5 = req.content_md5 if req else None
+    if content_md5:
+        try:
+            chunked_upload.decode_md5(content_md5)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    try:
+        committed = chunked_upload.complete_upload(session, content_md5)
+    except ChecksumMismatch as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    if not committed:
+        return session.as_dict()
+    extracted = []
+    if session.filename.lower().endswith('.zip'):
+        extracted = extract_uploaded_zip(session.project_number, session.blob_path, session.size_bytes)
+    project = get_project(db, session.project_number)
+    if project:
+        project.IsDatasetUploaded = True
+        db.commit()
+    return {**session.as_dict(), "extracted": extracted}
+
 # @router.post("/upload-sas/")
 # def upload_sas(req: ProjectRequest):
-#     return upload_sas_files(req)
\ No newline at end of file
+#     return upload_sas_files(req)
+
+@router.post("/import-jobs", response_model=ImportJobCreated, status_code=status.HTTP_202_ACCEPTED)
+def start_import_job(req: ProjectRequest):
+    """Start importing a project's SAS files in the background; poll the returned status_url"""
+    try:
+        job = import_jobs.submit(req.project_name, req.force, lambda job: upload_sas_files(req, job))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    return {
+        "job_id": job.id,
+        "project_name": job.project_name,
+        "state": job.state,
+        "status_url": f"/api/projects/import-jobs/{job.id}",
+    }
+
+@router.get("/import-jobs", response_model=List[ImportJobStatus])
+def list_import_jobs():
+    return [job.as_dict() for job in import_jobs.list()]
+
+@router.get("/import-jobs/{job_id}", response_model=ImportJobStatus)
+def get_import_job(job_id: str):
+    job = import_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Import job {job_id} not found.")
+    return job.as_dict()
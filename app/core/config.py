@@ -1,4 +1,5 @@
 from pydantic_settings import BaseSettings
+from typing import Literal
 import os
 
 class Settings(BaseSettings):
@@ -17,6 +18,41 @@ class Settings(BaseSettings):
     CHUNK_SIZE: int
     AZURE_DOWNLOAD_TIMEOUT: int
     BASE_BLOB_PATH: str
+    SAS_STREAMING_DECODE: bool = True  # decode sas7bdat files in CHUNK_SIZE row blocks
+    IMPORT_EXECUTION_MODE: Literal["thread", "process"] = "thread"  # where process_file runs
+    PARALLEL_DECODE_THRESHOLD_MB: int = 1024  # files at least this big are split into row ranges
+    PARALLEL_DECODE_PARTITIONS: int = 4  # row ranges (and worker processes) per large file
+    BULK_LOADER: Literal["executemany", "postgres_copy", "sqlite"] = "executemany"  # see app/services/loaders.py
+    BULK_LOAD_DSN: str = ""  # postgres_copy target, defaults to DATABASE_URL
+    SQLITE_PATH: str = "sas_import.db"  # sqlite target for local runs
+    PIPELINE_MAX_INFLIGHT_MB: int = 4096  # downloaded-but-unprocessed bytes allowed at once
+    PIPELINE_QUEUE_DEPTH: int = 2  # downloaded files waiting for a processing worker
+    DOWNLOAD_RANGE_CONCURRENCY: int = 4  # parallel ranged reads per blob (1 = single stream)
+    DOWNLOAD_RANGE_SIZE_MB: int = 8  # size of each ranged read
+    SQL_TYPE_INFERENCE: Literal["data", "metadata"] = "metadata"  # "data" adds a full decode pass to find narrow column types
+    SAS_SIDECAR_CACHE: bool = False  # keep decoded datasets as Parquet (needs pyarrow)
+    SAS_SIDECAR_DIR: str = "sidecar_cache"  # one <blob>-<etag>.parquet per blob version
+    SAS_SIDECAR_COMPRESSION: str = "zstd"  # Parquet codec for sidecars
+    IMPORT_JOB_CONCURRENCY: int = 1  # project imports running at once; more are queued
+    IMPORT_JOB_HISTORY: int = 100  # finished import jobs kept for status polling
+    LOAD_CHECKPOINT_CHUNKS: int = 0  # commit + checkpoint every N chunks so failed loads resume (0 = one transaction)
+    LOAD_RETRY_ATTEMPTS: int = 3  # retries of a checkpointed range after a transient DB error
+    LOAD_RETRY_BACKOFF_SECONDS: float = 2.0  # first retry delay, doubled on each further retry
+    DB_POOL_WAIT_TIMEOUT_SECONDS: float = 60  # wait for a free pooled connection before failing
+    DB_POOL_IDLE_TIMEOUT_SECONDS: float = 300  # close pooled connections idle longer than this (0 = never)
+    DB_POOL_PRE_PING: bool = True  # check a pooled connection with SELECT 1 before handing it out
+    SAS_COMPACT_STRINGS: bool = True  # dictionary-encode repetitive string columns until insert
+    BLOB_UPLOAD_BLOCK_SIZE_MB: int = 4  # size of each staged block when uploading to blob storage
+    BLOB_UPLOAD_CONCURRENCY: int = 4  # blocks of one blob staged at once (1 = one after another)
+    BLOB_UPLOAD_ATTEMPTS: int = 3  # tries of a seekable upload; a retry skips blocks already staged
+    BLOB_UPLOAD_FILE_CONCURRENCY: int = 4  # files of one request uploaded at once
+    BLOB_UPLOAD_MAX_MB_PER_SECOND: float = 0  # total upload bandwidth cap for the process (0 = none)
+    BLOB_UPLOAD_DEDUPLICATE: bool = True  # skip uploads whose MD5 matches the blob already stored
+    CHUNKED_UPLOAD_CHUNK_MB: int = 8  # chunk size offered to chunked-upload clients
+    CHUNKED_UPLOAD_MAX_CHUNK_MB: int = 100  # largest chunk a client may ask for (each is one staged block)
+    CHUNKED_UPLOAD_SESSION_HOURS: int = 24  # forget chunked uploads this long after they start
+    CHUNKED_UPLOAD_HASH_BUFFER_MB: int = 32  # out-of-order chunks held per upload to compute its MD5
+    IMPORT_PROFILE_DIR: str = "import_profiles"  # <project>.json: columns and row filters per dataset
 
     
     class Config:
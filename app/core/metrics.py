@@ -0,0 +1,244 @@
+# app/core/metrics.py
+"""In-process metrics in the Prometheus text exposition format.
+
+Counters, gauges and histograms live in one registry and are rendered by the
+/metrics route. Import worker processes have their own copy of the registry;
+set_worker_queue makes them forward every sample to the API process instead.
+"""
+import math
+import multiprocessing
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds: 1 ms to 10 min
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+MB_PER_SECOND_BUCKETS = (0.5, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+ROWS_PER_SECOND_BUCKETS = (100, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000, 250000, 1000000)
+
+
+def _label_key(labelnames, labels: dict) -> tuple:
+    if set(labels) != set(labelnames):
+        raise ValueError(f"Expected labels {labelnames}, got {sorted(labels)}")
+    return tuple(str(labels[name]) for name in labelnames)
+
+
+def _format_labels(pairs) -> str:
+    if not pairs:
+        return ""
+    escaped = []
+    for name, value in pairs:
+        value = value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        escaped.append(f'{name}="{value}"')
+    return "{" + ",".join(escaped) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _record(self, op: str, value: float, labels: dict):
+        key = _label_key(self.labelnames, labels)
+        if _worker_queue is not None:
+            _worker_queue.put((self.name, op, key, value))
+        else:
+            self._apply(op, key, value)
+
+    def _apply(self, op: str, key: tuple, value: float):
+        raise NotImplementedError
+
+    def samples(self):
+        """[(suffix, [(label, value), ...], value)] for the exposition format"""
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, pairs, value in self.samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(pairs)} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        self._record("inc", amount, labels)
+
+    def _apply(self, op, key, value):
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        return [("_total", list(zip(self.labelnames, key)), value) for key, value in values]
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def inc(self, amount: float = 1, **labels):
+        self._record("inc", amount, labels)
+
+    def dec(self, amount: float = 1, **labels):
+        self._record("inc", -amount, labels)
+
+    def set(self, value: float, **labels):
+        self._record("set", value, labels)
+
+    def _apply(self, op, key, value):
+        with self._lock:
+            self._values[key] = value if op == "set" else self._values.get(key, 0) + value
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        return [("", list(zip(self.labelnames, key)), value) for key, value in values]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value: float, **labels):
+        self._record("observe", value, labels)
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _apply(self, op, key, value):
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0.0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self._values[key] = (counts, total + value)
+
+    def samples(self):
+        with self._lock:
+            values = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        samples = []
+        for key, (counts, total) in values:
+            pairs = list(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                samples.append(("_bucket", pairs + [("le", _format_value(bound))], cumulative))
+            samples.append(("_sum", pairs, total))
+            samples.append(("_count", pairs, cumulative))
+        return samples
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: Metric) -> Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def get(self, name: str) -> Metric:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+registry = Registry()
+
+HTTP_REQUEST_SECONDS = registry.register(Histogram(
+    "http_request_duration_seconds", "API request latency by route template",
+    ("method", "route", "status"),
+))
+BLOB_DOWNLOAD_MB_PER_SECOND = registry.register(Histogram(
+    "blob_download_mb_per_second", "Throughput of each SAS blob download",
+    ("mode",), MB_PER_SECOND_BUCKETS,
+))
+BLOB_UPLOAD_MB_PER_SECOND = registry.register(Histogram(
+    "blob_upload_mb_per_second", "Throughput of each file uploaded to blob storage",
+    buckets=MB_PER_SECOND_BUCKETS,
+))
+SAS_DECODE_SECONDS = registry.register(Histogram(
+    "sas_decode_chunk_seconds", "Time to decode and convert one CHUNK_SIZE block of a SAS file",
+))
+INSERT_ROWS_PER_SECOND = registry.register(Histogram(
+    "insert_chunk_rows_per_second", "Insert rate of each chunk by bulk loader",
+    ("loader",), ROWS_PER_SECOND_BUCKETS,
+))
+POOL_WAIT_SECONDS = registry.register(Histogram(
+    "db_pool_wait_seconds", "Time spent waiting for a pooled database connection",
+    ("database",),
+))
+POOL_CONNECTIONS = registry.register(Gauge(
+    "db_pool_connections", "Pooled database connections by state (in_use or idle)",
+    ("database", "state"),
+))
+FILES_IN_FLIGHT = registry.register(Gauge(
+    "import_files_in_flight", "Files between download start and processing end",
+))
+INFLIGHT_BYTES = registry.register(Gauge(
+    "import_inflight_bytes", "Bytes of the files between download start and processing end",
+))
+FILES_IMPORTED = registry.register(Counter(
+    "import_files", "Files finished by the import pipeline by outcome",
+    ("outcome",),
+))
+
+
+# Worker processes send (name, op, label values, value) samples here
+_sample_queue = None
+_sample_queue_lock = threading.Lock()
+_worker_queue = None
+
+
+def sample_queue():
+    """Queue for worker processes to forward samples to; the inherited one inside a worker"""
+    global _sample_queue
+    if _worker_queue is not None:
+        return _worker_queue
+    with _sample_queue_lock:
+        if _sample_queue is None:
+            _sample_queue = multiprocessing.get_context("spawn").Queue()
+            threading.Thread(target=_drain_samples, args=(_sample_queue,),
+                             name="metrics-samples", daemon=True).start()
+        return _sample_queue
+
+
+def set_worker_queue(queue):
+    global _worker_queue
+    _worker_queue = queue
+
+
+def _drain_samples(queue):
+    while True:
+        name, op, key, value = queue.get()
+        metric = registry.get(name)
+        if metric is not None:
+            metric._apply(op, key, value)
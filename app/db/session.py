@@ -2,10 +2,12 @@ from sqlalchemy.orm import sessionmaker
 from app.db.base import engine
 import pyodbc
 import logging
-from threading import Lock
+from threading import Condition
 from collections import defaultdict
 import time
+from contextlib import contextmanager
 from app.core.config import settings
+from app.core.metrics import POOL_CONNECTIONS, POOL_WAIT_SECONDS
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 def get_db():
@@ -22,29 +24,135 @@ def get_db():
 logger = logging.getLogger("sas_importer")
 
 class ConnectionPool:
-    _pool = defaultdict(list)
-    _lock = Lock()
-    _count = defaultdict(int)
-    _max_connections = 15
-    _wait_timeout = 60  # 60 seconds to wait for a connection
+    """Per-database pools of pyodbc connections, at most MAX_DB_CONNECTIONS each.
+
+    Callers wait on a condition until a connection is returned or a slot frees
+    up; new connections are opened outside the lock so a slow connect does not
+    block other threads. Idle connections older than DB_POOL_IDLE_TIMEOUT_SECONDS
+    are closed, and with DB_POOL_PRE_PING a reused connection is checked first.
+    Prefer lease(), which always gives the connection back.
+    """
+    _idle = defaultdict(list)  # key -> [(connection, returned_at)], most recent last
+    _count = defaultdict(int)  # open connections per key, including ones being opened
+    _stats = defaultdict(lambda: defaultdict(float))
+    _cond = Condition()
+
+    @classmethod
+    @contextmanager
+    def lease(cls, db_name=None):
+        conn = cls.get_connection(db_name)
+        try:
+            yield conn
+        finally:
+            cls.return_connection(conn, db_name)
 
     @classmethod
     def get_connection(cls, db_name=None):
-        start_time = time.time()
         key = db_name or "default"
-        while time.time() - start_time < cls._wait_timeout:
-            with cls._lock:
-                # Try to get an existing connection from the pool
-                if cls._pool[key]:
-                    return cls._pool[key].pop()
-                # Create new connection if under limit
-                if cls._count[key] < cls._max_connections:
+        start_time = time.monotonic()
+        while True:
+            conn = cls._checkout(key, start_time)
+            if conn is None:
+                try:
                     conn = cls._create_connection(db_name)
-                    cls._count[key] += 1
-                    return conn
-            # Wait before retrying
-            time.sleep(0.5)
-        raise RuntimeError(f"Timeout waiting for connection to {key} after {cls._wait_timeout} seconds")
+                except Exception:
+                    cls._forget(key)
+                    raise
+                cls._record(key, start_time, "creates")
+                return conn
+            if not settings.DB_POOL_PRE_PING or cls._ping(conn):
+                cls._record(key, start_time, "hits")
+                return conn
+            logger.warning(f"Discarding broken pooled connection to {key}")
+            cls._close(conn)
+            cls._forget(key, "ping_failures")
+
+    @classmethod
+    def _checkout(cls, key, start_time):
+        """An idle connection, or None once a slot is reserved for a new one"""
+        expired = []
+        try:
+            with cls._cond:
+                while True:
+                    expired += cls._expire_idle(key)
+                    if cls._idle[key]:
+                        conn, _ = cls._idle[key].pop()
+                        POOL_CONNECTIONS.dec(database=key, state="idle")
+                        POOL_CONNECTIONS.inc(database=key, state="in_use")
+                        return conn
+                    if cls._count[key] < settings.MAX_DB_CONNECTIONS:
+                        cls._count[key] += 1
+                        POOL_CONNECTIONS.inc(database=key, state="in_use")
+                        return None
+                    remaining = settings.DB_POOL_WAIT_TIMEOUT_SECONDS - (time.monotonic() - start_time)
+                    if remaining <= 0:
+                        cls._stats[key]["timeouts"] += 1
+                        POOL_WAIT_SECONDS.observe(time.monotonic() - start_time, database=key)
+                        raise RuntimeError(
+                            f"Timeout waiting for connection to {key} after {settings.DB_POOL_WAIT_TIMEOUT_SECONDS} seconds"
+                        )
+                    cls._cond.wait(remaining)
+        finally:
+            for conn in expired:
+                cls._close(conn)
+
+    @classmethod
+    def _expire_idle(cls, key):
+        """Take idle connections past DB_POOL_IDLE_TIMEOUT_SECONDS out of the pool (lock held)"""
+        timeout = settings.DB_POOL_IDLE_TIMEOUT_SECONDS
+        idle = cls._idle[key]
+        if not timeout or not idle:
+            return []
+        cutoff = time.monotonic() - timeout
+        # Oldest first, since connections go back on the end
+        expired = [conn for conn, returned_at in idle if returned_at < cutoff]
+        if expired:
+            cls._idle[key] = [(conn, returned_at) for conn, returned_at in idle if returned_at >= cutoff]
+            cls._count[key] -= len(expired)
+            cls._stats[key]["expired"] += len(expired)
+            POOL_CONNECTIONS.dec(len(expired), database=key, state="idle")
+            cls._cond.notify(len(expired))
+        return expired
+
+    @classmethod
+    def _record(cls, key, start_time, outcome):
+        waited = time.monotonic() - start_time
+        with cls._cond:
+            stats = cls._stats[key]
+            stats[outcome] += 1
+            stats["wait_seconds"] += waited
+            stats["max_wait_seconds"] = max(stats["max_wait_seconds"], waited)
+        POOL_WAIT_SECONDS.observe(waited, database=key)
+
+    @classmethod
+    def _forget(cls, key, reason=None):
+        """Free the slot of a connection that was closed or never opened; reason is a stat to count as well"""
+        with cls._cond:
+            cls._count[key] -= 1
+            cls._stats[key]["discards"] += 1
+            if reason:
+                cls._stats[key][reason] += 1
+            POOL_CONNECTIONS.dec(database=key, state="in_use")
+            cls._cond.notify()
+
+    @staticmethod
+    def _ping(conn) -> bool:
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchall()
+            cursor.close()
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _close(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
 
     @classmethod
     def _create_connection(cls, db_name):
@@ -62,24 +170,52 @@ class ConnectionPool:
     @classmethod
     def return_connection(cls, conn, db_name=None):
         key = db_name or "default"
-        with cls._lock:
-            # Reset connection state before returning
-            try:
-                if conn.autocommit != False:
-                    conn.autocommit = False
-                conn.rollback()
-            except:
-                pass
-            cls._pool[key].append(conn)
+        # Reset connection state before returning; one that cannot be reset is dropped
+        try:
+            if conn.autocommit != False:
+                conn.autocommit = False
+            conn.rollback()
+        except Exception:
+            cls._close(conn)
+            cls._forget(key)
+            return
+        with cls._cond:
+            cls._idle[key].append((conn, time.monotonic()))
+            POOL_CONNECTIONS.dec(database=key, state="in_use")
+            POOL_CONNECTIONS.inc(database=key, state="idle")
+            cls._cond.notify()
 
     @classmethod
     def close_all(cls):
-        with cls._lock:
-            for key, connections in cls._pool.items():
-                for conn in connections:
-                    try:
-                        conn.close()
-                    except:
-                        pass
-                cls._pool[key] = []
-                cls._count[key] = 0
\ No newline at end of file
+        """Close every idle connection; leased ones are left to their holders"""
+        with cls._cond:
+            idle = {key: connections for key, connections in cls._idle.items()}
+            cls._idle.clear()
+            for key, connections in idle.items():
+                cls._count[key] -= len(connections)
+                POOL_CONNECTIONS.dec(len(connections), database=key, state="idle")
+            cls._cond.notify_all()
+        for connections in idle.values():
+            for conn, _ in connections:
+                cls._close(conn)
+
+    @classmethod
+    def stats(cls) -> dict:
+        """Per database: open/idle/in-use connections, hits, creates, waits and discards"""
+        with cls._cond:
+            return {
+                key: {
+                    "open": cls._count[key],
+                    "idle": len(cls._idle[key]),
+                    "in_use": cls._count[key] - len(cls._idle[key]),
+                    "hits": int(stats["hits"]),
+                    "creates": int(stats["creates"]),
+                    "timeouts": int(stats["timeouts"]),
+                    "discards": int(stats["discards"]),
+                    "expired": int(stats["expired"]),
+                    "ping_failures": int(stats["ping_failures"]),
+                    "wait_seconds": round(stats["wait_seconds"], 3),
+                    "max_wait_seconds": round(stats["max_wait_seconds"], 3),
+                }
+                for key, stats in cls._stats.items()
+            }
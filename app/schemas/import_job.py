@@ -0,0 +1,39 @@
+from pydantic import BaseModel
+from typing import List, Optional
+
+
+class ImportJobCreated(BaseModel):
+    job_id: str
+    project_name: str
+    state: str
+    status_url: str
+
+
+class ImportFileStatus(BaseModel):
+    blob_name: str
+    table: str
+    state: str  # queued, downloading, decoding, inserting, done, failed or skipped
+    size_bytes: int
+    bytes_transferred: int
+    rows_total: int
+    rows_inserted: int
+    string_mb: float = 0.0  # string columns as decoded
+    compact_string_mb: float = 0.0  # the same columns dictionary-encoded
+    download_mb_per_second: float
+    rows_per_second: float
+    error: Optional[str] = None
+
+
+class ImportJobStatus(BaseModel):
+    job_id: str
+    project_name: str
+    state: str  # queued, running, done or failed
+    error: Optional[str] = None
+    created_at: float
+    duration_seconds: float
+    files_total: int
+    files_done: int
+    files_failed: int
+    rows_inserted: int
+    bytes_transferred: int
+    files: List[ImportFileStatus]
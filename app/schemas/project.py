@@ -94,4 +94,26 @@ class ProjectResponse(BaseModel):
         from_attributes = True
 
 class ProjectRequest(BaseModel):
-    project_name: str
\ No newline at end of file
+    project_name: str
+    force: bool = False  # reload every blob, even those unchanged since the last import
+
+class StreamUploadResponse(BaseModel):
+    blob_path: str
+    size_bytes: int
+    content_md5: str  # base64 MD5 of the payload, also stored as the blob's Content-MD5
+    deduplicated: bool = False  # the blob already held this content; nothing was committed
+    extracted: List[str] = []  # for a ZIP: the SAS datasets written to <ADAM|SDTM>/
+
+
+class UploadReport(BaseModel):
+    uploaded_files: List[str] = []  # blob paths written by this request (ZIP members included)
+    deduplicated_files: List[str] = []  # identical to what storage already held, not sent again
+    failed_files: List[str] = []
+
+
+class ProjectCreateResponse(ProjectCreate, UploadReport):
+    pass
+
+
+class ProjectUploadResponse(ProjectResponse, UploadReport):
+    pass
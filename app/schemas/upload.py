@@ -0,0 +1,37 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+
+
+class ChunkedUploadCreate(BaseModel):
+    ProjectNumber: str
+    filename: str
+    size_bytes: int = Field(..., gt=0)
+    chunk_size_mb: Optional[int] = None  # defaults to CHUNKED_UPLOAD_CHUNK_MB
+    content_md5: Optional[str] = None  # base64 MD5 of the whole file, checked against the chunks on complete
+
+
+class ChunkedUploadComplete(BaseModel):
+    content_md5: Optional[str] = None  # base64 MD5 of the whole file, checked against the chunks
+
+
+class ChunkReceived(BaseModel):
+    upload_id: str
+    index: int
+    size_bytes: int
+    content_md5: str  # base64 MD5 of the chunk
+
+
+class ChunkedUploadStatus(BaseModel):
+    upload_id: str
+    project_number: str
+    filename: str
+    blob_path: str
+    state: str  # uploading, completed or deduplicated (the blob already held this file)
+    size_bytes: int
+    chunk_size: int
+    chunk_count: int
+    chunks_received: int
+    bytes_received: int
+    missing_chunks: List[int]
+    content_md5: Optional[str] = None  # computed from the chunks, once committed with it
+    extracted: List[str] = []  # for a ZIP, on complete: the SAS datasets written to <ADAM|SDTM>/
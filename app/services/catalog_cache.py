@@ -0,0 +1,104 @@
+# app/services/catalog_cache.py
+"""Process-wide cache of the databases, schemas and tables a loader has seen.
+
+upload_sas_files fills it with one bulk catalog query per import (refresh);
+the loaders' ensure_*/drop_table methods consult it and only send DDL when
+something is missing, then record what they changed. A table is in one of
+three states: known to exist (with its column definitions), known to be
+missing (its schema was listed and it was not there) or unknown. Anything
+unknown gets the usual IF NOT EXISTS round trip. Failed loads invalidate their
+schema, so a rolled back CREATE/DROP cannot leave a wrong entry behind; DDL
+from outside the importer is picked up by the next import's refresh.
+"""
+import logging
+import threading
+
+logger = logging.getLogger("sas_importer")
+
+_lock = threading.Lock()
+_databases = set()  # target keys whose database exists
+# target key -> schema -> {"tables": {table: {column: type}}, "complete": bool}, None = schema missing
+_schemas = {}
+
+
+def refresh(loader, cursor, schema_names):
+    """Replace what is known about schema_names with one catalog query"""
+    catalog = loader.read_catalog(cursor, list(schema_names))
+    key = loader.catalog_key()
+    with _lock:
+        _databases.add(key)
+        schemas = _schemas.setdefault(key, {})
+        for schema_name in schema_names:
+            tables = catalog.get(schema_name)
+            schemas[schema_name] = None if tables is None else {"tables": dict(tables), "complete": True}
+    logger.info(f"Catalog refreshed for {', '.join(schema_names)}: {sum(len(t) for t in catalog.values())} tables")
+
+
+def has_database(key) -> bool:
+    with _lock:
+        return key in _databases
+
+
+def remember_database(key):
+    with _lock:
+        _databases.add(key)
+
+
+def has_schema(key, schema_name):
+    """True, False (known missing) or None (unknown)"""
+    with _lock:
+        schemas = _schemas.get(key, {})
+        if schema_name not in schemas:
+            return None
+        return schemas[schema_name] is not None
+
+
+def remember_schema(key, schema_name):
+    with _lock:
+        schemas = _schemas.setdefault(key, {})
+        if schemas.get(schema_name) is None:
+            # A schema created just now has no tables yet
+            schemas[schema_name] = {"tables": {}, "complete": schema_name in schemas}
+
+
+def table_columns(key, schema_name, table_name):
+    """{column: type} of an existing table, False when known missing, None when unknown"""
+    with _lock:
+        schemas = _schemas.get(key, {})
+        if schema_name not in schemas:
+            return None
+        schema = schemas[schema_name]
+        if schema is None:
+            return False
+        if table_name in schema["tables"]:
+            return schema["tables"][table_name]
+        return False if schema["complete"] else None
+
+
+def remember_table(key, schema_name, table_name, columns: dict):
+    with _lock:
+        schema = _schemas.setdefault(key, {}).get(schema_name)
+        if schema is None:
+            schema = _schemas[key][schema_name] = {"tables": {}, "complete": False}
+        schema["tables"][table_name] = dict(columns)
+
+
+def forget_table(key, schema_name, table_name):
+    """The table was dropped"""
+    with _lock:
+        schema = _schemas.get(key, {}).get(schema_name)
+        if schema is not None:
+            schema["tables"].pop(table_name, None)
+
+
+def invalidate(key=None, schema_name=None):
+    """Forget a schema, a whole target or (no arguments) everything"""
+    with _lock:
+        if key is None:
+            _databases.clear()
+            _schemas.clear()
+        elif schema_name is None:
+            _databases.discard(key)
+            _schemas.pop(key, None)
+        else:
+            _schemas.get(key, {}).pop(schema_name, None)
@@ -0,0 +1,356 @@
+# app/services/chunked_upload.py
+"""Resumable chunked uploads of large files to raw/<ProjectNumber>/.
+
+A client initiates an upload with the file's name and size and gets back an
+upload id and a chunk size. Chunk N holds bytes [N * chunk_size, (N + 1) *
+chunk_size) and is PUT on its own; each chunk is staged as one block of the
+blob, so chunks can arrive in any order and in parallel, and a failed chunk is
+simply sent again. complete commits the blocks in order with commit_block_list.
+
+The staged blocks live in blob storage, not in this process, so the status of
+an upload is read from the blob's uncommitted block list: after a dropped
+connection the client asks which chunks are missing and sends only those. The
+session itself is also written to a small JSON record, SESSION_PREFIX<id>.json,
+so another worker (or this one after a restart) rebuilds it from that record
+and the block list.
+
+The whole-file MD5 is computed here, from the chunks as they arrive: chunks
+ahead of the next one in order wait in memory (up to CHUNKED_UPLOAD_HASH_BUFFER_MB)
+until the gap is filled. A content_md5 sent by the client is only checked
+against it, never stored. When this process did not see every chunk in
+reach of that buffer, the blob is committed without a Content-MD5 and is not
+deduplicated. That running hash is the one part of a session that stays in the
+process: a file whose chunks are spread over several workers gets no MD5.
+"""
+import base64
+import binascii
+import hashlib
+import json
+import logging
+import math
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from azure.core.exceptions import ResourceNotFoundError
+from azure.storage.blob import BlobBlock, ContentSettings
+
+from app.core.config import settings
+from app.utils.azure_blob import (
+    ChecksumMismatch, get_container_client, staged_block_ids, stored_fingerprint, upload_bandwidth_limiter,
+)
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_STATES = ("uploading", "completed", "deduplicated")  # deduplicated: the blob already held this file
+SESSION_PREFIX = "_uploads/"  # session records, next to the blobs they describe
+# What a session record holds; the rest of a session is rebuilt from the blob
+RECORD_FIELDS = (
+    "project_number", "filename", "blob_path", "size_bytes", "chunk_size", "id", "state", "created", "finished",
+    "expected_md5", "content_md5",
+)
+
+
+@dataclass
+class UploadSession:
+    project_number: str
+    filename: str
+    blob_path: str
+    size_bytes: int
+    chunk_size: int
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    state: str = "uploading"
+    created: float = field(default_factory=time.time)
+    finished: float = None
+    expected_md5: str = None  # base64, as announced by the client on initiate; checked on complete
+    content_md5: str = None  # base64, computed from the chunks; set once committed with it
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+    # Running whole-file MD5 (None once it cannot be completed), the block IDs
+    # of the chunks it covers and the chunks received ahead of them
+    _md5: object = field(default_factory=hashlib.md5, repr=False)
+    _hashed_blocks: list = field(default_factory=list, repr=False)
+    _ahead: dict = field(default_factory=dict, repr=False)
+    _latest: dict = field(default_factory=dict, repr=False)  # chunk index -> block ID last staged here
+
+    @property
+    def chunk_count(self) -> int:
+        return math.ceil(self.size_bytes / self.chunk_size)
+
+    def chunk_length(self, index: int) -> int:
+        """Bytes chunk index must have (the last one holds the remainder)"""
+        return min(self.chunk_size, self.size_bytes - index * self.chunk_size)
+
+    def block_id(self, index: int, digest: bytes) -> str:
+        """
+        Upload id prefix, chunk index and (most of) the chunk's MD5: a chunk sent
+        again with other bytes is a different block, so the commit is bound to
+        the bytes that were hashed. 39 characters, as block_id_for, since
+        Azure needs every block ID of a blob to have the same length.
+        """
+        return f"{self.id[:8]}-{index:06d}-{digest.hex()[:23]}"
+
+    def blob_client(self):
+        return get_container_client().get_blob_client(self.blob_path)
+
+    def save(self):
+        """Write the session record; without it only this process knows the upload"""
+        record = {name: getattr(self, name) for name in RECORD_FIELDS}
+        try:
+            get_container_client().get_blob_client(f"{SESSION_PREFIX}{self.id}.json").upload_blob(
+                json.dumps(record).encode("utf-8"), overwrite=True, metadata={"created": str(int(self.created))},
+            )
+        except Exception as e:
+            logger.warning(f"Could not save chunked upload {self.id}; other workers will not find it: {e}")
+
+    def staged_blocks(self) -> dict:
+        """{chunk index: IDs of the blocks staged for it} in blob storage so far"""
+        prefix = f"{self.id[:8]}-"
+        blocks = {}
+        for block_id in staged_block_ids(self.blob_client()):
+            if block_id.startswith(prefix):
+                blocks.setdefault(int(block_id[len(prefix):len(prefix) + 6]), set()).add(block_id)
+        return blocks
+
+    def staged_chunks(self) -> list:
+        """Indexes of the chunks staged in blob storage so far"""
+        return sorted(self.staged_blocks())
+
+    def hash_chunk(self, index: int, block_id: str, data: bytes):
+        """Feed a staged chunk to the running MD5, or hold it until the chunks before it arrive"""
+        with self._lock:
+            self._latest[index] = block_id
+            if self._md5 is None:
+                return
+            hashed = len(self._hashed_blocks)
+            if index < hashed:
+                if self._hashed_blocks[index] != block_id:
+                    # Resent with other bytes after it was hashed
+                    self._give_up_hash(f"chunk {index} changed after it was hashed")
+                return
+            self._ahead[index] = (block_id, data)
+            while hashed in self._ahead:
+                block_id, data = self._ahead.pop(hashed)
+                self._md5.update(data)
+                self._hashed_blocks.append(block_id)
+                hashed += 1
+            limit_mb = settings.CHUNKED_UPLOAD_HASH_BUFFER_MB
+            if sum(len(data) for _, data in self._ahead.values()) > limit_mb * 1024 * 1024:
+                self._give_up_hash(f"more than {limit_mb} MB of chunks arrived ahead of the ones before them")
+
+    def _give_up_hash(self, reason: str):
+        logger.info(f"Chunked upload {self.id} will be committed without an MD5: {reason}")
+        self._md5 = None
+        self._ahead.clear()
+
+    def computed_md5(self):
+        """(base64 MD5, block IDs) of the whole file when every chunk was hashed, else None"""
+        if self._md5 is None or len(self._hashed_blocks) < self.chunk_count:
+            return None
+        return base64.b64encode(self._md5.digest()).decode("ascii"), list(self._hashed_blocks)
+
+    def as_dict(self) -> dict:
+        received = self.staged_chunks() if self.state == "uploading" else list(range(self.chunk_count))
+        missing = sorted(set(range(self.chunk_count)) - set(received))
+        return {
+            "upload_id": self.id,
+            "project_number": self.project_number,
+            "filename": self.filename,
+            "blob_path": self.blob_path,
+            "state": self.state,
+            "size_bytes": self.size_bytes,
+            "chunk_size": self.chunk_size,
+            "chunk_count": self.chunk_count,
+            "chunks_received": len(received),
+            "bytes_received": sum(self.chunk_length(index) for index in received),
+            "missing_chunks": missing,
+            "content_md5": self.content_md5,
+        }
+
+
+class UploadRegistry:
+    """Upload sessions, forgotten CHUNKED_UPLOAD_SESSION_HOURS after they start.
+
+    Sessions are kept in memory and saved as records in the container; get()
+    loads a session this process has not seen from its record, and picks up
+    an upload another worker completed. Azure drops
+    uncommitted blocks after seven days, so keep the session lifetime well
+    below that.
+    """
+
+    def __init__(self):
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self, project_number: str, filename: str, blob_path: str, size_bytes: int, chunk_size_mb: int = None,
+               content_md5: str = None) -> UploadSession:
+        """New upload; content_md5 (the client's MD5 of the file) is checked when it completes"""
+        chunk_size_mb = chunk_size_mb or settings.CHUNKED_UPLOAD_CHUNK_MB
+        if not 1 <= chunk_size_mb <= settings.CHUNKED_UPLOAD_MAX_CHUNK_MB:
+            raise ValueError(f"Chunk size must be between 1 and {settings.CHUNKED_UPLOAD_MAX_CHUNK_MB} MB")
+        if size_bytes <= 0:
+            raise ValueError("File size must be positive")
+        session = UploadSession(project_number, filename, blob_path, size_bytes, chunk_size_mb * 1024 * 1024)
+        # Block IDs carry 6 digits and Azure allows 50,000 blocks per blob
+        if session.chunk_count > 50000:
+            raise ValueError(f"{session.chunk_count} chunks is more than the 50,000 a blob can hold; use bigger chunks")
+        if content_md5:
+            decode_md5(content_md5)
+            session.expected_md5 = content_md5
+        with self._lock:
+            self._prune()
+            self._sessions[session.id] = session
+        self._prune_records()
+        session.save()
+        logger.info(f"📤 Started chunked upload {session.id}: {blob_path}, {size_bytes} bytes in {session.chunk_count} chunk(s)")
+        return session
+
+    def get(self, upload_id: str) -> UploadSession:
+        with self._lock:
+            session = self._sessions.get(upload_id)
+        if (session is not None and session.state != "uploading") or not re.fullmatch(r"[0-9a-f]{32}", upload_id):
+            return session
+        record = self._read_record(upload_id)
+        if session is not None:
+            if record and record["state"] != "uploading":
+                with session._lock:
+                    session.state, session.finished, session.content_md5 = (
+                        record["state"], record["finished"], record["content_md5"]
+                    )
+            return session
+        if record is None:
+            return None
+        logger.info(f"Resumed chunked upload {upload_id} from its session record")
+        with self._lock:
+            # Another request may have loaded it meanwhile; keep the first
+            return self._sessions.setdefault(upload_id, UploadSession(**record))
+
+    def _read_record(self, upload_id: str) -> dict:
+        """The saved fields of a session, None when it has none or is too old"""
+        try:
+            data = get_container_client().get_blob_client(f"{SESSION_PREFIX}{upload_id}.json").download_blob().readall()
+        except ResourceNotFoundError:
+            return None
+        record = json.loads(data)
+        if record["created"] < self._cutoff():
+            return None
+        return {name: record[name] for name in RECORD_FIELDS}
+
+    @staticmethod
+    def _cutoff() -> float:
+        return time.time() - settings.CHUNKED_UPLOAD_SESSION_HOURS * 3600
+
+    def _prune(self):
+        cutoff = self._cutoff()
+        for upload_id in [upload_id for upload_id, s in self._sessions.items() if s.created < cutoff]:
+            del self._sessions[upload_id]
+
+    def _prune_records(self):
+        cutoff = self._cutoff()
+        container_client = get_container_client()
+        try:
+            for blob in container_client.list_blobs(name_starts_with=SESSION_PREFIX, include=["metadata"]):
+                if float((blob.metadata or {}).get("created", cutoff)) < cutoff:
+                    container_client.get_blob_client(blob.name).delete_blob()
+        except Exception as e:
+            logger.warning(f"Could not prune chunked upload records: {e}")
+
+
+registry = UploadRegistry()
+
+
+def decode_md5(content_md5: str) -> bytes:
+    try:
+        digest = base64.b64decode(content_md5, validate=True)
+    except (binascii.Error, ValueError):
+        digest = b""
+    if len(digest) != 16:
+        raise ValueError(f"Content-MD5 must be a base64 MD5 digest, got {content_md5!r}")
+    return digest
+
+
+async def read_chunk(chunks, limit: int) -> bytes:
+    """Body of a chunk request; raises ValueError as soon as it exceeds limit bytes"""
+    data = bytearray()
+    async for part in chunks:
+        data += part
+        if len(data) > limit:
+            raise ValueError(f"Chunk is larger than the {limit} byte chunk size")
+    return bytes(data)
+
+
+def stage_chunk(session: UploadSession, index: int, data: bytes, content_md5: str = None) -> str:
+    """Stage chunk index as one block; returns its base64 MD5. Sending a chunk again replaces it
+    (with other bytes, the whole-file MD5 is then no longer known)."""
+    if not 0 <= index < session.chunk_count:
+        raise ValueError(f"Chunk {index} is out of range 0..{session.chunk_count - 1}")
+    expected = session.chunk_length(index)
+    if len(data) != expected:
+        raise ValueError(f"Chunk {index} must be {expected} bytes, got {len(data)}")
+    digest = hashlib.md5(data).digest()
+    if content_md5 is not None and decode_md5(content_md5) != digest:
+        raise ValueError(f"Chunk {index} does not match its Content-MD5")
+    limiter = upload_bandwidth_limiter()
+    if limiter is not None:
+        limiter.acquire(len(data))
+    block_id = session.block_id(index, digest)
+    session.blob_client().stage_block(block_id=block_id, data=data)
+    session.hash_chunk(index, block_id, data)
+    return base64.b64encode(digest).decode("ascii")
+
+
+def complete_upload(session: UploadSession, content_md5: str = None) -> bool:
+    """
+    Commit the chunks in order; False when nothing was committed (already done,
+    or the blob already holds this file). Raises ValueError listing the chunks
+    still missing, or naming a chunk received with two different contents, and
+    ChecksumMismatch when the chunks do not hash to content_md5 (or the MD5
+    given on initiate). Only an MD5 computed from the chunks is stored or
+    compared with the blob.
+    """
+    with session._lock:
+        if session.state != "uploading":
+            return False
+        staged = session.staged_blocks()
+        missing = [index for index in range(session.chunk_count) if index not in staged]
+        if missing:
+            shown = ", ".join(str(index) for index in missing[:20]) + (" ..." if len(missing) > 20 else "")
+            raise ValueError(f"{len(missing)} chunk(s) missing: {shown}")
+        computed = session.computed_md5()
+        if computed and all(block_id in staged[index] for index, block_id in enumerate(computed[1])):
+            computed_md5, block_ids = computed
+        else:
+            # A chunk sent again with other bytes: the last one this process staged wins
+            block_ids = [
+                session._latest[index] if session._latest.get(index) in staged[index] else min(staged[index])
+                for index in range(session.chunk_count)
+            ]
+            conflicts = [
+                index for index, block_id in enumerate(block_ids)
+                if len(staged[index]) > 1 and session._latest.get(index) != block_id
+            ]
+            if conflicts:
+                raise ValueError(f"Chunk {conflicts[0]} was received with different contents; start a new upload")
+            computed_md5 = None
+        session._ahead.clear()
+        expected_md5 = content_md5 or session.expected_md5
+        if expected_md5 and computed_md5 and expected_md5 != computed_md5:
+            raise ChecksumMismatch(f"The uploaded chunks have MD5 {computed_md5}, not {expected_md5}")
+        if computed_md5 and settings.BLOB_UPLOAD_DEDUPLICATE:
+            stored = stored_fingerprint(session.blob_client())
+            if stored == (computed_md5, session.size_bytes):
+                # Leave the blob (and its etag) alone, so the import skips it too
+                session.state, session.finished, session.content_md5 = "deduplicated", time.time(), computed_md5
+                session.save()
+                logger.info(f"♻️ Chunked upload {session.id} not committed: {session.blob_path} already holds this file")
+                return False
+        content_settings = ContentSettings(content_md5=bytearray(decode_md5(computed_md5))) if computed_md5 else None
+        session.blob_client().commit_block_list(
+            [BlobBlock(block_id=block_id) for block_id in block_ids], content_settings=content_settings,
+        )
+        session.state, session.finished, session.content_md5 = "completed", time.time(), computed_md5
+        session.save()
+    logger.info(f"✅ Completed chunked upload {session.id}: {session.blob_path} in {session.finished - session.created:.2f} seconds")
+    return True
@@ -0,0 +1,44 @@
+# app/services/compact_strings.py
+"""Dictionary-encoded string columns for decoded SAS blocks.
+
+Character columns such as USUBJID, PARAMCD or AVISIT repeat a handful of
+values across millions of rows, but are decoded as one string per cell.
+compact_strings turns those columns into pandas categoricals (the distinct
+values once, plus int8/int16 codes per row) right after decode. Everything
+between decode and insert works on the codes: type inference measures the
+categories, import profile filters compare the categories, sidecars store
+them as Parquet dictionaries. Only marshal_column expands them back to one
+Python string per cell, at the moment rows are handed to the DB driver.
+"""
+import pandas as pd
+
+# Columns with more distinct values than this share of their rows stay plain
+MAX_UNIQUE_RATIO = 0.5
+
+
+def is_compact(series: pd.Series) -> bool:
+    return isinstance(series.dtype, pd.CategoricalDtype)
+
+
+def compact_strings(df: pd.DataFrame, columns) -> tuple:
+    """(block, bytes before, bytes after) with the repetitive string columns of columns categorical"""
+    converted = {}
+    before = after = 0
+    for col in columns:
+        if col not in df.columns or is_compact(df[col]):
+            continue
+        series = df[col]
+        size = int(series.memory_usage(index=False, deep=True))
+        before += size
+        codes, uniques = pd.factorize(series)
+        if len(uniques) > len(series) * MAX_UNIQUE_RATIO:
+            after += size
+            continue
+        compact = pd.Series(pd.Categorical.from_codes(codes, uniques), index=df.index, name=col)
+        after += int(compact.memory_usage(index=False, deep=True))
+        converted[col] = compact
+    if converted:
+        df = df.copy(deep=False)
+        for col, series in converted.items():
+            df[col] = series
+    return df, before, after
@@ -4,14 +4,16 @@ import pandas as pd
 import pyodbc
 import pyreadstat
 import numpy as np
-import re
 from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+import multiprocessing
+import atexit
+import copy
 from threading import Lock
 from collections import defaultdict
 from io import BytesIO
 from azure.identity import DefaultAzureCredential
-from azure.storage.blob import BlobServiceClient
+from azure.core import MatchConditions
 import tempfile
 import logging
 import time
@@ -19,10 +21,28 @@ from fastapi import FastAPI
 from pydantic import BaseModel
 from typing import List, Tuple
 from app.core.config import settings
+from app.core import metrics
+from app.core.metrics import BLOB_DOWNLOAD_MB_PER_SECOND, INSERT_ROWS_PER_SECOND, SAS_DECODE_SECONDS
 # Import configuration
 
 # Import database utilities
 from app.db.session import ConnectionPool
+from app.services import catalog_cache
+from app.services.compact_strings import compact_strings
+from app.services.loaders import create_loader
+from app.services.import_manifest import (
+    blob_source, import_settings_digest, is_unchanged, read_manifest, record_import,
+)
+from app.services.import_pipeline import FileTask, ImportPipeline
+from app.services.import_profile import DatasetProfile, dataset_profile, load_profiles
+from app.services.import_jobs import progress_queue, report_progress, set_worker_queue
+from app.services.load_checkpoint import clear_checkpoints, read_checkpoints, save_checkpoint
+from app.services.temporal import convert_temporal, temporal_columns
+from app.services.type_inference import cache_layout, cached_layout, infer_sql_types, profile_chunks, profile_columns
+from app.services.sidecar_cache import (
+    has_sidecar, is_sidecar, iter_sidecar_chunks, read_sidecar_layout, sidecar_enabled, sidecar_path, write_sidecar,
+)
+from app.utils.azure_blob import get_blob_service_client
 
 #logger = logging.getLogger("sas_importer")
 # Ensure the logs directory exists
@@ -54,95 +74,460 @@ if not logger.handlers:
 
 class ProjectRequest(BaseModel):
     project_name: str
+    force: bool = False  # reload every blob, even those unchanged since the last import
+
+def read_sas_metadata(tmp_path):
+    """Read only the header of a SAS file (column names, types and formats)"""
+    _, meta = pyreadstat.read_sas7bdat(tmp_path, metadataonly=True)
+    return meta
+
+def column_kinds(meta):
+    """Classify each column as string, number, date, datetime or time"""
+    temporal = temporal_columns(meta)
+    kinds = {}
+    for col in meta.column_names:
+        if meta.readstat_variable_types.get(col) == 'string':
+            kinds[col] = 'string'
+        elif col in temporal:
+            # A date format on a datetime value still loads as a date
+            kinds[col] = 'date' if temporal[col] == 'dtdate' else temporal[col]
+        else:
+            kinds[col] = 'number'
+    return kinds
+
+KIND_DTYPES = {
+    'number': np.dtype('float64'),
+    'date': np.dtype('datetime64[s]'),
+    'datetime': np.dtype('datetime64[us]'),
+    'time': np.dtype('timedelta64[us]'),
+}
+
+def meta_dtypes(meta):
+    """Predict the pandas dtype iter_sas_chunks will produce for each column"""
+    return {col: KIND_DTYPES.get(kind, np.dtype(object)) for col, kind in column_kinds(meta).items()}
+
+def project_meta(meta, columns):
+    """Copy of the SAS header describing only some columns (an import profile's)"""
+    projected = copy.copy(meta)
+    projected.column_names = list(columns)
+    return projected
+
+def iter_sas_chunks(tmp_path, meta, row_offset=0, row_limit=0, usecols=None, progress_key=None):
+    """Yield converted DataFrame blocks of at most CHUNK_SIZE rows.
+
+    In streaming mode each block is decoded only when the previous one has been
+    consumed, so memory is bounded by CHUNK_SIZE instead of the file size.
+    row_offset/row_limit restrict the read to one row range (0 = to the end);
+    usecols restricts it to some columns. Dates, datetimes and times arrive as
+    raw SAS numbers and are converted by app/services/temporal.py. With
+    SAS_COMPACT_STRINGS repetitive string columns are dictionary-encoded; their
+    size before and after goes to the import job of progress_key.
+    """
+    temporal = temporal_columns(meta)
+    strings = [col for col, kind in column_kinds(meta).items() if kind == 'string'] \
+        if settings.SAS_COMPACT_STRINGS else []
+    string_bytes = [0, 0]
+
+    def compact(df):
+        df, before, after = compact_strings(df, strings)
+        string_bytes[0] += before
+        string_bytes[1] += after
+        report_progress(progress_key, add_string_bytes=before, add_compact_string_bytes=after)
+        return df
+
+    if settings.SAS_STREAMING_DECODE:
+        remaining = row_limit or None
+        blocks = pyreadstat.read_file_in_chunks(
+            pyreadstat.read_sas7bdat, tmp_path, chunksize=settings.CHUNK_SIZE,
+            offset=row_offset, limit=row_limit, usecols=usecols, disable_datetime_conversion=True
+        )
+        while True:
+            decode_start = time.perf_counter()
+            try:
+                chunk_df, _ = next(blocks)
+            except StopIteration:
+                break
+            # read_file_in_chunks can overshoot the limit on its last block
+            if remaining is not None:
+                if remaining <= 0:
+                    break
+                chunk_df = chunk_df.iloc[:remaining]
+                remaining -= len(chunk_df)
+            chunk_df = convert_temporal(chunk_df, temporal)
+            chunk_df = chunk_df.replace([np.inf, -np.inf], np.nan)
+            chunk_df = compact(chunk_df)
+            SAS_DECODE_SECONDS.observe(time.perf_counter() - decode_start)
+            yield chunk_df
+        log_string_bytes(tmp_path, progress_key, *string_bytes)
+        return
+    decode_start = time.perf_counter()
+    df, _ = pyreadstat.read_sas7bdat(
+        tmp_path, row_offset=row_offset, row_limit=row_limit, usecols=usecols, disable_datetime_conversion=True
+    )
+    df = convert_temporal(df, temporal)
+    df = df.replace([np.inf, -np.inf], np.nan)
+    df = compact(df)
+    # Spread the whole-file decode over its chunks so the histogram stays per block
+    blocks = max(1, (len(df) + settings.CHUNK_SIZE - 1) // settings.CHUNK_SIZE)
+    for _ in range(blocks):
+        SAS_DECODE_SECONDS.observe((time.perf_counter() - decode_start) / blocks)
+    for i in range(0, len(df), settings.CHUNK_SIZE):
+        yield df.iloc[i:i + settings.CHUNK_SIZE]
+    log_string_bytes(tmp_path, progress_key, *string_bytes)
+
+def log_string_bytes(tmp_path, progress_key, before, after):
+    if before:
+        name = os.path.basename(progress_key[1] if progress_key else tmp_path)
+        logger.info(f"🗜️ String columns of {name}: {before / 1024 / 1024:.2f} MB decoded, {after / 1024 / 1024:.2f} MB compact")
+
+def table_layout(meta, tmp_path=None, dataset_key=None):
+    """Column names and the SQL type of each column.
+
+    With tmp_path and SQL_TYPE_INFERENCE="data", string and numeric columns are
+    scanned once to pick the narrowest type that holds every value; otherwise
+    the types follow the SAS header alone. dataset_key (blob name, etag) caches
+    the result for later loads of the same blob version.
+    """
+    columns_in_file = list(meta.column_names)
+    profiles = profile_columns(column_kinds(meta), getattr(meta, 'variable_storage_width', None))
+    if tmp_path is None or settings.SQL_TYPE_INFERENCE != "data":
+        return columns_in_file, {col: profiles[col].metadata_type() for col in columns_in_file}
+    type_map = cached_layout(dataset_key)
+    if type_map is None:
+        scan_start = time.time()
+        scanned = [col for col in columns_in_file if profiles[col].kind in ('string', 'number')]
+        chunks = iter_sas_chunks(tmp_path, meta, usecols=scanned) if scanned else []
+        type_map = infer_sql_types(profiles, chunks)
+        cache_layout(dataset_key, type_map)
+        logger.info(f"Inferred column types for {os.path.basename(tmp_path)} in {time.time() - scan_start:.2f}s")
+    return columns_in_file, type_map
+
+def build_sidecar(tmp_path, meta, sidecar, profile=None, progress_key=None):
+    """Decode a SAS file once into its Parquet sidecar, inferring column types on the way.
+
+    With an import profile the sidecar holds only the profiled rows and columns.
+    """
+    profile = profile or DatasetProfile()
+    columns_in_file = profile.keep_columns(meta.column_names)
+    kinds = column_kinds(project_meta(meta, columns_in_file))
+    profiles = profile_columns(kinds, getattr(meta, 'variable_storage_width', None))
+    if settings.SQL_TYPE_INFERENCE == "data":
+        layout = lambda: {col: profiles[col].sql_type() for col in columns_in_file}
+    else:
+        layout = lambda: {col: profiles[col].metadata_type() for col in columns_in_file}
+    chunks = iter_sas_chunks(tmp_path, meta, usecols=profile.read_columns(meta.column_names), progress_key=progress_key)
+    chunks = iter_profiled_chunks(chunks, profile)
+    write_sidecar(sidecar, columns_in_file, kinds, profile_chunks(profiles, chunks), layout)
+    return read_sidecar_layout(sidecar)[:2]
+
+def iter_table_chunks(data_path, meta=None, row_offset=0, row_limit=0, profile=None, progress_key=None):
+    """DataFrame blocks from a sidecar or a SAS file, optionally for one row range.
+
+    With an import profile only the columns it needs are decoded; the blocks
+    still have every row (see DatasetProfile.apply and iter_profiled_chunks).
+    """
+    if is_sidecar(data_path):
+        return iter_sidecar_chunks(data_path, settings.CHUNK_SIZE, row_offset, row_limit)
+    meta = meta or read_sas_metadata(data_path)
+    usecols = profile.read_columns(meta.column_names) if profile else None
+    return iter_sas_chunks(data_path, meta, row_offset, row_limit, usecols, progress_key)
+
+def iter_profiled_chunks(chunks, profile=None):
+    """Blocks with the import profile's row filter and projection applied"""
+    for chunk_df in chunks:
+        yield profile.apply(chunk_df) if profile else chunk_df
+
+def count_profiled_rows(data_path, meta, profile, row_offset, row_limit):
+    """Rows of a range passing the profile's filter, decoding only the filtered columns"""
+    counting = DatasetProfile(tuple(dict.fromkeys(col for col, _, _ in profile.where)), profile.where)
+    chunks = iter_table_chunks(data_path, meta, row_offset, row_limit, counting)
+    return sum(len(chunk_df) for chunk_df in iter_profiled_chunks(chunks, counting))
+
+def insert_chunks(loader, cursor, chunks, label, chunk_count='?', progress_key=None):
+    """Insert DataFrame blocks one at a time through the loader; returns rows inserted"""
+    total_inserted = 0
+    for chunk_num, chunk_df in enumerate(chunks, start=1):
+        insert_start = time.perf_counter()
+        inserted = loader.load_chunk(cursor, chunk_df)
+        elapsed = time.perf_counter() - insert_start
+        if inserted and elapsed > 0:
+            INSERT_ROWS_PER_SECOND.observe(inserted / elapsed, loader=loader.name)
+        total_inserted += inserted
+        report_progress(progress_key, add_rows_inserted=inserted)
+        logger.info(f"Inserted chunk {chunk_num}/{chunk_count} ({inserted} rows) for {label}")
+    return total_inserted
+
+def plan_partitions(tmp_path, total_rows):
+    """Split a large file into (row_offset, row_limit) ranges, or [] to load it whole"""
+    partitions = settings.PARALLEL_DECODE_PARTITIONS
+    file_size = os.path.getsize(tmp_path)
+    if (partitions < 2 or not total_rows or total_rows <= settings.CHUNK_SIZE
+            or file_size < settings.PARALLEL_DECODE_THRESHOLD_MB * 1024 * 1024):
+        return []
+    # Keep partition boundaries on CHUNK_SIZE multiples so every insert is a full chunk
+    chunks = (total_rows + settings.CHUNK_SIZE - 1) // settings.CHUNK_SIZE
+    rows_per_partition = ((chunks + partitions - 1) // partitions) * settings.CHUNK_SIZE
+    return [
+        (offset, min(rows_per_partition, total_rows - offset))
+        for offset in range(0, total_rows, rows_per_partition)
+    ]
+
+def load_partition(schema_name, table_name, data_path, row_offset, row_limit, type_map, progress_key=None,
+                   profile=None):
+    """Decode and insert one row range of a SAS file (or its sidecar) over its own connection"""
+    label = f"{table_name}[{row_offset}:{row_offset + row_limit}]"
+    columns_in_file = list(type_map)
+    loader = create_loader()
+    conn = loader.connect()
+    try:
+        cursor = conn.cursor()
+        loader.begin(cursor, schema_name, table_name, columns_in_file, type_map)
+        chunk_count = (row_limit + settings.CHUNK_SIZE - 1) // settings.CHUNK_SIZE
+        chunks = iter_table_chunks(
+            data_path, row_offset=row_offset, row_limit=row_limit, profile=profile, progress_key=progress_key
+        )
+        inserted = insert_chunks(loader, cursor, iter_profiled_chunks(chunks, profile), label, chunk_count, progress_key)
+        conn.commit()
+        logger.info(f"{loader.name} loaded {label} at {loader.rows_per_second:.0f} rows/s")
+        return inserted
+    except Exception:
+        try:
+            conn.rollback()
+        except:
+            pass
+        raise
+    finally:
+        loader.release(conn)
+
+def load_range_checkpointed(schema_name, table_name, data_path, type_map, source, range_start, range_rows,
+                            committed=0, meta=None, progress_key=None, profile=None):
+    """Insert one row range, committing every LOAD_CHECKPOINT_CHUNKS chunks together with its checkpoint.
+
+    committed rows of the range were loaded by an earlier attempt and are skipped.
+    A transient error rolls back to the last checkpoint and the range continues
+    from there on a new connection, after an exponential backoff.
+    range_rows=0 means up to the end of the file. Checkpoints count rows read,
+    which are more than the rows inserted when the import profile filters rows;
+    returns the rows inserted.
+    """
+    label = f"{table_name}[{range_start}:{range_start + range_rows}]"
+    columns_in_file = list(type_map)
+    loader = create_loader()
+    if committed and profile and profile.where:
+        inserted = count_profiled_rows(data_path, meta, profile, range_start, committed)
+    else:
+        inserted = committed
+    report_progress(progress_key, add_rows_inserted=inserted)
+    if range_rows and committed >= range_rows:
+        logger.info(f"{label} already committed, skipping")
+        return inserted
+    attempt = 0
+    while True:
+        conn = None
+        try:
+            conn = loader.connect()
+            cursor = conn.cursor()
+            loader.begin(cursor, schema_name, table_name, columns_in_file, type_map)
+            chunks = iter_table_chunks(
+                data_path, meta, row_offset=range_start + committed,
+                row_limit=range_rows - committed if range_rows else 0, profile=profile, progress_key=progress_key,
+            )
+            pending = pending_inserted = 0
+            for chunk_num, chunk_df in enumerate(chunks, start=1):
+                pending += len(chunk_df)
+                pending_inserted += loader.load_chunk(cursor, profile.apply(chunk_df) if profile else chunk_df)
+                if chunk_num % settings.LOAD_CHECKPOINT_CHUNKS == 0:
+                    save_checkpoint(loader, cursor, schema_name, table_name, source, range_start, range_rows, committed + pending)
+                    conn.commit()
+                    committed, attempt = committed + pending, 0
+                    inserted += pending_inserted
+                    report_progress(progress_key, add_rows_inserted=pending_inserted)
+                    pending = pending_inserted = 0
+                    logger.info(f"Checkpoint {label}: {committed} rows committed")
+            save_checkpoint(loader, cursor, schema_name, table_name, source, range_start, range_rows, committed + pending)
+            conn.commit()
+            committed += pending
+            inserted += pending_inserted
+            report_progress(progress_key, add_rows_inserted=pending_inserted)
+            logger.info(f"{loader.name} loaded {label} at {loader.rows_per_second:.0f} rows/s")
+            return inserted
+        except Exception as e:
+            if conn:
+                try:
+                    conn.rollback()
+                except:
+                    pass
+            if not loader.is_transient(e) or attempt >= settings.LOAD_RETRY_ATTEMPTS:
+                raise
+            attempt += 1
+            delay = settings.LOAD_RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1)
+            logger.warning(
+                f"⚠️ Transient error loading {label} after {committed} committed rows, "
+                f"retry {attempt}/{settings.LOAD_RETRY_ATTEMPTS} in {delay:.1f}s: {str(e)}"
+            )
+            time.sleep(delay)
+        finally:
+            if conn:
+                loader.release(conn)
+
+def load_partitions(schema_name, table_name, data_path, partitions, type_map, progress_key=None,
+                    source=None, checkpoints=None, profile=None):
+    """Decode and insert row ranges concurrently, one worker process per range.
+
+    Each range commits on its own connection, so a failed range leaves the
+    ranges that already finished in the table. With checkpoints (see
+    load_range_checkpointed) each range continues from its own checkpoint.
+    """
+    total_inserted, errors = 0, []
+    with ProcessPoolExecutor(
+        max_workers=len(partitions),
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_import_worker,
+        initargs=(progress_queue(), metrics.sample_queue()),
+    ) as executor:
+        if checkpoints is None:
+            futures = {
+                executor.submit(
+                    load_partition, schema_name, table_name, data_path, offset, limit, type_map, progress_key, profile
+                ): (offset, limit)
+                for offset, limit in partitions
+            }
+        else:
+            futures = {
+                executor.submit(
+                    load_range_checkpointed, schema_name, table_name, data_path, type_map, source,
+                    offset, limit, checkpoints.get(offset, (limit, 0))[1], None, progress_key, profile
+                ): (offset, limit)
+                for offset, limit in partitions
+            }
+        for future in as_completed(futures):
+            offset, limit = futures[future]
+            try:
+                total_inserted += future.result()
+            except Exception as e:
+                logger.error(f"🚫 Partition {table_name}[{offset}:{offset + limit}] failed: {str(e)}")
+                errors.append(e)
+    if errors:
+        raise RuntimeError(f"{len(errors)} of {len(partitions)} partitions failed for {table_name}") from errors[0]
+    return total_inserted
+
+def process_file(schema_name, table_name, tmp_path, source=None, replace=False, job_id=None, profile=None):
+    """Process SAS file with optimized database operations and connection management
 
-def process_file(schema_name, table_name, tmp_path):
-    """Process SAS file with optimized database operations and connection management"""
+    source is the blob's manifest identity (import_manifest.blob_source); when given,
+    the manifest entry is written in the same transaction as the rows. replace drops
+    an existing table first, so a reload does not append duplicate rows.
+
+    With SAS_SIDECAR_CACHE the decoded dataset is kept as Parquet keyed by the blob
+    etag and the import settings digest; when that sidecar already exists tmp_path
+    may be None (nothing downloaded).
+    job_id reports decode/insert progress to that import job (app/services/import_jobs.py).
+    profile (import_profile.DatasetProfile) restricts the columns decoded and
+    loaded and the rows inserted.
+    """
     start_time = time.time()
     logger.info(f"Starting processing: {schema_name}.{table_name}")
+    progress_key = (job_id, source["blob_name"]) if job_id and source else None
     try:
-        # Read SAS file
-        read_start = time.time()
-        df, meta = pyreadstat.read_sas7bdat(tmp_path)
-        logger.info(f"Read SAS file {table_name} in {time.time() - read_start:.2f}s, rows={len(df)}, cols={len(df.columns)}")
-        # Data conversion
-        conv_start = time.time()
-        df, date_cols = convert_sas_date(df, meta)
-        df = df.replace([np.inf, -np.inf], np.nan)
-        logger.info(f"Data conversion completed in {time.time() - conv_start:.2f}s")
-        # Prepare column definitions
-        formats = getattr(meta, 'column_formats', [None] * len(df.columns))
-        col_defs, type_map = [], {}
-        for col in df.columns:
-            col_idx = df.columns.get_loc(col)
-            sql_type = get_sql_type(col, df[col].dtype, formats[col_idx])
-            type_map[col] = sql_type
-            col_defs.append(f'[{col}] {sql_type} NULL')
+        report_progress(progress_key, state="decoding")
+        variant = import_settings_digest(profile)
+        sidecar = sidecar_path(source, variant) if source and source.get("etag") and sidecar_enabled() else None
+        if sidecar and os.path.exists(sidecar):
+            # Decoded (and profiled) by an earlier import of this blob version
+            columns_in_file, type_map, total_rows = read_sidecar_layout(sidecar)
+            data_path, meta, profile = sidecar, None, None
+            logger.info(f"Using sidecar for {table_name}, rows={total_rows}, cols={len(columns_in_file)}")
+        else:
+            # Column types come from the file header only; data is read block by block
+            read_start = time.time()
+            meta = read_sas_metadata(tmp_path)
+            total_rows = meta.number_rows
+            logger.info(f"Read SAS metadata {table_name} in {time.time() - read_start:.2f}s, rows={total_rows}, cols={len(meta.column_names)}")
+            if profile:
+                profile = profile.resolve(meta.column_names)
+                logger.info(
+                    f"Import profile for {table_name}: {len(profile.keep_columns(meta.column_names))} of "
+                    f"{len(meta.column_names)} columns, {len(profile.where)} row filter(s)"
+                )
+            # Prepare column definitions
+            if sidecar:
+                columns_in_file, type_map = build_sidecar(tmp_path, meta, sidecar, profile, progress_key)
+                total_rows = read_sidecar_layout(sidecar)[2]
+                data_path, profile = sidecar, None
+            else:
+                dataset_key = (source["blob_name"], source["etag"], variant) if source else None
+                layout_meta = project_meta(meta, profile.keep_columns(meta.column_names)) if profile else meta
+                columns_in_file, type_map = table_layout(layout_meta, tmp_path, dataset_key)
+                data_path = tmp_path
+        partitions = plan_partitions(data_path, total_rows)
+        report_progress(progress_key, state="inserting", rows_total=total_rows)
         # Database operations with connection management
+        loader = create_loader()
         conn = None
         try:
             # Get connection with timeout handling
-            conn = ConnectionPool.get_connection(settings.MAIN_DB_NAME)
+            conn = loader.connect()
             cursor = conn.cursor()
-            # Create table if not exists
+            # A checkpointed load that failed part way continues where it stopped
+            checkpointed = bool(source) and settings.LOAD_CHECKPOINT_CHUNKS > 0
+            ranges = partitions or [(0, total_rows or 0)]
+            checkpoints = read_checkpoints(loader, cursor, schema_name, source) if checkpointed else {}
+            resume = bool(checkpoints) and all((start, rows) in ranges for start, (rows, _) in checkpoints.items())
+            if resume:
+                logger.info(f"Resuming {table_name} after {sum(c for _, c in checkpoints.values())} committed rows")
+            else:
+                if checkpoints:
+                    logger.warning(f"Checkpoints for {table_name} do not match the current row ranges, reloading")
+                    checkpoints = {}
+                if checkpointed:
+                    clear_checkpoints(loader, cursor, schema_name, source)
+                # Create table if not exists
+                if replace:
+                    loader.drop_table(cursor, schema_name, table_name)
             create_start = time.time()
-            cursor.execute(f"""
-                IF NOT EXISTS (
-                    SELECT 1 FROM sys.tables t
-                    JOIN sys.schemas s ON t.schema_id = s.schema_id
-                    WHERE s.name = ? AND t.name = ?
-                )
-                BEGIN
-                    CREATE TABLE [{schema_name}].[{table_name}] ({', '.join(col_defs)})
-                END
-            """, schema_name, table_name)
+            loader.ensure_table(cursor, schema_name, table_name, columns_in_file, type_map)
             logger.info(f"Table creation check for {table_name} took {time.time() - create_start:.2f}s")
-            # Prepare insert query
-            columns = [f'[{col}]' for col in df.columns]
-            insert_sql = f"""
-                INSERT INTO [{schema_name}].[{table_name}]
-                ({', '.join(columns)})
-                VALUES ({', '.join(['?'] * len(columns))})
-            """
-            # Configure input types
-            type_info = [
-                pyodbc.SQL_TYPE_TIMESTAMP if type_map[col].startswith('DATETIME') else
-                pyodbc.SQL_DECIMAL if 'DECIMAL' in type_map[col] else
-                pyodbc.SQL_REAL if 'FLOAT' in type_map[col] else None
-                for col in df.columns
-            ]
-            cursor.setinputsizes(type_info)
-            cursor.fast_executemany = True
-            # Process chunks with optimized insertion
-            total_rows = len(df)
-            chunk_count = (total_rows + settings.CHUNK_SIZE - 1) // settings.CHUNK_SIZE
-            logger.info(f"Inserting {total_rows} rows in {chunk_count} chunks")
             insert_start = time.time()
-            total_inserted = 0
-            for i in range(0, total_rows, settings.CHUNK_SIZE):
-                chunk_end = min(i + settings.CHUNK_SIZE, total_rows)
-                chunk_df = df.iloc[i:chunk_end]
-                # Prepare data using vectorized operations
-                data_chunk = []
-                for row in chunk_df.itertuples(index=False):
-                    row_data = []
-                    for val, col in zip(row, df.columns):
-                        if pd.isna(val):
-                            row_data.append(None)
-                        elif type_map[col].startswith('DATETIME') and isinstance(val, pd.Timestamp):
-                            row_data.append(val.to_pydatetime())
-                        else:
-                            row_data.append(val)
-                    data_chunk.append(tuple(row_data))
-                # Execute chunk insert
-                cursor.executemany(insert_sql, data_chunk)
-                inserted = len(data_chunk)
-                total_inserted += inserted
-                chunk_num = (i // settings.CHUNK_SIZE) + 1
-                logger.info(f"Inserted chunk {chunk_num}/{chunk_count} ({inserted} rows) for {table_name}")
+            if checkpointed:
+                # The table must be visible to the range connections
+                conn.commit()
+                logger.info(f"Inserting {total_rows} rows in {len(ranges)} checkpointed range(s)")
+                if partitions:
+                    total_inserted = load_partitions(
+                        schema_name, table_name, data_path, partitions, type_map, progress_key, source, checkpoints,
+                        profile
+                    )
+                else:
+                    total_inserted = load_range_checkpointed(
+                        schema_name, table_name, data_path, type_map, source, 0, total_rows or 0,
+                        checkpoints.get(0, (0, 0))[1], meta, progress_key, profile
+                    )
+            elif partitions:
+                # Large file: make the table visible, then load row ranges in parallel
+                conn.commit()
+                logger.info(f"Inserting {total_rows} rows in {len(partitions)} parallel partitions")
+                total_inserted = load_partitions(
+                    schema_name, table_name, data_path, partitions, type_map, progress_key, profile=profile
+                )
+            else:
+                loader.begin(cursor, schema_name, table_name, columns_in_file, type_map)
+                # Decode, convert and insert one block at a time
+                chunk_count = (total_rows + settings.CHUNK_SIZE - 1) // settings.CHUNK_SIZE if total_rows else '?'
+                logger.info(f"Inserting {total_rows} rows in {chunk_count} chunks")
+                chunks = iter_table_chunks(data_path, meta, profile=profile, progress_key=progress_key)
+                chunks = iter_profiled_chunks(chunks, profile)
+                total_inserted = insert_chunks(loader, cursor, chunks, table_name, chunk_count, progress_key)
+                logger.info(f"{loader.name} loaded {table_name} at {loader.rows_per_second:.0f} rows/s")
+            if source:
+                record_import(loader, conn.cursor(), schema_name, table_name, source, total_inserted)
+                if checkpointed:
+                    clear_checkpoints(loader, conn.cursor(), schema_name, source)
             conn.commit()
             logger.info(f"Inserted {total_inserted} rows in {time.time() - insert_start:.2f}s")
         except Exception as e:
             logger.error(f"Database error in {table_name}: {str(e)}", exc_info=True)
+            # DDL of the failed transaction may have been rolled back
+            catalog_cache.invalidate(loader.catalog_key(), schema_name)
             if conn:
                 try:
                     conn.rollback()
@@ -151,7 +536,7 @@ def process_file(schema_name, table_name, tmp_path):
             raise
         finally:
             if conn:
-                ConnectionPool.return_connection(conn, settings.MAIN_DB_NAME)
+                loader.release(conn)
         total_time = time.time() - start_time
         logger.info(f"✅ Completed {schema_name}.{table_name} in {total_time:.2f}s")
         return f"{schema_name}.{table_name}"
@@ -160,120 +545,214 @@ def process_file(schema_name, table_name, tmp_path):
         return None
     finally:
         try:
-            os.remove(tmp_path)
+            if tmp_path:
+                os.remove(tmp_path)
         except:
             logger.warning(f"Could not delete temporary file: {tmp_path}")
 
-def download_blob(blob_client):
-    """Optimized blob download with Azure SDK compatibility"""
+def _download_ranges(blob_client, blob_size, fd, etag=None, on_progress=None):
+    """Fetch byte ranges concurrently and write each at its offset with os.pwrite"""
+    range_size = settings.DOWNLOAD_RANGE_SIZE_MB * 1024 * 1024
+    ranges = [(offset, min(range_size, blob_size - offset)) for offset in range(0, blob_size, range_size)]
+    # Every range must come from the same blob version as the listing
+    conditions = {"etag": etag, "match_condition": MatchConditions.IfNotModified} if etag else {}
+
+    def fetch(offset, length):
+        data = blob_client.download_blob(
+            offset=offset, length=length, timeout=settings.AZURE_DOWNLOAD_TIMEOUT, **conditions
+        ).readall()
+        view = memoryview(data)
+        written = 0
+        while written < len(view):
+            written += os.pwrite(fd, view[written:], offset + written)
+        if on_progress:
+            on_progress(written)
+        return written
+
+    downloaded = 0
+    with ThreadPoolExecutor(max_workers=settings.DOWNLOAD_RANGE_CONCURRENCY) as executor:
+        futures = [executor.submit(fetch, offset, length) for offset, length in ranges]
+        try:
+            for future in as_completed(futures):
+                downloaded += future.result()
+        except BaseException:
+            # One failed range fails the download; do not fetch the ranges still queued
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+    if downloaded != blob_size:
+        raise IOError(f"Downloaded {downloaded} of {blob_size} bytes for {blob_client.blob_name}")
+    return downloaded
+
+def download_blob(blob_client, blob_size=None, etag=None, on_progress=None):
+    """Optimized blob download with Azure SDK compatibility
+
+    blob_size (and etag) should come from the container listing, which saves the
+    get_blob_properties round trip. Blobs larger than one range are fetched as
+    DOWNLOAD_RANGE_CONCURRENCY parallel ranged reads into a preallocated file.
+    on_progress is called with the byte count of every chunk or range written.
+    """
     try:
         start_time = time.time()
         blob_name = blob_client.blob_name
-        # Get blob properties first
-        blob_props = blob_client.get_blob_properties()
-        blob_size = blob_props.size
-        # Download with timeout handling
-        download_stream = blob_client.download_blob(timeout=settings.AZURE_DOWNLOAD_TIMEOUT)
+        if blob_size is None:
+            blob_props = blob_client.get_blob_properties()
+            blob_size = blob_props.size
+            etag = blob_props.etag
+        parallel = (
+            settings.DOWNLOAD_RANGE_CONCURRENCY > 1
+            and blob_size > settings.DOWNLOAD_RANGE_SIZE_MB * 1024 * 1024
+            and hasattr(os, "pwrite")
+        )
         # Create temporary file
         with tempfile.NamedTemporaryFile(suffix=".sas7bdat", delete=False) as tmp_file:
-            # Download in 4MB chunks for better memory management
-            chunk_size = 4 * 1024 * 1024
-            downloaded = 0
-            chunks = download_stream.chunks()
-            while True:
-                try:
-                    chunk = next(chunks)
-                    tmp_file.write(chunk)
-                    downloaded += len(chunk)
-                    # Log progress every 20%
-                    if blob_size > 0:
-                        progress = (downloaded / blob_size) * 100
-                        if progress >= 20 and int(progress) % 20 == 0:
-                            logger.info(f"Downloading {blob_name}: {progress:.0f}% complete")
-                except StopIteration:
-                    break
             tmp_path = tmp_file.name
+            if parallel:
+                # Preallocate so ranges can land in any order
+                os.ftruncate(tmp_file.fileno(), blob_size)
+                _download_ranges(blob_client, blob_size, tmp_file.fileno(), etag, on_progress)
+            else:
+                # Download with timeout handling
+                download_stream = blob_client.download_blob(timeout=settings.AZURE_DOWNLOAD_TIMEOUT)
+                downloaded = 0
+                chunks = download_stream.chunks()
+                while True:
+                    try:
+                        chunk = next(chunks)
+                        tmp_file.write(chunk)
+                        downloaded += len(chunk)
+                        if on_progress:
+                            on_progress(len(chunk))
+                        # Log progress every 20%
+                        if blob_size > 0:
+                            progress = (downloaded / blob_size) * 100
+                            if progress >= 20 and int(progress) % 20 == 0:
+                                logger.info(f"Downloading {blob_name}: {progress:.0f}% complete")
+                    except StopIteration:
+                        break
         duration = time.time() - start_time
         speed = blob_size / (1024 * 1024 * duration) if duration > 0 else 0
-        logger.info(f"✅ Downloaded {blob_name} ({blob_size/1024/1024:.2f} MB) in {duration:.2f}s ({speed:.2f} MB/s)")
+        mode = f"{settings.DOWNLOAD_RANGE_CONCURRENCY} ranged readers" if parallel else "single stream"
+        if duration > 0:
+            BLOB_DOWNLOAD_MB_PER_SECOND.observe(speed, mode="ranged" if parallel else "stream")
+        logger.info(f"✅ Downloaded {blob_name} ({blob_size/1024/1024:.2f} MB) in {duration:.2f}s ({speed:.2f} MB/s, {mode})")
         return tmp_path
     except Exception as e:
         logger.error(f"🚫 Download failed for {blob_name}: {str(e)}", exc_info=True)
+        if 'tmp_path' in locals():
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
         raise
 
-def convert_sas_date(df, meta):
-    date_cols = []
-    for idx, fmt in enumerate(getattr(meta, 'column_formats', [])):
-        if fmt and any(f in fmt.upper() for f in ['DATE', 'DATETIME', 'YYMMDD', 'HHMM']):
-            col = df.columns[idx]
-            df[col] = pd.to_datetime(df[col].where(pd.notnull(df[col]), None), unit='s', origin='1960-01-01', errors='coerce')
-            date_cols.append(col)
-    return df, date_cols
-
-def get_sql_type(col_name, pandas_dtype, sas_format=None):
-    if sas_format:
-        sas_format = sas_format.upper()
-        if any(fmt in sas_format for fmt in ['DATETIME', 'DATE', 'TIME', 'YYMMDD', 'HHMM']):
-            return 'DATETIME2'
-        if any(fmt in sas_format for fmt in ['BEST', 'COMMA', 'DOLLAR', 'PERCENT', 'NUMERIC']):
-            if '.' in sas_format:
-                parts = sas_format.split('.')
-                if len(parts) == 2 and parts[1].isdigit():
-                    return f'DECIMAL({sum(map(len, parts))},{len(parts[1])})'
-            return 'FLOAT'
-        return 'NVARCHAR(255)'
-    dtype_map = {
-        'int': 'BIGINT',
-        'float': 'FLOAT',
-        'bool': 'BIT',
-        'object': 'NVARCHAR(255)',
-        'datetime64[ns]': 'DATETIME2'
-    }
-    return dtype_map.get(str(pandas_dtype), 'NVARCHAR(255)')
-
-def create_schema(schema_name: str):
+def _init_import_worker(progress=None, metric_samples=None):
+    """Runs once in each import worker process; connections are per process"""
+    atexit.register(ConnectionPool.close_all)
+    # Job progress and metric samples from this process go back to the API process
+    set_worker_queue(progress)
+    metrics.set_worker_queue(metric_samples)
+
+def create_processing_executor():
+    """Executor for the decode/convert/insert stage.
+
+    "thread" shares one process (and its GIL) between all PROCESSING_WORKERS.
+    "process" runs process_file in spawned worker processes that decode in
+    parallel and insert over their own pooled connections.
+    """
+    if settings.IMPORT_EXECUTION_MODE == "process":
+        return ProcessPoolExecutor(
+            max_workers=settings.PROCESSING_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_import_worker,
+            initargs=(progress_queue(), metrics.sample_queue()),
+        )
+    return ThreadPoolExecutor(max_workers=settings.PROCESSING_WORKERS)
+
+_processing_executor = None
+_processing_executor_lock = Lock()
+
+def shared_processing_executor():
+    """The processing executor every import in this process shares
+
+    A process pool breaks for good when one of its workers dies (e.g. killed
+    for running out of memory); it is then replaced by a new one.
+    """
+    global _processing_executor
+    with _processing_executor_lock:
+        if _processing_executor is not None and getattr(_processing_executor, "_broken", False):
+            logger.warning("Processing worker pool is broken (a worker died); starting a new one")
+            _processing_executor.shutdown(wait=False)
+            _processing_executor = None
+        if _processing_executor is None:
+            _processing_executor = create_processing_executor()
+        return _processing_executor
+
+def create_schema(loader, cursor, schema_name: str):
     try:
-        logger.info(f"Creating schema: {schema_name}")
-        with ConnectionPool.get_connection(settings.MAIN_DB_NAME) as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT 1 FROM sys.schemas WHERE name = ?", schema_name)
-            if not cursor.fetchone():
-                cursor.execute(f"CREATE SCHEMA [{schema_name}]")
-            conn.commit()
+        loader.ensure_schema(cursor, schema_name)
         logger.info(f"Schema {schema_name} created/verified")
     except Exception as e:
         logger.error(f"Schema creation failed for {schema_name}: {str(e)}", exc_info=True)
         raise
 
-def upload_sas_files(req: ProjectRequest):
+def refresh_catalog(loader, cursor, schema_names):
+    """Load the project's schemas and tables into the catalog cache with one query.
+
+    Best effort: without it every DDL check simply goes to the database.
+    """
+    try:
+        catalog_cache.refresh(loader, cursor, schema_names)
+    except Exception as e:
+        logger.warning(f"Catalog query failed, checking DDL per statement: {str(e)}")
+        catalog_cache.invalidate(loader.catalog_key())
+        conn = getattr(cursor, "connection", None)
+        if conn is not None:
+            conn.rollback()
+
+def upload_sas_files(req: ProjectRequest, job=None):
+    """Import every changed SAS file of a project; job (import_jobs.ImportJob) tracks per-file progress"""
     start_time = datetime.now()
     inserted_tables = []
+    skipped_files = []
     project_name = req.project_name
     logger.info(f"🚀 Starting SAS import for project: {project_name}")
     try:
         project_prefix = f"{settings.BASE_BLOB_PATH}/{project_name}"
-        blob_service_client = BlobServiceClient.from_connection_string(settings.AZURE_STORAGE_CONNECTION_STRING)
-        container_client = blob_service_client.get_container_client(settings.AZURE_STORAGE_CONTAINER_NAME)
-        # Ensure database exists
+        container_client = get_blob_service_client().get_container_client(settings.AZURE_STORAGE_CONTAINER_NAME)
         try:
-            with ConnectionPool.get_connection() as conn:
-                conn.autocommit = True
-                cursor = conn.cursor()
-                cursor.execute(f"""
-                    IF DB_ID('{settings.MAIN_DB_NAME}') IS NULL
-                    CREATE DATABASE [{settings.MAIN_DB_NAME}]
-                """)
+            profiles = load_profiles(project_name)
+        except (OSError, ValueError) as e:
+            logger.error(f"Import profile invalid for {project_name}: {str(e)}")
+            return {"status": "error", "message": f"Import profile invalid: {str(e)}"}
+        loader = create_loader()
+        # Ensure database exists (skipped once this process has seen it)
+        try:
+            loader.ensure_database()
             logger.info(f"Database {settings.MAIN_DB_NAME} verified")
         except Exception as e:
+            catalog_cache.invalidate(loader.catalog_key())
             logger.error(f"Database verification failed: {str(e)}")
             return {"status": "error", "message": f"Database setup failed: {str(e)}"}
-        # Create schemas
+        # One connection for the catalog, the schemas and the manifests of
+        # previous imports (used to skip blobs whose etag has not changed)
         schema_names = [f"{project_name}_ADAM", f"{project_name}_SDTM"]
-        for schema_name in schema_names:
-            try:
-                create_schema(schema_name)
-            except Exception as e:
-                return {"status": "error", "message": f"Schema creation failed: {str(e)}"}
+        conn = loader.connect()
+        try:
+            cursor = conn.cursor()
+            refresh_catalog(loader, cursor, schema_names)
+            for schema_name in schema_names:
+                try:
+                    create_schema(loader, cursor, schema_name)
+                except Exception as e:
+                    catalog_cache.invalidate(loader.catalog_key())
+                    return {"status": "error", "message": f"Schema creation failed: {str(e)}"}
+            manifests = {schema_name: read_manifest(loader, cursor, schema_name) for schema_name in schema_names}
+            conn.commit()
+        except Exception:
+            catalog_cache.invalidate(loader.catalog_key())
+            raise
+        finally:
+            loader.release(conn)
         # Find all SAS files
         file_tasks = []
         for domain in ['ADAM', 'SDTM']:
@@ -284,48 +763,72 @@ def upload_sas_files(req: ProjectRequest):
             for blob in blobs:
                 if blob.name.lower().endswith('.sas7bdat'):
                     table_name = os.path.splitext(os.path.basename(blob.name))[0].lower()
+                    profile = dataset_profile(profiles, domain, table_name)
+                    source = dict(blob_source(blob), settings_digest=import_settings_digest(profile))
+                    if not req.force and is_unchanged(manifests[schema_name].get(blob.name), source):
+                        skipped_files.append(blob.name)
+                        if job:
+                            job.add_file(blob.name, schema_name, table_name, blob.size, state="skipped")
+                        continue
                     blob_client = container_client.get_blob_client(blob)
-                    file_tasks.append((schema_name, table_name, blob_client))
-        logger.info(f"📁 Found {len(file_tasks)} SAS files for processing")
-        # Process files in two stages: download then processing
-        with ThreadPoolExecutor(max_workers=settings.DOWNLOAD_WORKERS) as download_executor, \
-             ThreadPoolExecutor(max_workers=settings.PROCESSING_WORKERS) as processing_executor:
-            # Submit download tasks
-            download_futures = {}
-            for task in file_tasks:
-                schema_name, table_name, blob_client = task
-                future = download_executor.submit(download_blob, blob_client)
-                download_futures[future] = (schema_name, table_name, blob_client.blob_name)
-                logger.info(f"Submitted download: {blob_client.blob_name}")
-            # Process downloads as they complete
-            processing_futures = []
-            for future in as_completed(download_futures):
-                schema_name, table_name, blob_name = download_futures[future]
-                try:
-                    tmp_path = future.result()
-                    logger.info(f"✅ Download completed: {blob_name}")
-                    # Submit processing task
-                    p_future = processing_executor.submit(
-                        process_file, 
-                        schema_name, 
-                        table_name, 
-                        tmp_path
-                    )
-                    processing_futures.append((p_future, blob_name))
-                    logger.info(f"Submitted processing: {blob_name}")
-                except Exception as e:
-                    logger.error(f"🚫 Download failed for {blob_name}: {str(e)}")
-            # Process results as they complete
-            for p_future, blob_name in processing_futures:
-                try:
-                    result = p_future.result()
-                    if result:
-                        inserted_tables.append(result)
-                        logger.info(f"✅ Successfully processed: {blob_name}")
-                    else:
-                        logger.error(f"🚫 Processing failed for {blob_name}")
-                except Exception as e:
-                    logger.error(f"🚫 Processing failed for {blob_name}: {str(e)}")
+                    file_tasks.append(FileTask(schema_name, table_name, blob_client, source, blob.size, profile))
+                    if job:
+                        job.add_file(blob.name, schema_name, table_name, blob.size)
+        logger.info(f"📁 Found {len(file_tasks)} SAS files for processing ({settings.IMPORT_EXECUTION_MODE} mode), {len(skipped_files)} unchanged")
+        def track(task, **changes):
+            if job:
+                job.update_file(task.source["blob_name"], changes)
+
+        # Process files in two stages: download then processing, with bounded
+        # in-flight bytes and a bounded handoff queue between the stages
+        def fetch_source(task):
+            # A cached sidecar replaces the download (process_file gets tmp_path=None)
+            if has_sidecar(task.source, import_settings_digest(task.profile)):
+                logger.info(f"Sidecar cached, skipping download: {task.blob_client.blob_name}")
+                return None
+            track(task, state="downloading")
+            try:
+                return download_blob(
+                    task.blob_client, task.size, task.source["etag"],
+                    on_progress=lambda size: track(task, add_bytes_transferred=size),
+                )
+            except Exception as e:
+                track(task, state="failed", error=f"Download failed: {str(e)}")
+                raise
+
+        def process(task, tmp_path):
+            logger.info(f"Submitted processing: {task.blob_client.blob_name}")
+            # Looked up per file, so files after a dead worker go to a new pool
+            result = shared_processing_executor().submit(
+                process_file,
+                task.schema_name,
+                task.table_name,
+                tmp_path,
+                task.source,
+                True,
+                job.id if job else None,
+                task.profile
+            ).result()
+            if result:
+                track(task, state="done")
+            else:
+                track(task, state="failed", error="Import failed, see logs/sas_importer.log")
+            return result
+
+        pipeline = ImportPipeline(
+            download=fetch_source,
+            process=process,
+            download_workers=settings.DOWNLOAD_WORKERS,
+            processing_workers=settings.PROCESSING_WORKERS,
+            max_inflight_bytes=settings.PIPELINE_MAX_INFLIGHT_MB * 1024 * 1024,
+            queue_depth=settings.PIPELINE_QUEUE_DEPTH,
+        )
+        for task, result in pipeline.run(file_tasks):
+            if result:
+                inserted_tables.append(result)
+                logger.info(f"✅ Successfully processed: {task.blob_client.blob_name}")
+            else:
+                logger.error(f"🚫 Processing failed for {task.blob_client.blob_name}")
         duration = (datetime.now() - start_time).total_seconds()
         logger.info(f"🏁 Completed project {project_name} in {duration:.2f} seconds")
         return {
@@ -333,7 +836,9 @@ def upload_sas_files(req: ProjectRequest):
             "tables_inserted": inserted_tables,
             "duration_seconds": duration,
             "files_processed": len(inserted_tables),
-            "total_files": len(file_tasks)
+            "files_skipped": skipped_files,
+            "total_files": len(file_tasks) + len(skipped_files),
+            "pipeline": pipeline.stats()
         }
     except Exception as e:
         logger.error(f"🔥 Project processing failed: {str(e)}", exc_info=True)
@@ -0,0 +1,230 @@
+# app/services/import_jobs.py
+import logging
+import multiprocessing
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from app.core.config import settings
+
+logger = logging.getLogger("sas_importer")
+
+FILE_STATES = ("queued", "downloading", "decoding", "inserting", "done", "failed", "skipped")
+FINISHED_FILE_STATES = ("done", "failed", "skipped")
+FINISHED_JOB_STATES = ("done", "failed")
+
+
+@dataclass
+class FileProgress:
+    """Where one blob of an import job is, and how fast it got there"""
+    blob_name: str
+    schema_name: str
+    table_name: str
+    size_bytes: int = 0
+    state: str = "queued"
+    bytes_transferred: int = 0
+    rows_total: int = 0
+    rows_inserted: int = 0
+    string_bytes: int = 0  # string columns as decoded
+    compact_string_bytes: int = 0  # the same columns dictionary-encoded (compact_strings)
+    error: str = None
+    download_started: float = None
+    process_started: float = None
+    finished: float = None
+
+    def apply(self, changes: dict):
+        """add_<field> increments a counter; any other key replaces the field"""
+        now = time.time()
+        if self.state in FINISHED_FILE_STATES and "state" in changes:
+            # A worker report that arrives after the final state is stale
+            changes = {key: value for key, value in changes.items() if key.startswith("add_")}
+        for key, value in changes.items():
+            if key.startswith("add_"):
+                name = key[4:]
+                setattr(self, name, getattr(self, name) + value)
+            else:
+                setattr(self, key, value)
+        state = changes.get("state")
+        if state == "downloading" and self.download_started is None:
+            self.download_started = now
+        elif state in ("decoding", "inserting") and self.process_started is None:
+            self.process_started = now
+        elif state in FINISHED_FILE_STATES:
+            self.finished = now
+
+    def as_dict(self) -> dict:
+        now = time.time()
+        download_end = self.process_started or self.finished or now
+        download_seconds = download_end - self.download_started if self.download_started else 0
+        insert_seconds = (self.finished or now) - self.process_started if self.process_started else 0
+        return {
+            "blob_name": self.blob_name,
+            "table": f"{self.schema_name}.{self.table_name}",
+            "state": self.state,
+            "size_bytes": self.size_bytes,
+            "bytes_transferred": self.bytes_transferred,
+            "rows_total": self.rows_total,
+            "rows_inserted": self.rows_inserted,
+            "string_mb": round(self.string_bytes / 1024 / 1024, 2),
+            "compact_string_mb": round(self.compact_string_bytes / 1024 / 1024, 2),
+            "download_mb_per_second": round(self.bytes_transferred / 1024 / 1024 / download_seconds, 2) if download_seconds > 0 else 0.0,
+            "rows_per_second": round(self.rows_inserted / insert_seconds, 1) if insert_seconds > 0 else 0.0,
+            "error": self.error,
+        }
+
+
+@dataclass
+class ImportJob:
+    project_name: str
+    force: bool = False
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    state: str = "queued"
+    created: float = field(default_factory=time.time)
+    started: float = None
+    finished: float = None
+    error: str = None
+    result: dict = None
+    files: dict = field(default_factory=OrderedDict)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def add_file(self, blob_name, schema_name, table_name, size_bytes=0, state="queued"):
+        with self._lock:
+            progress = FileProgress(blob_name, schema_name, table_name, size_bytes or 0)
+            progress.apply({"state": state})
+            self.files[blob_name] = progress
+
+    def update_file(self, blob_name, changes: dict):
+        with self._lock:
+            progress = self.files.get(blob_name)
+            if progress is not None:
+                progress.apply(changes)
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            files = [progress.as_dict() for progress in self.files.values()]
+        end = self.finished or time.time()
+        return {
+            "job_id": self.id,
+            "project_name": self.project_name,
+            "state": self.state,
+            "error": self.error,
+            "created_at": self.created,
+            "duration_seconds": round(end - self.started, 2) if self.started else 0.0,
+            "files_total": len(files),
+            "files_done": sum(f["state"] in ("done", "skipped") for f in files),
+            "files_failed": sum(f["state"] == "failed" for f in files),
+            "rows_inserted": sum(f["rows_inserted"] for f in files),
+            "bytes_transferred": sum(f["bytes_transferred"] for f in files),
+            "files": files,
+        }
+
+
+class JobRegistry:
+    """In-memory import jobs run on one shared, bounded thread pool.
+
+    At most IMPORT_JOB_CONCURRENCY imports run at once; further jobs wait as
+    "queued". The newest IMPORT_JOB_HISTORY finished jobs are kept for polling.
+    """
+
+    def __init__(self):
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def submit(self, project_name: str, force: bool, run) -> ImportJob:
+        """Queue run(job) for a project; raises ValueError if it already has an active job"""
+        with self._lock:
+            active = next((job for job in self._jobs.values()
+                           if job.project_name == project_name and job.state not in FINISHED_JOB_STATES), None)
+            if active is not None:
+                raise ValueError(f"Import job {active.id} is already {active.state} for project {project_name}")
+            job = ImportJob(project_name, force)
+            self._jobs[job.id] = job
+            self._prune()
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=settings.IMPORT_JOB_CONCURRENCY, thread_name_prefix="import-job"
+                )
+            self._executor.submit(self._run, job, run)
+        logger.info(f"📥 Queued import job {job.id} for project {project_name}")
+        return job
+
+    def get(self, job_id: str) -> ImportJob:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self) -> list:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def update_file(self, job_id, blob_name, changes: dict):
+        job = self.get(job_id)
+        if job is not None:
+            job.update_file(blob_name, changes)
+
+    def _run(self, job, run):
+        job.state, job.started = "running", time.time()
+        try:
+            job.result = run(job)
+            if job.result.get("status") == "error":
+                job.state, job.error = "failed", job.result.get("message")
+            else:
+                job.state = "done"
+        except Exception as e:
+            logger.error(f"🔥 Import job {job.id} failed: {str(e)}", exc_info=True)
+            job.state, job.error = "failed", str(e)
+        finally:
+            job.finished = time.time()
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.state in FINISHED_JOB_STATES]
+        for job_id in finished[:max(0, len(finished) - settings.IMPORT_JOB_HISTORY)]:
+            del self._jobs[job_id]
+
+
+registry = JobRegistry()
+
+# Progress from import worker processes travels over one spawn-context queue
+# (handed to each worker through its initializer) and is applied to the
+# registry by a listener thread in the API process.
+_progress_queue = None
+_progress_lock = threading.Lock()
+_worker_queue = None
+
+
+def progress_queue():
+    """Queue for worker processes to report on; the inherited one inside a worker"""
+    global _progress_queue
+    if _worker_queue is not None:
+        return _worker_queue
+    with _progress_lock:
+        if _progress_queue is None:
+            _progress_queue = multiprocessing.get_context("spawn").Queue()
+            threading.Thread(target=_drain_progress, args=(_progress_queue,),
+                             name="import-progress", daemon=True).start()
+        return _progress_queue
+
+
+def set_worker_queue(queue):
+    global _worker_queue
+    _worker_queue = queue
+
+
+def _drain_progress(queue):
+    while True:
+        job_id, blob_name, changes = queue.get()
+        registry.update_file(job_id, blob_name, changes)
+
+
+def report_progress(progress_key, **changes):
+    """Record a file's progress; progress_key is (job_id, blob_name) or None"""
+    if progress_key is None:
+        return
+    job_id, blob_name = progress_key
+    if _worker_queue is not None:
+        _worker_queue.put((job_id, blob_name, changes))
+    else:
+        registry.update_file(job_id, blob_name, changes)
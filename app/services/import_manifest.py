@@ -0,0 +1,95 @@
+# app/services/import_manifest.py
+import base64
+import hashlib
+import json
+import logging
+from datetime import datetime, timezone
+
+from app.core.config import settings
+from app.services import catalog_cache
+
+logger = logging.getLogger("sas_importer")
+
+# One manifest per target schema, next to the tables it describes, so a fresh
+# database or schema always starts with an empty manifest.
+MANIFEST_TABLE = "_import_manifest"
+MANIFEST_COLUMNS = [
+    "blob_name", "etag", "content_md5", "size_bytes", "settings_digest", "table_name", "row_count", "imported_at",
+]
+MANIFEST_TYPES = {
+    "blob_name": "NVARCHAR(1024)",
+    "etag": "NVARCHAR(128)",
+    "content_md5": "NVARCHAR(64)",
+    "size_bytes": "BIGINT",
+    "settings_digest": "NVARCHAR(64)",
+    "table_name": "NVARCHAR(128)",
+    "row_count": "BIGINT",
+    "imported_at": "DATETIME2",
+}
+
+
+def blob_source(blob) -> dict:
+    """Identity of a listed blob (BlobProperties) as recorded in the manifest"""
+    content_settings = getattr(blob, "content_settings", None)
+    content_md5 = getattr(content_settings, "content_md5", None)
+    return {
+        "blob_name": blob.name,
+        "etag": blob.etag,
+        "content_md5": base64.b64encode(bytes(content_md5)).decode() if content_md5 else None,
+        "size_bytes": blob.size,
+    }
+
+
+def import_settings_digest(profile=None) -> str:
+    """Fingerprint of what shapes a table besides the blob: its import profile and the load settings
+
+    Recorded with each import, so changing any of them reloads the dataset
+    even though its blob is unchanged.
+    """
+    payload = json.dumps([
+        profile.digest if profile else None,
+        settings.SQL_TYPE_INFERENCE,
+        settings.SAS_COMPACT_STRINGS,
+        settings.BULK_LOADER,
+    ])
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def ensure_manifest(loader, cursor, schema_name: str):
+    existing = catalog_cache.table_columns(loader.catalog_key(), schema_name, MANIFEST_TABLE)
+    if existing and any(col not in existing for col in MANIFEST_COLUMNS):
+        # Written by an older version; forgetting it only means every blob is imported once more
+        logger.info(f"Recreating {schema_name}.{MANIFEST_TABLE} with the current columns")
+        loader.drop_table(cursor, schema_name, MANIFEST_TABLE)
+    loader.ensure_table(cursor, schema_name, MANIFEST_TABLE, MANIFEST_COLUMNS, MANIFEST_TYPES)
+
+
+def read_manifest(loader, cursor, schema_name: str) -> dict:
+    """Last successful import per blob name in one schema"""
+    ensure_manifest(loader, cursor, schema_name)
+    columns = ", ".join(loader.quote(col) for col in MANIFEST_COLUMNS)
+    cursor.execute(f"SELECT {columns} FROM {loader.qualified_name(schema_name, MANIFEST_TABLE)}")
+    return {row[0]: dict(zip(MANIFEST_COLUMNS, row)) for row in cursor.fetchall()}
+
+
+def is_unchanged(entry, source: dict) -> bool:
+    """True when the blob still has the etag (or content MD5) and import settings of its last import"""
+    if not entry or entry.get("settings_digest") != source.get("settings_digest"):
+        return False
+    if source["etag"] and entry["etag"] == source["etag"]:
+        return True
+    return bool(source["content_md5"]) and entry["content_md5"] == source["content_md5"] \
+        and entry["size_bytes"] == source["size_bytes"]
+
+
+def record_import(loader, cursor, schema_name: str, table_name: str, source: dict, row_count: int):
+    """Replace the manifest entry for a blob; runs in the caller's load transaction"""
+    manifest = loader.qualified_name(schema_name, MANIFEST_TABLE)
+    ph = loader.placeholder
+    cursor.execute(f"DELETE FROM {manifest} WHERE {loader.quote('blob_name')} = {ph}", (source["blob_name"],))
+    values = (
+        source["blob_name"], source["etag"], source["content_md5"], source["size_bytes"],
+        source.get("settings_digest"), table_name, row_count, datetime.now(timezone.utc).replace(tzinfo=None),
+    )
+    columns = ", ".join(loader.quote(col) for col in MANIFEST_COLUMNS)
+    cursor.execute(f"INSERT INTO {manifest} ({columns}) VALUES ({', '.join([ph] * len(values))})", values)
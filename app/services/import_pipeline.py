@@ -0,0 +1,192 @@
+# app/services/import_pipeline.py
+import logging
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+
+from app.core.metrics import FILES_IMPORTED, FILES_IN_FLIGHT, INFLIGHT_BYTES
+
+logger = logging.getLogger("sas_importer")
+
+
+class ByteBudget:
+    """Caps the bytes held by files between download start and processing end.
+
+    A file larger than the whole budget is admitted once nothing else is in
+    flight, so it cannot block the pipeline forever.
+    """
+
+    def __init__(self, limit_bytes: int):
+        self.limit = limit_bytes
+        self.in_use = 0
+        self.peak = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, size: int) -> float:
+        """Block until size bytes fit; returns the seconds spent waiting"""
+        start = time.perf_counter()
+        with self._cond:
+            while self.in_use and self.in_use + size > self.limit:
+                self._cond.wait()
+            self.in_use += size
+            self.peak = max(self.peak, self.in_use)
+        FILES_IN_FLIGHT.inc()
+        INFLIGHT_BYTES.inc(size)
+        return time.perf_counter() - start
+
+    def release(self, size: int):
+        with self._cond:
+            self.in_use -= size
+            self._cond.notify_all()
+        FILES_IN_FLIGHT.dec()
+        INFLIGHT_BYTES.dec(size)
+
+
+@dataclass
+class StageStats:
+    """Throughput and backpressure of one pipeline stage"""
+    name: str
+    items: int = 0
+    failed: int = 0
+    busy_seconds: float = 0.0
+    stall_seconds: float = 0.0
+    max_queue_depth: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record(self, busy: float = 0.0, stall: float = 0.0, queue_depth: int = 0, failed: bool = False):
+        with self._lock:
+            self.items += 1
+            self.failed += int(failed)
+            self.busy_seconds += busy
+            self.stall_seconds += stall
+            self.max_queue_depth = max(self.max_queue_depth, queue_depth)
+
+    def as_dict(self) -> dict:
+        return {
+            "items": self.items,
+            "failed": self.failed,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "stall_seconds": round(self.stall_seconds, 3),
+            "max_queue_depth": self.max_queue_depth,
+        }
+
+
+@dataclass
+class FileTask:
+    schema_name: str
+    table_name: str
+    blob_client: object
+    source: dict
+    size: int
+    profile: object = None  # import_profile.DatasetProfile of the dataset, if any
+
+
+class ImportPipeline:
+    """Download → process pipeline with a byte budget and a bounded handoff queue.
+
+    Files are downloaded largest first (the longest jobs start earliest, which
+    shortens total wall time). A download only starts when its size fits in the
+    in-flight byte budget; the bytes are released once process_file has consumed
+    and deleted the temp file. Finished downloads wait in a queue of at most
+    queue_depth files, so downloaders stall instead of filling the disk when the
+    processing stage falls behind.
+    """
+
+    def __init__(self, download, process, download_workers: int, processing_workers: int,
+                 max_inflight_bytes: int, queue_depth: int):
+        self.download = download
+        self.process = process
+        self.download_workers = download_workers
+        self.processing_workers = processing_workers
+        self.budget = ByteBudget(max_inflight_bytes)
+        self.handoff = queue.Queue(maxsize=max(1, queue_depth))
+        self.download_stats = StageStats("download")
+        self.process_stats = StageStats("process")
+        self.results = []
+        self._results_lock = threading.Lock()
+
+    def run(self, tasks):
+        """Run every task; returns [(FileTask, result-or-None)] in completion order"""
+        pending = queue.Queue()
+        for task in sorted(tasks, key=lambda t: t.size or 0, reverse=True):
+            pending.put(task)
+        downloaders = [
+            threading.Thread(target=self._download_worker, args=(pending,), name=f"import-download-{i}")
+            for i in range(self.download_workers)
+        ]
+        processors = [
+            threading.Thread(target=self._process_worker, name=f"import-process-{i}")
+            for i in range(self.processing_workers)
+        ]
+        for thread in downloaders + processors:
+            thread.start()
+        for thread in downloaders:
+            thread.join()
+        for _ in processors:
+            self.handoff.put(None)
+        for thread in processors:
+            thread.join()
+        logger.info(
+            f"Pipeline stats: download={self.download_stats.as_dict()} process={self.process_stats.as_dict()} "
+            f"peak_inflight_mb={self.budget.peak / 1024 / 1024:.1f}"
+        )
+        return self.results
+
+    def stats(self) -> dict:
+        return {
+            "download": self.download_stats.as_dict(),
+            "process": self.process_stats.as_dict(),
+            "peak_inflight_bytes": self.budget.peak,
+        }
+
+    def _finish(self, task, result):
+        FILES_IMPORTED.inc(outcome="failed" if result is None else "done")
+        with self._results_lock:
+            self.results.append((task, result))
+
+    def _download_worker(self, pending):
+        while True:
+            try:
+                task = pending.get_nowait()
+            except queue.Empty:
+                return
+            size = task.size or 0
+            stall = self.budget.acquire(size)
+            start = time.perf_counter()
+            try:
+                tmp_path = self.download(task)
+            except Exception as e:
+                logger.error(f"🚫 Download failed for {task.blob_client.blob_name}: {str(e)}")
+                self.budget.release(size)
+                self.download_stats.record(busy=time.perf_counter() - start, stall=stall, failed=True)
+                self._finish(task, None)
+                continue
+            busy = time.perf_counter() - start
+            # Blocks while the processing stage is queue_depth files behind
+            put_start = time.perf_counter()
+            self.handoff.put((task, tmp_path))
+            stall += time.perf_counter() - put_start
+            self.download_stats.record(busy=busy, stall=stall, queue_depth=self.handoff.qsize())
+
+    def _process_worker(self):
+        while True:
+            get_start = time.perf_counter()
+            item = self.handoff.get()
+            stall = time.perf_counter() - get_start
+            if item is None:
+                return
+            task, tmp_path = item
+            start = time.perf_counter()
+            result = None
+            try:
+                result = self.process(task, tmp_path)
+            except Exception as e:
+                logger.error(f"🚫 Processing failed for {task.blob_client.blob_name}: {str(e)}")
+            finally:
+                self.budget.release(task.size or 0)
+            self.process_stats.record(
+                busy=time.perf_counter() - start, stall=stall,
+                queue_depth=self.handoff.qsize(), failed=result is None,
+            )
+            self._finish(task, result)
@@ -0,0 +1,164 @@
+# app/services/import_profile.py
+"""Per-dataset import profiles: which columns to load and which rows to keep.
+
+A project's profiles live in <IMPORT_PROFILE_DIR>/<project>.json, keyed by
+dataset (the table name, optionally prefixed by its domain):
+
+    {
+        "ADAM/adlb": {
+            "columns": ["STUDYID", "USUBJID", "PARAMCD", "AVAL", "ADT"],
+            "where": [["PARAMCD", "in", ["ALT", "AST"]], ["ANL01FL", "==", "Y"]]
+        },
+        "adsl": {"columns": ["STUDYID", "USUBJID", "ARM", "TRTSDT"]}
+    }
+
+Only the listed columns (plus those the predicates need) are decoded, and the
+table is created from the projected layout. Predicates are ANDed; comparisons
+with a missing value are false, as in SQL. Values for date/datetime/time
+columns are ISO strings ("2024-01-31", "08:30:00"). The import manifest records
+each dataset's profile digest, so changing a profile reloads the dataset on the
+next import even though its blob is unchanged.
+"""
+import hashlib
+import json
+import logging
+import os
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from app.core.config import settings
+
+logger = logging.getLogger("sas_importer")
+
+OPERATORS = {"==", "!=", "<", "<=", ">", ">=", "in", "not in", "is null", "not null"}
+
+
+@dataclass(frozen=True)
+class DatasetProfile:
+    columns: tuple = ()  # columns to load, empty = all
+    where: tuple = ()  # (column, operator, value) predicates, all must hold
+
+    @property
+    def digest(self) -> str:
+        """Short fingerprint, so caches of a profiled load are not mixed with others"""
+        payload = json.dumps([list(self.columns), [list(p) for p in self.where]], default=str)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:12]
+
+    def resolve(self, column_names) -> "DatasetProfile":
+        """Profile spelled like the file's columns (SAS names are case-insensitive)"""
+        by_name = {col.upper(): col for col in column_names}
+        missing = [col for col in self.columns if col.upper() not in by_name]
+        if missing:
+            logger.warning(f"Profile columns not in dataset, ignored: {', '.join(missing)}")
+        where = []
+        for col, op, value in self.where:
+            if col.upper() not in by_name:
+                raise ValueError(f"Profile filter column {col} is not in the dataset")
+            where.append((by_name[col.upper()], op, value))
+        columns = {by_name[col.upper()] for col in self.columns if col.upper() in by_name}
+        if self.columns and not columns:
+            raise ValueError("None of the profile columns are in the dataset")
+        return DatasetProfile(tuple(col for col in column_names if col in columns), tuple(where))
+
+    def keep_columns(self, column_names) -> list:
+        """Columns of the table, in file order"""
+        return [col for col in column_names if col in self.columns] if self.columns else list(column_names)
+
+    def read_columns(self, column_names):
+        """Columns to decode (kept and filtered on) in file order, None for all"""
+        if not self.columns:
+            return None
+        needed = set(self.columns) | {col for col, _, _ in self.where}
+        return [col for col in column_names if col in needed]
+
+    def apply(self, chunk_df: pd.DataFrame) -> pd.DataFrame:
+        """Rows passing every predicate, restricted to the kept columns"""
+        if self.where:
+            mask = np.ones(len(chunk_df), dtype=bool)
+            for col, op, value in self.where:
+                mask &= _evaluate(chunk_df[col], op, value)
+            if not mask.all():
+                chunk_df = chunk_df[mask]
+        if self.columns and list(chunk_df.columns) != list(self.columns):
+            chunk_df = chunk_df[list(self.columns)]
+        return chunk_df
+
+
+def _coerce(series: pd.Series, value):
+    """Predicate value in the column's type (ISO strings for temporal columns)"""
+    if isinstance(value, (list, tuple)):
+        return [_coerce(series, v) for v in value]
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        return pd.Timestamp(value)
+    if pd.api.types.is_timedelta64_dtype(series.dtype):
+        return pd.Timedelta(value)
+    return value
+
+
+def _evaluate(series: pd.Series, op: str, value) -> np.ndarray:
+    if op == "is null":
+        return series.isna().to_numpy()
+    if op == "not null":
+        return series.notna().to_numpy()
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Compact strings: evaluate each distinct value once, then map the codes
+        hits = _evaluate(pd.Series(series.cat.categories), op, value)
+        codes = series.cat.codes.to_numpy()
+        result = np.zeros(len(codes), dtype=bool)
+        present = codes >= 0
+        result[present] = hits[codes[present]]
+        return result
+    value = _coerce(series, value)
+    if op == "in":
+        result = series.isin(value)
+    elif op == "not in":
+        result = ~series.isin(value)
+    else:
+        result = {
+            "==": series.__eq__, "!=": series.__ne__, "<": series.__lt__,
+            "<=": series.__le__, ">": series.__gt__, ">=": series.__ge__,
+        }[op](value)
+    # Missing values never match, as in SQL
+    return (result & series.notna()).to_numpy(dtype=bool)
+
+
+def parse_profile(entry: dict) -> DatasetProfile:
+    columns = entry.get("columns") or []
+    where = entry.get("where") or []
+    if not isinstance(columns, list) or not all(isinstance(col, str) for col in columns):
+        raise ValueError(f"Profile 'columns' must be a list of column names, got {columns!r}")
+    predicates = []
+    for predicate in where:
+        if not isinstance(predicate, list) or len(predicate) not in (2, 3):
+            raise ValueError(f"Profile predicate must be [column, operator(, value)], got {predicate!r}")
+        col, op, value = (predicate + [None])[:3]
+        op = op.lower()
+        if op not in OPERATORS:
+            raise ValueError(f"Unknown profile operator {op!r}, expected one of {sorted(OPERATORS)}")
+        if op in ("in", "not in") and not isinstance(value, list):
+            raise ValueError(f"Profile operator {op!r} needs a list of values")
+        predicates.append((col, op, tuple(value) if isinstance(value, list) else value))
+    return DatasetProfile(tuple(columns), tuple(predicates))
+
+
+def profile_path(project_name: str) -> str:
+    return os.path.join(settings.IMPORT_PROFILE_DIR, f"{project_name}.json")
+
+
+def load_profiles(project_name: str) -> dict:
+    """{"<DOMAIN>/<dataset>" or "<dataset>" (upper case): DatasetProfile} for a project; {} without a file"""
+    path = profile_path(project_name)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        entries = json.load(f)
+    profiles = {key.upper(): parse_profile(entry) for key, entry in entries.items()}
+    logger.info(f"Loaded {len(profiles)} import profile(s) from {path}")
+    return profiles
+
+
+def dataset_profile(profiles: dict, domain: str, table_name: str):
+    """The profile of one dataset: "<DOMAIN>/<dataset>" first, then "<dataset>"; None if there is none"""
+    return profiles.get(f"{domain}/{table_name}".upper()) or profiles.get(table_name.upper())
@@ -0,0 +1,62 @@
+# app/services/load_checkpoint.py
+import logging
+from datetime import datetime, timezone
+
+logger = logging.getLogger("sas_importer")
+
+# Rows committed so far per blob version and row range, next to the tables
+# being loaded. A range is the whole file or one parallel partition.
+CHECKPOINT_TABLE = "_import_checkpoint"
+CHECKPOINT_COLUMNS = ["blob_name", "etag", "table_name", "range_start", "range_rows", "rows_committed", "updated_at"]
+CHECKPOINT_TYPES = {
+    "blob_name": "NVARCHAR(1024)",
+    "etag": "NVARCHAR(128)",
+    "table_name": "NVARCHAR(128)",
+    "range_start": "BIGINT",
+    "range_rows": "BIGINT",
+    "rows_committed": "BIGINT",
+    "updated_at": "DATETIME2",
+}
+
+
+def ensure_checkpoints(loader, cursor, schema_name: str):
+    loader.ensure_table(cursor, schema_name, CHECKPOINT_TABLE, CHECKPOINT_COLUMNS, CHECKPOINT_TYPES)
+
+
+def read_checkpoints(loader, cursor, schema_name: str, source: dict) -> dict:
+    """{range_start: (range_rows, rows_committed)} left by an earlier attempt on this blob version"""
+    ensure_checkpoints(loader, cursor, schema_name)
+    ph = loader.placeholder
+    cursor.execute(
+        f"SELECT {loader.quote('range_start')}, {loader.quote('range_rows')}, {loader.quote('rows_committed')} "
+        f"FROM {loader.qualified_name(schema_name, CHECKPOINT_TABLE)} "
+        f"WHERE {loader.quote('blob_name')} = {ph} AND {loader.quote('etag')} = {ph}",
+        (source["blob_name"], source["etag"]),
+    )
+    return {int(start): (int(rows), int(committed)) for start, rows, committed in cursor.fetchall()}
+
+
+def save_checkpoint(loader, cursor, schema_name: str, table_name: str, source: dict,
+                    range_start: int, range_rows: int, rows_committed: int):
+    """Record rows committed for one range; runs in the transaction that wrote those rows"""
+    checkpoints = loader.qualified_name(schema_name, CHECKPOINT_TABLE)
+    ph = loader.placeholder
+    cursor.execute(
+        f"DELETE FROM {checkpoints} WHERE {loader.quote('blob_name')} = {ph} AND {loader.quote('range_start')} = {ph}",
+        (source["blob_name"], range_start),
+    )
+    values = (
+        source["blob_name"], source["etag"], table_name, range_start, range_rows, rows_committed,
+        datetime.now(timezone.utc).replace(tzinfo=None),
+    )
+    columns = ", ".join(loader.quote(col) for col in CHECKPOINT_COLUMNS)
+    cursor.execute(f"INSERT INTO {checkpoints} ({columns}) VALUES ({', '.join([ph] * len(values))})", values)
+
+
+def clear_checkpoints(loader, cursor, schema_name: str, source: dict):
+    """Forget every range of a blob (any version): the load finished or starts over"""
+    cursor.execute(
+        f"DELETE FROM {loader.qualified_name(schema_name, CHECKPOINT_TABLE)} "
+        f"WHERE {loader.quote('blob_name')} = {loader.placeholder}",
+        (source["blob_name"],),
+    )
@@ -0,0 +1,400 @@
+# app/services/loaders.py
+import io
+import logging
+import os
+import sqlite3
+import time
+from datetime import date, datetime, time as dt_time
+
+import pandas as pd
+import psycopg2
+import pyodbc
+from sqlalchemy.engine import make_url
+
+from app.core.config import settings
+from app.db.session import ConnectionPool
+from app.services import catalog_cache
+from app.services.row_marshalling import marshal_column, marshal_rows
+from app.services.type_inference import cast_integer_columns
+
+logger = logging.getLogger("sas_importer")
+
+# sqlite3's implicit date adapters are deprecated; store ISO-8601 text explicitly
+sqlite3.register_adapter(date, lambda value: value.isoformat())
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(sep=" "))
+sqlite3.register_adapter(dt_time, lambda value: value.isoformat())
+
+
+class BulkLoader:
+    """Target database for the SAS import: its DDL dialect and bulk insert path.
+
+    A loader instance is used for one file (or one partition of a file) and
+    accumulates the rows it wrote and the time spent writing them, so backends
+    can be compared by rows/s.
+    """
+    name = "base"
+    placeholder = "?"
+
+    def __init__(self):
+        self.rows = 0
+        self.seconds = 0.0
+        self._table = None
+        self._columns = None
+        self._type_map = None
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
+
+    # Connections
+    def connect(self):
+        raise NotImplementedError
+
+    def release(self, conn):
+        conn.close()
+
+    # DDL
+    def quote(self, name: str) -> str:
+        return f'"{name}"'
+
+    def qualified_name(self, schema_name: str, table_name: str) -> str:
+        return f"{self.quote(schema_name)}.{self.quote(table_name)}"
+
+    def column_type(self, sql_type: str) -> str:
+        """Translate a type from table_layout (T-SQL) into this target's dialect"""
+        return sql_type
+
+    def column_definitions(self, columns, type_map):
+        return [f"{self.quote(col)} {self.column_type(type_map[col])} NULL" for col in columns]
+
+    # DDL goes through app/services/catalog_cache.py and is skipped when the
+    # cache already knows the answer; backends implement the _create/_drop steps
+    def catalog_key(self) -> tuple:
+        """Identifies the target database in the catalog cache"""
+        return (self.name,)
+
+    def read_catalog(self, cursor, schema_names) -> dict:
+        """{schema: {table: {column: type}}} for those of schema_names that exist, in one query"""
+        raise NotImplementedError
+
+    def ensure_database(self):
+        """Create the target database if the backend needs it"""
+        key = self.catalog_key()
+        if not catalog_cache.has_database(key):
+            self._create_database()
+            catalog_cache.remember_database(key)
+
+    def ensure_schema(self, cursor, schema_name: str):
+        key = self.catalog_key()
+        if not catalog_cache.has_schema(key, schema_name):
+            self._create_schema(cursor, schema_name)
+            catalog_cache.remember_schema(key, schema_name)
+
+    def ensure_table(self, cursor, schema_name, table_name, columns, type_map):
+        key = self.catalog_key()
+        existing = catalog_cache.table_columns(key, schema_name, table_name)
+        if existing:
+            missing = [col for col in columns if col not in existing]
+            if missing:
+                logger.warning(f"{schema_name}.{table_name} exists without columns {missing}")
+            return
+        self._create_table(cursor, schema_name, table_name, columns, type_map)
+        catalog_cache.remember_table(
+            key, schema_name, table_name, {col: self.column_type(type_map[col]) for col in columns}
+        )
+
+    def drop_table(self, cursor, schema_name, table_name):
+        key = self.catalog_key()
+        if catalog_cache.table_columns(key, schema_name, table_name) is not False:
+            self._drop_table(cursor, schema_name, table_name)
+            catalog_cache.forget_table(key, schema_name, table_name)
+
+    def _create_database(self):
+        pass
+
+    def _create_schema(self, cursor, schema_name):
+        cursor.execute(f"CREATE SCHEMA IF NOT EXISTS {self.quote(schema_name)}")
+
+    def _create_table(self, cursor, schema_name, table_name, columns, type_map):
+        col_defs = ", ".join(self.column_definitions(columns, type_map))
+        cursor.execute(f"CREATE TABLE IF NOT EXISTS {self.qualified_name(schema_name, table_name)} ({col_defs})")
+
+    def _drop_table(self, cursor, schema_name, table_name):
+        cursor.execute(f"DROP TABLE IF EXISTS {self.qualified_name(schema_name, table_name)}")
+
+    # Data
+    def is_transient(self, error) -> bool:
+        """True for errors worth retrying on a fresh connection (resets, timeouts, deadlocks)"""
+        return False
+
+    def begin(self, cursor, schema_name, table_name, columns, type_map):
+        """Prepare the cursor for a series of load_chunk calls into one table"""
+        self._table = self.qualified_name(schema_name, table_name)
+        self._columns = list(columns)
+        self._type_map = type_map
+
+    def load_chunk(self, cursor, chunk_df) -> int:
+        """Write one DataFrame block; returns the number of rows written"""
+        if chunk_df.empty:
+            # A row filter can leave nothing of a block
+            return 0
+        start = time.perf_counter()
+        chunk_df = cast_integer_columns(chunk_df, self._type_map, self._columns)
+        rows = self._write(cursor, chunk_df)
+        self.seconds += time.perf_counter() - start
+        self.rows += rows
+        return rows
+
+    def _write(self, cursor, chunk_df) -> int:
+        raise NotImplementedError
+
+
+class ExecuteManyLoader(BulkLoader):
+    """SQL Server through pyodbc fast_executemany (the original load path)"""
+    name = "executemany"
+    # Link failure, connection not open/lost, timeouts, deadlock victim
+    TRANSIENT_SQLSTATES = {"08S01", "08001", "08003", "08004", "HYT00", "HYT01", "40001"}
+
+    def connect(self):
+        return ConnectionPool.get_connection(settings.MAIN_DB_NAME)
+
+    def release(self, conn):
+        ConnectionPool.return_connection(conn, settings.MAIN_DB_NAME)
+
+    def quote(self, name):
+        return f"[{name}]"
+
+    def catalog_key(self):
+        return (self.name, settings.SQL_SERVER, settings.MAIN_DB_NAME)
+
+    def read_catalog(self, cursor, schema_names):
+        cursor.execute(f"""
+            SELECT s.name, t.name, c.name, ty.name, c.max_length, c.precision, c.scale
+            FROM sys.schemas s
+            LEFT JOIN sys.tables t ON t.schema_id = s.schema_id
+            LEFT JOIN sys.columns c ON c.object_id = t.object_id
+            LEFT JOIN sys.types ty ON ty.user_type_id = c.user_type_id
+            WHERE s.name IN ({', '.join(['?'] * len(schema_names))})
+        """, *schema_names)
+        catalog = {}
+        for schema_name, table_name, column, type_name, max_length, precision, scale in cursor.fetchall():
+            tables = catalog.setdefault(schema_name, {})
+            if table_name is not None:
+                columns = tables.setdefault(table_name, {})
+                if column is not None:
+                    columns[column] = self.catalog_type(type_name, max_length, precision, scale)
+        return catalog
+
+    @staticmethod
+    def catalog_type(type_name, max_length, precision, scale):
+        """sys.columns type info back into the T-SQL spelling table_layout uses"""
+        type_name = type_name.upper()
+        if type_name in ("VARCHAR", "CHAR", "VARBINARY", "NVARCHAR", "NCHAR"):
+            if max_length == -1:
+                return f"{type_name}(MAX)"
+            return f"{type_name}({max_length // 2 if type_name.startswith('N') else max_length})"
+        if type_name in ("DECIMAL", "NUMERIC"):
+            return f"{type_name}({precision},{scale})"
+        return type_name
+
+    def _create_database(self):
+        with ConnectionPool.lease() as conn:
+            conn.autocommit = True
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                IF DB_ID('{settings.MAIN_DB_NAME}') IS NULL
+                CREATE DATABASE [{settings.MAIN_DB_NAME}]
+            """)
+
+    def _create_schema(self, cursor, schema_name):
+        cursor.execute("SELECT 1 FROM sys.schemas WHERE name = ?", schema_name)
+        if not cursor.fetchone():
+            cursor.execute(f"CREATE SCHEMA [{schema_name}]")
+
+    def _create_table(self, cursor, schema_name, table_name, columns, type_map):
+        col_defs = ", ".join(self.column_definitions(columns, type_map))
+        cursor.execute(f"""
+            IF NOT EXISTS (
+                SELECT 1 FROM sys.tables t
+                JOIN sys.schemas s ON t.schema_id = s.schema_id
+                WHERE s.name = ? AND t.name = ?
+            )
+            BEGIN
+                CREATE TABLE {self.qualified_name(schema_name, table_name)} ({col_defs})
+            END
+        """, schema_name, table_name)
+
+    def _drop_table(self, cursor, schema_name, table_name):
+        table = self.qualified_name(schema_name, table_name)
+        cursor.execute(f"IF OBJECT_ID(N'{table}', N'U') IS NOT NULL DROP TABLE {table}")
+
+    def is_transient(self, error):
+        return isinstance(error, pyodbc.Error) and bool(error.args) and error.args[0] in self.TRANSIENT_SQLSTATES
+
+    def begin(self, cursor, schema_name, table_name, columns, type_map):
+        super().begin(cursor, schema_name, table_name, columns, type_map)
+        self._insert_sql = f"""
+            INSERT INTO {self._table}
+            ({', '.join(self.quote(col) for col in self._columns)})
+            VALUES ({', '.join(['?'] * len(self._columns))})
+        """
+        # Bind parameters with the declared column types instead of letting the
+        # driver guess them from the first row
+        cursor.setinputsizes([self.input_size(type_map[col]) for col in self._columns])
+        cursor.fast_executemany = True
+
+    @staticmethod
+    def input_size(sql_type):
+        """setinputsizes entry for a column type: an ODBC type or (type, size, digits)"""
+        base, _, args = sql_type.partition("(")
+        length = args.rstrip(")")
+        length = int(length) if length.isdigit() else 0  # 0 = (MAX)
+        return {
+            "VARCHAR": (pyodbc.SQL_VARCHAR, length, 0),
+            "NVARCHAR": (pyodbc.SQL_WVARCHAR, length, 0),
+            "SMALLINT": pyodbc.SQL_SMALLINT,
+            "INT": pyodbc.SQL_INTEGER,
+            "BIGINT": pyodbc.SQL_BIGINT,
+            "FLOAT": pyodbc.SQL_DOUBLE,
+            "DATE": pyodbc.SQL_TYPE_DATE,
+            "DATETIME2": (pyodbc.SQL_TYPE_TIMESTAMP, 27, 7),
+            "TIME": (pyodbc.SQL_SS_TIME2, 16, 7),
+        }.get(base.upper())
+
+    def _write(self, cursor, chunk_df):
+        data_chunk = marshal_rows(chunk_df, self._type_map)
+        cursor.executemany(self._insert_sql, data_chunk)
+        return len(data_chunk)
+
+
+class PostgresCopyLoader(BulkLoader):
+    """PostgreSQL COPY FROM STDIN, streaming each block as CSV"""
+    name = "postgres_copy"
+    placeholder = "%s"
+    TYPE_MAP = {
+        "NVARCHAR": "VARCHAR",
+        "DATETIME2": "TIMESTAMP",
+        "FLOAT": "DOUBLE PRECISION",
+        "BIT": "BOOLEAN",
+        "INT": "INTEGER",
+    }
+
+    def connect(self):
+        return psycopg2.connect(self._dsn())
+
+    @staticmethod
+    def _dsn():
+        url = make_url(settings.BULK_LOAD_DSN or settings.DATABASE_URL).set(drivername="postgresql")
+        return url.render_as_string(hide_password=False)
+
+    def catalog_key(self):
+        return (self.name, self._dsn())
+
+    def read_catalog(self, cursor, schema_names):
+        cursor.execute("""
+            SELECT n.nspname, c.relname, a.attname, format_type(a.atttypid, a.atttypmod)
+            FROM pg_namespace n
+            LEFT JOIN pg_class c ON c.relnamespace = n.oid AND c.relkind IN ('r', 'p')
+            LEFT JOIN pg_attribute a ON a.attrelid = c.oid AND a.attnum > 0 AND NOT a.attisdropped
+            WHERE n.nspname = ANY(%s)
+            ORDER BY n.nspname, c.relname, a.attnum
+        """, (list(schema_names),))
+        catalog = {}
+        for schema_name, table_name, column, type_name in cursor.fetchall():
+            tables = catalog.setdefault(schema_name, {})
+            if table_name is not None:
+                columns = tables.setdefault(table_name, {})
+                if column is not None:
+                    columns[column] = type_name.upper()
+        return catalog
+
+    def is_transient(self, error):
+        # Includes lost connections, serialization failures and deadlocks
+        return isinstance(error, psycopg2.OperationalError)
+
+    def column_type(self, sql_type):
+        base, _, args = sql_type.partition("(")
+        if args.upper() == "MAX)":
+            return "TEXT"
+        base = self.TYPE_MAP.get(base.upper(), base)
+        return f"{base}({args}" if args else base
+
+    def _write(self, cursor, chunk_df):
+        buffer = io.StringIO()
+        # COPY cannot parse "0 days 08:30:00"; write SAS times as times of day
+        times = {col: marshal_column(series) for col, series in chunk_df.items()
+                 if pd.api.types.is_timedelta64_dtype(series.dtype)}
+        if times:
+            chunk_df = chunk_df.assign(**times)
+        chunk_df.to_csv(buffer, index=False, header=False)
+        buffer.seek(0)
+        columns = ", ".join(self.quote(col) for col in self._columns)
+        cursor.copy_expert(f"COPY {self._table} ({columns}) FROM STDIN WITH (FORMAT csv)", buffer)
+        return len(chunk_df)
+
+
+class SqliteLoader(BulkLoader):
+    """Local SQLite file for development runs; schemas become table-name prefixes"""
+    name = "sqlite"
+
+    def connect(self):
+        return sqlite3.connect(settings.SQLITE_PATH, timeout=settings.AZURE_DOWNLOAD_TIMEOUT)
+
+    def qualified_name(self, schema_name, table_name):
+        return self.quote(f"{schema_name}.{table_name}")
+
+    def catalog_key(self):
+        return (self.name, os.path.abspath(settings.SQLITE_PATH))
+
+    def read_catalog(self, cursor, schema_names):
+        cursor.execute("""
+            SELECT m.name, p.name, p.type
+            FROM sqlite_master m JOIN pragma_table_info(m.name) p
+            WHERE m.type = 'table'
+            ORDER BY m.name, p.cid
+        """)
+        rows = cursor.fetchall()
+        # No real schemas: every one "exists", its tables are the "<schema>." prefixed ones
+        catalog = {schema_name: {} for schema_name in schema_names}
+        for qualified, column, type_name in rows:
+            for schema_name in schema_names:
+                if qualified.startswith(f"{schema_name}."):
+                    table_name = qualified[len(schema_name) + 1:]
+                    catalog[schema_name].setdefault(table_name, {})[column] = type_name.upper()
+        return catalog
+
+    def column_type(self, sql_type):
+        return "TEXT" if sql_type.upper().endswith("(MAX)") else sql_type
+
+    def is_transient(self, error):
+        return isinstance(error, sqlite3.OperationalError) and ("locked" in str(error) or "busy" in str(error))
+
+    def _create_schema(self, cursor, schema_name):
+        pass
+
+    def begin(self, cursor, schema_name, table_name, columns, type_map):
+        super().begin(cursor, schema_name, table_name, columns, type_map)
+        self._insert_sql = (
+            f"INSERT INTO {self._table} ({', '.join(self.quote(col) for col in self._columns)}) "
+            f"VALUES ({', '.join(['?'] * len(self._columns))})"
+        )
+
+    def _write(self, cursor, chunk_df):
+        data_chunk = marshal_rows(chunk_df, self._type_map)
+        cursor.executemany(self._insert_sql, data_chunk)
+        return len(data_chunk)
+
+
+LOADERS = {
+    loader.name: loader
+    for loader in (ExecuteManyLoader, PostgresCopyLoader, SqliteLoader)
+}
+
+
+def create_loader(name: str = None) -> BulkLoader:
+    """New loader instance for the configured (or named) backend"""
+    name = name or settings.BULK_LOADER
+    try:
+        return LOADERS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown bulk loader '{name}', expected one of {sorted(LOADERS)}")
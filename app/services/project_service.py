@@ -1,18 +1,20 @@
 import os
-import shutil
 import zipfile
 import re
-import tempfile
-from typing import List, Tuple, Optional
+from contextlib import ExitStack
+from typing import List, Optional
 from sqlalchemy.orm import Session
 from app.models.user import Project
 from app.schemas.project import ProjectCreate
-from app.utils.azure_blob import upload_to_azure_blob, upload_files_in_parallel
+from app.utils.azure_blob import (
+    UploadResult, list_blob_properties, open_blob, stream_to_azure_blob, upload_streams_in_parallel,
+)
 from app.core.config import settings
+from app.services import chunked_upload
 from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
 import logging
 import time
-from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 # Set up logging to file
@@ -27,6 +29,9 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+# File types accepted for upload
+UPLOAD_EXTENSIONS = ('.zip', '.sas7bdat', '.xlsx')
+
 def get_project(db: Session, ProjectNumber: str):
     return db.query(Project).filter(Project.ProjectNumber == ProjectNumber).first()
 def get_all_projects(db: Session):
@@ -44,25 +49,146 @@ def sanitize_filename(filename: str) -> str:
     """Sanitize filename to prevent path traversal and invalid characters."""
     return re.sub(r'[^\w\.\-]', '_', filename)
 
+ADAM_FILE_PATTERN = re.compile(r'^ad[a-z]{1,3}\d*\.sas7bdat$')  # adsl, adae, adlb2, ...
+SDTM_FILE_PATTERN = re.compile(r'^(supp.*|[a-z]{2,3}\d*)\.sas7bdat$')  # dm, ae, lb1, suppdm, ...
+
 def classify_sas_file(filename: str) -> str:
     """Classify SAS files as ADAM or SDTM"""
     filename = filename.lower()
-    if re.match(r'^ad[a-z]{1,3}\.sas7bdat$', filename) or re.match(r'^ad[a-z]{1,3}\d+\.sas7bdat$', filename):
+    if ADAM_FILE_PATTERN.match(filename):
         return "ADAM"
-    if filename.startswith('supp') and filename.endswith('.sas7bdat'):
-        return "SDTM"
-    if re.match(r'^[a-z]{2,3}\.sas7bdat$', filename) or re.match(r'^[a-z]{2,3}\d+\.sas7bdat$', filename):
+    if SDTM_FILE_PATTERN.match(filename):
         return "SDTM"
     return None
 
-def process_uploaded_file(ProjectNumber: str, uploaded_files: List[UploadFile]) -> int:
+def dataset_blob_path(ProjectNumber: str, member_name: str) -> Optional[str]:
+    """Where the importer looks for a SAS dataset: <BASE_BLOB_PATH>/<ProjectNumber>/<ADAM|SDTM>/; None if unclassified"""
+    name = member_name.replace("\\", "/").rsplit("/", 1)[-1]
+    file_type = classify_sas_file(name)
+    if not file_type:
+        return None
+    return f"{settings.BASE_BLOB_PATH}/{ProjectNumber}/{file_type}/{sanitize_filename(name)}"
+
+# Blob metadata holding the CRC-32 of the ZIP member a dataset was extracted from
+ZIP_CRC_METADATA = "zip_crc32"
+
+def extracted_from(blob, info: zipfile.ZipInfo) -> bool:
+    """True when a listed dataset blob was extracted from a member with this size and CRC-32"""
+    metadata = getattr(blob, "metadata", None) or {}
+    return blob.size == info.file_size and metadata.get(ZIP_CRC_METADATA) == f"{info.CRC:08x}"
+
+def extract_zip_to_blob(ProjectNumber: str, archive, skip_existing: bool = False) -> List[UploadResult]:
     """
-    Process multiple uploaded files (ZIP, SAS, or Excel) and upload them to Azure Blob Storage.
-    Returns 1 if at least one file was processed and uploaded, else 0.
+    Stream the SAS datasets of a ZIP archive (any seekable binary file) into
+    <BASE_BLOB_PATH>/<ProjectNumber>/<ADAM|SDTM>/, where the importer picks them up.
+
+    Members are decompressed read by read while they upload, several at once;
+    nothing is extracted to local disk. Members identical to the stored dataset
+    are not committed again (see upload_stream). Each dataset records the
+    CRC-32 of its member, which zipfile verified while reading it. skip_existing
+    is for an archive that was itself deduplicated, so it was extracted before:
+    members whose dataset holds the same size and CRC-32 are then not even
+    decompressed; the others are compared by MD5 as usual.
+    Returns one UploadResult per dataset.
+    """
+    start_time = time.time()
+    results, uploads, metadata = [], {}, {}
+    existing = {}
+    if skip_existing:
+        existing = list_blob_properties(f"{settings.BASE_BLOB_PATH}/{ProjectNumber}/")
+    with zipfile.ZipFile(archive) as zip_ref, ExitStack() as stack:
+        for info in zip_ref.infolist():
+            if info.is_dir():
+                continue
+            blob_path = dataset_blob_path(ProjectNumber, info.filename)
+            if blob_path is None:
+                logger.debug(f"[DEBUG] Skipping unclassified ZIP member: {info.filename}")
+                continue
+            if blob_path in uploads:
+                logger.warning(f"[WARNING] Skipping duplicate ZIP member: {info.filename}")
+                continue
+            if blob_path in existing and extracted_from(existing[blob_path], info):
+                results.append(UploadResult(blob_path, info.file_size, deduplicated=True))
+                continue
+            try:
+                uploads[blob_path] = stack.enter_context(zip_ref.open(info))
+                metadata[blob_path] = {ZIP_CRC_METADATA: f"{info.CRC:08x}"}
+            except (RuntimeError, NotImplementedError, zipfile.BadZipFile) as e:
+                # Encrypted members, unsupported compression, corrupt headers
+                logger.warning(f"[WARNING] Cannot read ZIP member {info.filename}: {str(e)}")
+                results.append(UploadResult(blob_path, error=str(e)))
+        results.extend(upload_streams_in_parallel(uploads.items(), metadata=metadata))
+    uploaded = sum(result.ok for result in results)
+    deduplicated = sum(result.deduplicated for result in results)
+    logger.debug(f"[DEBUG] Extracted {uploaded}/{len(results)} SAS datasets from ZIP ({deduplicated} unchanged) in {time.time() - start_time:.2f} seconds")
+    return results
+
+def extract_uploaded_zip(ProjectNumber: str, blob_raw_path: str, size_bytes: Optional[int] = None,
+                         skip_existing: bool = False) -> List[str]:
+    """Extract a ZIP already in blob storage (read with ranged downloads); blob paths of its datasets"""
+    try:
+        with open_blob(blob_raw_path, size_bytes) as archive:
+            results = extract_zip_to_blob(ProjectNumber, archive, skip_existing)
+    except zipfile.BadZipFile as e:
+        logger.warning(f"[WARNING] Not a valid ZIP archive: {blob_raw_path} ({str(e)})")
+        return []
+    return [result.blob_path for result in results if result.ok]
+
+def raw_blob_path(ProjectNumber: str, filename: str) -> str:
+    return f"raw/{ProjectNumber}/{sanitize_filename(filename)}"
+
+async def stream_uploaded_file(ProjectNumber: str, filename: str, chunks, content_md5: Optional[str] = None) -> dict:
     """
-    IsDatasetUploaded = False
-    # processed_files = []
+    Upload one file from an async byte stream (a raw request body) to raw/<ProjectNumber>/,
+    staging blocks as they arrive. Nothing is written to local disk.
 
+    content_md5 (the client's base64 MD5 of the file, optional) is only checked:
+    a body that does not hash to it raises ChecksumMismatch and is not committed.
+    Deduplication compares the body's own MD5 with the stored blob's.
+    """
+    if not filename.lower().endswith(UPLOAD_EXTENSIONS):
+        raise ValueError(f"Unsupported file type: {filename}")
+    blob_raw_path = raw_blob_path(ProjectNumber, filename)
+    start_time = time.time()
+    result = await stream_to_azure_blob(blob_raw_path, chunks, content_md5)
+    logger.debug(f"[DEBUG] Streamed '{filename}' ({result.size_bytes} bytes, deduplicated={result.deduplicated}) to {blob_raw_path} in {time.time() - start_time:.2f} seconds")
+    extracted = []
+    if filename.lower().endswith('.zip'):
+        extracted = await run_in_threadpool(
+            extract_uploaded_zip, ProjectNumber, blob_raw_path, result.size_bytes, result.deduplicated
+        )
+    return {
+        "blob_path": blob_raw_path,
+        "size_bytes": result.size_bytes,
+        "content_md5": result.content_md5,
+        "deduplicated": result.deduplicated,
+        "extracted": extracted,
+    }
+
+def start_chunked_upload(ProjectNumber: str, filename: str, size_bytes: int, chunk_size_mb: Optional[int] = None,
+                         content_md5: Optional[str] = None):
+    """Open a resumable chunked upload of one file to raw/<ProjectNumber>/ (see chunked_upload.py)."""
+    if not filename.lower().endswith(UPLOAD_EXTENSIONS):
+        raise ValueError(f"Unsupported file type: {filename}")
+    return chunked_upload.registry.create(
+        ProjectNumber, filename, raw_blob_path(ProjectNumber, filename), size_bytes, chunk_size_mb, content_md5
+    )
+
+def upload_report(results: List[UploadResult]) -> dict:
+    """Blob paths by outcome, for the create/edit responses"""
+    return {
+        "uploaded_files": [result.blob_path for result in results if result.ok and not result.deduplicated],
+        "deduplicated_files": [result.blob_path for result in results if result.deduplicated],
+        "failed_files": [result.blob_path for result in results if not result.ok],
+    }
+
+def upload_project_files(ProjectNumber: str, uploaded_files: List[UploadFile]) -> List[UploadResult]:
+    """
+    Upload multiple files (ZIP, SAS, or Excel) to raw/<ProjectNumber>/ in Azure Blob Storage,
+    and the SAS datasets inside ZIP files to their ADAM/SDTM folders.
+    Returns one UploadResult per file and per extracted dataset.
+    """
+    results = []
     try:
         # Start time for full process
         start_time_total = time.time()
@@ -70,126 +196,47 @@ def process_uploaded_file(ProjectNumber: str, uploaded_files: List[UploadFile])
 
         if not uploaded_files:
             logger.warning("No files were uploaded.")
-            return 0
-
-        # Create a temporary directory to store all files
-        tmpdirname = tempfile.mkdtemp()
-        logger.debug(f"[DEBUG] Created temporary directory: {tmpdirname}")
+            return results
 
+        # Stream straight from the uploads to blob storage, several files at once, no local copy
+        uploads = {}
         for uploaded_file in uploaded_files:
             if uploaded_file.filename:
-                file_path = os.path.join(tmpdirname, uploaded_file.filename)
-                logger.debug(f"[DEBUG] Saving file: {file_path}")
-
-                # Save the file locally
-                with open(file_path, "wb") as f:
-                    shutil.copyfileobj(uploaded_file.file, f)
-
                 # Check file type
-                if uploaded_file.filename.lower().endswith(('.zip', '.sas7bdat', '.xlsx')):
-                    start_duration=time.time()
-                    sanitized_name = sanitize_filename(uploaded_file.filename)
-                    blob_raw_path = f"raw/{ProjectNumber}/{sanitized_name}"
-
-                    if upload_to_azure_blob(blob_raw_path, file_path):
-                        end_duration=time.time()
-                        total=end_duration - start_duration
-                        logger.debug(f"[DEBUG] File '{uploaded_file.filename}' uploaded successfully in {total:.2f} seconds.")
-                        IsDatasetUploaded = True
-                    else:
-                        logger.warning(f"[WARNING] Failed to upload file: {uploaded_file.filename}")
-                else:
+                if not uploaded_file.filename.lower().endswith(UPLOAD_EXTENSIONS):
                     logger.warning(f"[WARNING] Unsupported file type: {uploaded_file.filename}")
-        # else:
-        #     logger.error(f"[ERROR] Failed to upload ZIP file: {file_path}")
-        #     raise Exception("Failed to upload ZIP file")
-
-        # # Track time for extracting ZIP
-        # extract_start = time.time()
-        # if uploaded_file.filename.lower().endswith('.zip'):
-        #     with zipfile.ZipFile(file_path, 'r') as zip_ref:
-        #         zip_ref.extractall(tmpdirname)
-        #     extract_end = time.time()
-        #     extract_duration = extract_end - extract_start
-        #     logger.debug(f"[DEBUG] ZIP extraction completed in {extract_duration:.2f} seconds")
-
-        #     # Upload all extracted files to application/<project_no>/Extracted/
-        #     # extracted_files = []
-        #     for root, _, files in os.walk(tmpdirname):
-        #         for name in files:
-        #             if not name.lower().endswith('.zip'):
-        #                 extracted_upload_start=time.time()
-        #                 src_path = os.path.join(root, name)
-        #                 relative_path = os.path.relpath(src_path, tmpdirname)
-        #                 blob_app_path = f"application/{project_no}/Extracted/{relative_path}"
-        #                 # extracted_files.append(relative_path)
-        #                 if upload_to_azure_blob(blob_app_path, src_path):
-        #                 # logger.debug(f"[DEBUG] Uploaded file: {src_path} to {blob_app_path}")
-        #                     extracted_upload_end = time.time()
-        #                     extracted_duration = extracted_upload_end - extracted_upload_start
-        #                     logger.debug(f"[DEBUG] extracted uploaded to Azure in {extracted_duration:.2f} seconds")
-
-
-            # if extracted_files:
-            #     logger.debug(f"[DEBUG] Found {len(extracted_files)} extracted files")
-            #     extracted_files_to_upload = []
-            #     for src_path in extracted_files:
-            #         sanitized_name = sanitize_filename(os.path.basename(src_path))
-            #         extracted_blob_path = f"application/{project_no}/Extracted/{sanitized_name}"
-
-            #         extracted_files_to_upload.append((extracted_blob_path, src_path))
-
-            #     success_count, failed_count = upload_files_in_parallel(extracted_files_to_upload)
-            #     logger.debug(f"[DEBUG] Uploaded {success_count} extracted files to Extracted folder")
-
-        # elif uploaded_file.filename.lower().endswith('.sas7bdat'):
-        #     # If it's not a ZIP, just classify and upload directly
-        #     file_type = classify_sas_file(uploaded_file.filename)
-        #     if file_type:
-        #         sanitized_name = sanitize_filename(uploaded_file.filename)
-        #         blob_app_path = f"application/{project_no}/{sanitized_name}"
-        #         if upload_to_azure_blob(blob_app_path, file_path):
-        #             logger.debug(f"[DEBUG] Uploaded non-ZIP file to raw folder: {blob_app_path}")
-        #             is_uploaded = 1
-
-        # Classify and move files from Extracted to ADAM/SDTM
-        # if uploaded_file.filename.lower().endswith('.zip'):
-        #     # Re-upload the files to ADAM/SDTM after classification
-        #     for root, _, files in os.walk(tmpdirname):
-        #         for name in files:
-        #             if name.lower().endswith('.sas7bdat'):
-        #                 file_type = classify_sas_file(name)
-        #                 if file_type:
-        #                     src_path = os.path.join(root, name)
-        #                     processed_files.append((file_type, src_path))
-
-        #     if processed_files:
-        #         is_uploaded = 1
-        #         files_to_upload = []
-
-        #         for file_type, src_path in processed_files:
-        #             sanitized_name = sanitize_filename(os.path.basename(src_path))
-        #             final_blob_path = f"application/{project_no}/{file_type}/{sanitized_name}"
-        #             files_to_upload.append((final_blob_path, src_path))
-
-        #         success_count, failed_count = upload_files_in_parallel(files_to_upload)
-        #         logger.debug(f"[DEBUG] Parallel upload completed. Success: {success_count}, Failed: {failed_count}")
-
-        #         for i, (blob_path, local_path) in enumerate(files_to_upload):
-        #             if i < success_count:
-        #                 os.remove(local_path)
-        #                 logger.debug(f"[DEBUG] Deleted local file: {local_path}")
+                    continue
+                blob_raw_path = raw_blob_path(ProjectNumber, uploaded_file.filename)
+                if blob_raw_path in uploads:
+                    logger.warning(f"[WARNING] Skipping duplicate file in request: {uploaded_file.filename}")
+                    continue
+                uploads[blob_raw_path] = uploaded_file.file
+
+        for result in upload_streams_in_parallel(uploads.items()):
+            results.append(result)
+            if result.deduplicated:
+                logger.debug(f"[DEBUG] File '{result.blob_path}' is unchanged, not uploaded again.")
+            elif result.ok:
+                logger.debug(f"[DEBUG] File '{result.blob_path}' ({result.size_bytes} bytes) uploaded successfully in {result.duration_seconds:.2f} seconds.")
+            else:
+                logger.warning(f"[WARNING] Failed to upload file: {result.blob_path} ({result.error})")
+                continue
+            # Archives: stream their SAS datasets to ADAM/SDTM so they can be imported right away
+            if result.blob_path.lower().endswith('.zip'):
+                archive = uploads[result.blob_path]
+                try:
+                    archive.seek(0)
+                    results.extend(extract_zip_to_blob(ProjectNumber, archive, skip_existing=result.deduplicated))
+                except zipfile.BadZipFile as e:
+                    logger.warning(f"[WARNING] Not a valid ZIP archive: {result.blob_path} ({str(e)})")
 
         # Total time taken
         total_end = time.time()
         total_duration = total_end - start_time_total
         logger.debug(f"[DEBUG] Total upload duration: {total_duration:.2f} seconds")
 
-        # Clean up temp directory
-        shutil.rmtree(tmpdirname)
-
-        return IsDatasetUploaded
+        return results
 
     except Exception as e:
         logger.error(f"Error processing file: {str(e)}", exc_info=True)
-        raise
\ No newline at end of file
+        raise
@@ -0,0 +1,32 @@
+# app/services/row_marshalling.py
+import numpy as np
+import pandas as pd
+
+
+def marshal_column(series: pd.Series, sql_type: str = None) -> np.ndarray:
+    """Convert one DataFrame column into an object array ready for the DB driver.
+
+    NaN/NaT become None via a single mask and datetime64 values are turned into
+    Python datetimes in bulk instead of cell by cell. Columns typed DATE become
+    dates, timedelta64 (SAS times) become times of day.
+    """
+    mask = series.isna().to_numpy()
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        if sql_type == "DATE":
+            values = np.array(series.dt.date, dtype=object)
+        else:
+            values = np.array(series.dt.to_pydatetime(), dtype=object)
+    elif pd.api.types.is_timedelta64_dtype(series.dtype):
+        values = np.array((series + pd.Timestamp(0)).dt.time, dtype=object)
+    else:
+        values = series.to_numpy(dtype=object, copy=True)
+    if mask.any():
+        values[mask] = None
+    return values
+
+
+def marshal_rows(chunk_df: pd.DataFrame, type_map: dict = None) -> list:
+    """Build the row tuples for cursor.executemany from a DataFrame block"""
+    type_map = type_map or {}
+    columns = [marshal_column(series, type_map.get(col)) for col, series in chunk_df.items()]
+    return list(zip(*columns))
@@ -0,0 +1,155 @@
+# app/services/sidecar_cache.py
+import glob
+import hashlib
+import json
+import logging
+import os
+
+import pandas as pd
+
+from app.core.config import settings
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional: only needed when SAS_SIDECAR_CACHE is on
+    pa = pq = None
+
+logger = logging.getLogger("sas_importer")
+
+SIDECAR_SUFFIX = ".parquet"
+# Footer key holding the column order, SQL types and row count of a sidecar
+LAYOUT_KEY = b"sas_importer.layout"
+
+
+def sidecar_enabled() -> bool:
+    if not settings.SAS_SIDECAR_CACHE:
+        return False
+    if pa is None:
+        logger.warning("SAS_SIDECAR_CACHE is on but pyarrow is not installed; decoding SAS files directly")
+        return False
+    return True
+
+
+def sidecar_path(source: dict, variant: str = None) -> str:
+    """Cache file for one blob version: <hash of blob name>-<etag>[-<variant>].parquet
+
+    variant tells apart sidecars of the same blob decoded differently: the import
+    settings digest, which covers the import profile and the type inference settings.
+    """
+    name_hash = hashlib.sha1(source["blob_name"].encode("utf-8")).hexdigest()[:16]
+    etag = "".join(ch for ch in (source["etag"] or "") if ch.isalnum())
+    suffix = f"-{variant}" if variant else ""
+    return os.path.join(settings.SAS_SIDECAR_DIR, f"{name_hash}-{etag}{suffix}{SIDECAR_SUFFIX}")
+
+
+def has_sidecar(source: dict, variant: str = None) -> bool:
+    return bool(source and source.get("etag")) and sidecar_enabled() and os.path.exists(sidecar_path(source, variant))
+
+
+def is_sidecar(path: str) -> bool:
+    return path.endswith(SIDECAR_SUFFIX)
+
+
+def arrow_type(kind: str):
+    return {
+        "string": pa.string(),
+        "number": pa.float64(),
+        "date": pa.date32(),
+        "datetime": pa.timestamp("us"),
+        "time": pa.time64("us"),
+    }[kind]
+
+
+def arrow_table(chunk_df, schema):
+    """Arrow table for one block; timedelta64 SAS times are stored as time64"""
+    arrays = []
+    for field in schema:
+        series = chunk_df[field.name]
+        if pa.types.is_time(field.type) and pd.api.types.is_timedelta64_dtype(series.dtype):
+            # Arrow has no duration -> time64 cast; go through the microsecond count
+            micros = series.to_numpy(dtype="timedelta64[us]").view("int64")
+            arrays.append(pa.array(micros, mask=series.isna().to_numpy()).cast(field.type))
+        else:
+            # safe=False: SAS datetimes carry sub-microsecond float noise
+            arrays.append(pa.array(series, type=field.type, from_pandas=True, safe=False))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def to_pandas(batch) -> pd.DataFrame:
+    """Block with the dtypes iter_sas_chunks produces: datetime64 dates, timedelta64 times"""
+    columns = {}
+    for field, array in zip(batch.schema, batch.columns):
+        if pa.types.is_time(field.type):
+            array = array.cast(pa.int64()).cast(pa.duration("us"))
+        columns[field.name] = array
+    return pa.table(columns).to_pandas(date_as_object=False)
+
+
+def write_sidecar(path: str, columns, kinds: dict, chunks, layout) -> int:
+    """Write DataFrame blocks to a compressed Parquet sidecar, one row group per block.
+
+    layout is called once every block is written and returns the SQL type per
+    column, which is stored in the file footer. The file only appears under
+    its final name when complete; older versions of the same blob are removed.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    schema = pa.schema([(col, arrow_type(kinds[col])) for col in columns])
+    partial_path = f"{path}.partial"
+    rows = 0
+    try:
+        with pq.ParquetWriter(partial_path, schema, compression=settings.SAS_SIDECAR_COMPRESSION) as writer:
+            for chunk_df in chunks:
+                writer.write_table(arrow_table(chunk_df, schema))
+                rows += len(chunk_df)
+            writer.add_key_value_metadata({
+                LAYOUT_KEY: json.dumps({"columns": list(columns), "types": layout(), "rows": rows})
+            })
+        os.replace(partial_path, path)
+    except Exception:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+    prefix = os.path.basename(path).split("-")[0]
+    for stale in glob.glob(os.path.join(os.path.dirname(path), f"{prefix}-*{SIDECAR_SUFFIX}")):
+        if stale != path:
+            os.remove(stale)
+    logger.info(f"Wrote sidecar {path} ({rows} rows, {os.path.getsize(path) / 1024 / 1024:.2f} MB)")
+    return rows
+
+
+def read_sidecar_layout(path: str):
+    """(columns, type_map, row count) from a sidecar footer"""
+    layout = json.loads(pq.read_metadata(path).metadata[LAYOUT_KEY])
+    return layout["columns"], layout["types"], layout["rows"]
+
+
+def iter_sidecar_chunks(path: str, chunk_size: int, row_offset: int = 0, row_limit: int = 0):
+    """Yield DataFrame blocks of at most chunk_size rows, optionally for one row range"""
+    parquet_file = pq.ParquetFile(path)
+    if settings.SAS_COMPACT_STRINGS:
+        # String columns come back dictionary-encoded, as iter_sas_chunks yields them
+        strings = [field.name for field in parquet_file.schema_arrow if pa.types.is_string(field.type)]
+        parquet_file = pq.ParquetFile(path, read_dictionary=strings)
+    end = row_offset + row_limit if row_limit else parquet_file.metadata.num_rows
+    # Only read the row groups that overlap the range
+    row_groups, first_row, start = [], None, 0
+    for i in range(parquet_file.num_row_groups):
+        group_rows = parquet_file.metadata.row_group(i).num_rows
+        if start + group_rows > row_offset and start < end:
+            first_row = start if first_row is None else first_row
+            row_groups.append(i)
+        start += group_rows
+    if not row_groups:
+        return
+    skip, remaining = row_offset - first_row, end - row_offset
+    for batch in parquet_file.iter_batches(batch_size=chunk_size, row_groups=row_groups):
+        if skip >= batch.num_rows:
+            skip -= batch.num_rows
+            continue
+        batch = batch.slice(skip, remaining)
+        skip = 0
+        remaining -= batch.num_rows
+        yield to_pandas(batch)
+        if remaining <= 0:
+            return
@@ -0,0 +1,156 @@
+# app/services/temporal.py
+"""SAS date, datetime and time values as numpy datetime64/timedelta64 columns.
+
+SAS stores dates as days and datetimes/times as seconds, all as doubles
+counted from 1960-01-01; the display format is the only hint of which one a
+column holds. SAS files are read with pyreadstat's own datetime conversion off
+(it builds a Python object per value, and reads date formats of datetime
+values such as DTDATE as days), and each block is converted here with integer
+arithmetic:
+
+    date      days                 -> datetime64[s] at midnight
+    datetime  seconds              -> datetime64[us]
+    dtdate    seconds (date shown) -> datetime64[s] at midnight
+    time      seconds              -> timedelta64[us] since midnight
+
+Missing and out-of-range values become NaT. Loaders turn these dtypes into
+driver objects only at the point of writing (row_marshalling, loaders).
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+# <FAMILY><width>.<decimals>, e.g. DATE9., YYMMDD10, DATETIME20.3, E8601DA
+SAS_FORMAT_PATTERN = re.compile(r"^([A-Z][A-Z0-9]*[A-Z])(\d+)?(?(2)(?:\.\d+)?$|$)")
+
+# Formats that display a SAS date value (days since 1960-01-01)
+SAS_DATE_FORMATS = frozenset([
+    "DATE", "DAY", "DDMMYY", "DDMMYYB", "DDMMYYC", "DDMMYYD", "DDMMYYN", "DDMMYYP", "DDMMYYS",
+    "DOWNAME", "EURDFDD", "EURDFDE", "EURDFDN", "EURDFDWN", "EURDFMN", "EURDFMY", "EURDFWDX",
+    "EURDFWKX", "JULDAY", "JULIAN", "MINGUO", "MMDDYY", "MMDDYYB", "MMDDYYC", "MMDDYYD",
+    "MMDDYYN", "MMDDYYP", "MMDDYYS", "MMYY", "MMYYC", "MMYYD", "MMYYN", "MMYYP", "MMYYS",
+    "MONNAME", "MONTH", "MONYY", "NENGO", "NLDATE", "NLDATEMN", "NLDATEW", "NLDATEWN",
+    "NLDATEYM", "NLDATEYQ", "NLDATEYR", "NLDATEYW", "PDJULG", "PDJULI", "QTR", "QTRR",
+    "WEEKDATE", "WEEKDATX", "WEEKDAY", "WEEKU", "WEEKV", "WEEKW", "WORDDATE", "WORDDATX",
+    "XYYMMDD", "YEAR", "YYMM", "YYMMC", "YYMMD", "YYMMN", "YYMMP", "YYMMS", "YYMMDD",
+    "YYMMDDB", "YYMMDDC", "YYMMDDD", "YYMMDDN", "YYMMDDP", "YYMMDDS", "YYMON", "YYQ",
+    "YYQC", "YYQD", "YYQN", "YYQP", "YYQS", "YYQR", "YYQRC", "YYQRD", "YYQRN", "YYQRP",
+    "YYQRS", "YYWEEKU", "YYWEEKV", "YYWEEKW", "E8601DA", "B8601DA", "IS8601DA", "ND8601DA",
+])
+# Formats that display a SAS datetime value (seconds since 1960-01-01 00:00)
+SAS_DATETIME_FORMATS = frozenset([
+    "DATETIME", "DATEAMPM", "MDYAMPM", "NLDATM", "NLDATMAP", "NLDATMW", "DTWKDATX",
+    "E8601DT", "E8601DX", "E8601DZ", "E8601LX", "B8601DT", "B8601DX", "B8601DZ", "B8601LX",
+    "IS8601DT", "IS8601DZ", "ND8601DT", "ND8601DZ",
+])
+# Formats that show only the date (or a coarser part) of a datetime value
+SAS_DTDATE_FORMATS = frozenset([
+    "DTDATE", "DTMONYY", "DTYEAR", "DTYYQC", "E8601DN", "B8601DN", "IS8601DN", "ND8601DN",
+])
+# Formats that display a SAS time value (seconds since midnight)
+SAS_TIME_FORMATS = frozenset([
+    "TIME", "TIMEAMPM", "HHMM", "HOUR", "MMSS", "TOD", "NLTIME", "NLTIMAP",
+    "E8601TM", "E8601TX", "E8601TZ", "E8601LZ", "B8601TM", "B8601TX", "B8601TZ", "B8601LZ",
+    "IS8601TM", "IS8601TZ", "IS8601LZ", "ND8601TM", "ND8601TZ",
+])
+SAS_TEMPORAL_FORMATS = SAS_DATE_FORMATS | SAS_DATETIME_FORMATS | SAS_DTDATE_FORMATS | SAS_TIME_FORMATS
+
+# 1960-01-01 relative to the numpy epoch (1970-01-01)
+SAS_EPOCH_DAYS = -3653
+SAS_EPOCH_SECONDS = SAS_EPOCH_DAYS * 86400
+# 0001-01-01 and 9999-12-31, the range Python's date and datetime can hold
+MIN_SAS_DAYS = -715509
+MAX_SAS_DAYS = 2936549
+
+
+def format_family(sas_format: str) -> str:
+    """DATE9. -> DATE, E8601DT19.3 -> E8601DT; None for an empty or odd format"""
+    match = SAS_FORMAT_PATTERN.match((sas_format or "").upper().rstrip("."))
+    return match.group(1) if match else None
+
+
+def temporal_class(sas_format: str) -> str:
+    """"date", "datetime", "dtdate" or "time" for a temporal format, else None"""
+    family = format_family(sas_format)
+    if family in SAS_DATE_FORMATS:
+        return "date"
+    if family in SAS_DATETIME_FORMATS:
+        return "datetime"
+    if family in SAS_DTDATE_FORMATS:
+        return "dtdate"
+    if family in SAS_TIME_FORMATS:
+        return "time"
+    return None
+
+
+def temporal_columns(meta) -> dict:
+    """{column: temporal class} for the numeric columns of a SAS file with a temporal format"""
+    variable_types = getattr(meta, "readstat_variable_types", {}) or {}
+    columns = {}
+    for col in meta.column_names:
+        if variable_types.get(col) == "string":
+            continue
+        cls = temporal_class(meta.original_variable_types.get(col))
+        if cls:
+            columns[col] = cls
+    return columns
+
+
+def _valid(values: np.ndarray, day_length: int = 1) -> np.ndarray:
+    """Finite values that fall on a day from MIN_SAS_DAYS to MAX_SAS_DAYS (in units of day_length)"""
+    with np.errstate(invalid="ignore"):
+        return (values >= MIN_SAS_DAYS * day_length) & (values < (MAX_SAS_DAYS + 1) * day_length)
+
+
+def sas_days_to_datetime64(values: np.ndarray) -> np.ndarray:
+    valid = _valid(values)
+    days = np.where(valid, np.floor(np.where(valid, values, 0)), 0).astype("int64") + SAS_EPOCH_DAYS
+    result = (days * 86400).view("datetime64[s]")
+    result[~valid] = np.datetime64("NaT", "s")
+    return result
+
+
+def sas_seconds_to_datetime64(values: np.ndarray) -> np.ndarray:
+    valid = _valid(np.round(values, 6), 86400)  # as rounded to microseconds below
+    micros = np.round(np.where(valid, values, 0) * 1_000_000).astype("int64") + SAS_EPOCH_SECONDS * 1_000_000
+    result = micros.view("datetime64[us]")
+    result[~valid] = np.datetime64("NaT", "us")
+    return result
+
+
+def sas_seconds_to_date64(values: np.ndarray) -> np.ndarray:
+    valid = _valid(values, 86400)
+    return sas_days_to_datetime64(np.where(valid, np.floor(np.where(valid, values, 0) / 86400), np.nan))
+
+
+def sas_seconds_to_timedelta64(values: np.ndarray) -> np.ndarray:
+    valid = np.isfinite(values)
+    # A time format on a datetime (or a duration over 24h) shows the time of day
+    micros = np.round(np.mod(np.where(valid, values, 0), 86400) * 1_000_000).astype("int64")
+    result = np.minimum(micros, 86400 * 1_000_000 - 1).view("timedelta64[us]")
+    result[~valid] = np.timedelta64("NaT", "us")
+    return result
+
+
+CONVERTERS = {
+    "date": sas_days_to_datetime64,
+    "datetime": sas_seconds_to_datetime64,
+    "dtdate": sas_seconds_to_date64,
+    "time": sas_seconds_to_timedelta64,
+}
+
+
+def convert_temporal(df: pd.DataFrame, columns: dict) -> pd.DataFrame:
+    """Replace raw SAS numbers in columns ({column: temporal class}) with datetime64/timedelta64"""
+    converted = {}
+    for col, cls in columns.items():
+        if col in df.columns:
+            values = df[col].to_numpy(dtype="float64", na_value=np.nan)
+            converted[col] = pd.Series(CONVERTERS[cls](values), index=df.index, name=col)
+    if not converted:
+        return df
+    df = df.copy(deep=False)
+    for col, series in converted.items():
+        df[col] = series
+    return df
@@ -0,0 +1,160 @@
+# app/services/type_inference.py
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger("sas_importer")
+
+# Longest declarable VARCHAR/NVARCHAR before falling back to (MAX)
+VARCHAR_MAX_LENGTH = 8000
+NVARCHAR_MAX_LENGTH = 4000
+INTEGER_TYPES = (
+    ("SMALLINT", -2**15, 2**15 - 1),
+    ("INT", -2**31, 2**31 - 1),
+    # Doubles hold integers exactly only up to 2**53
+    ("BIGINT", -2**53, 2**53),
+)
+TEMPORAL_SQL_TYPES = {"date": "DATE", "datetime": "DATETIME2", "time": "TIME"}
+NON_ASCII_PATTERN = r"[^\x00-\x7f]"
+LAYOUT_CACHE_SIZE = 256
+
+
+def is_integer_type(sql_type: str) -> bool:
+    return sql_type in {name for name, _, _ in INTEGER_TYPES}
+
+
+def varchar_type(length: int, unicode: bool) -> str:
+    base, limit = ("NVARCHAR", NVARCHAR_MAX_LENGTH) if unicode else ("VARCHAR", VARCHAR_MAX_LENGTH)
+    return f"{base}({max(1, length)})" if length <= limit else f"{base}(MAX)"
+
+
+@dataclass
+class ColumnProfile:
+    """Running statistics for one column, fed block by block.
+
+    kind is "string", "number", "date", "datetime" or "time" (see
+    converter.column_kinds); width is the SAS storage width in bytes.
+    """
+    kind: str
+    width: int = 0
+    non_null: int = 0
+    max_length: int = 0
+    non_ascii: bool = False
+    integral: bool = True
+    minimum: float = np.inf
+    maximum: float = -np.inf
+
+    def update(self, series: pd.Series):
+        if self.kind == "string":
+            self._update_string(series)
+        elif self.kind == "number":
+            self._update_number(series)
+
+    def _update_string(self, series):
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            # Compact strings (see compact_strings): measure each distinct value once
+            non_null = int(series.notna().sum())
+            values = pd.Series(series.cat.remove_unused_categories().cat.categories)
+        else:
+            values = series.dropna()
+            non_null = len(values)
+        if values.empty:
+            return
+        values = values.astype(str)
+        self.non_null += non_null
+        non_ascii = values.str.contains(NON_ASCII_PATTERN, regex=True)
+        if non_ascii.any():
+            self.non_ascii = True
+            # NVARCHAR lengths count UTF-16 code units, not characters
+            utf16 = values[non_ascii].map(lambda value: len(value.encode("utf-16-le")) // 2)
+            self.max_length = max(self.max_length, int(utf16.max()))
+        self.max_length = max(self.max_length, int(values.str.len().max()))
+
+    def _update_number(self, series):
+        values = series.to_numpy(dtype="float64", na_value=np.nan)
+        # inf is loaded as NULL (see iter_sas_chunks), so it does not count
+        values = values[np.isfinite(values)]
+        if not values.size:
+            return
+        self.non_null += values.size
+        self.integral = self.integral and bool(np.all(values == np.trunc(values)))
+        self.minimum = min(self.minimum, float(values.min()))
+        self.maximum = max(self.maximum, float(values.max()))
+
+    def sql_type(self) -> str:
+        if self.kind in TEMPORAL_SQL_TYPES:
+            return TEMPORAL_SQL_TYPES[self.kind]
+        if self.kind == "string":
+            return varchar_type(self.max_length, self.non_ascii)
+        if self.non_null and self.integral:
+            for name, low, high in INTEGER_TYPES:
+                if low <= self.minimum and self.maximum <= high:
+                    return name
+        return "FLOAT"
+
+    def metadata_type(self) -> str:
+        """Widest type the header allows, for when the data is not scanned"""
+        if self.kind == "string":
+            # A storage width in bytes is never fewer characters than it holds
+            return varchar_type(self.width, unicode=True)
+        if self.kind == "number":
+            return "FLOAT"
+        return self.sql_type()
+
+
+def profile_columns(kinds: dict, widths: dict = None) -> dict:
+    widths = widths or {}
+    return {col: ColumnProfile(kind, int(widths.get(col) or 0)) for col, kind in kinds.items()}
+
+
+def profile_chunks(profiles: dict, chunks):
+    """Pass DataFrame blocks through unchanged while feeding the profiles"""
+    for chunk_df in chunks:
+        for col, series in chunk_df.items():
+            profiles[col].update(series)
+        yield chunk_df
+
+
+def infer_sql_types(profiles: dict, chunks) -> dict:
+    """Feed DataFrame blocks through the profiles; returns the SQL type per column"""
+    for _ in profile_chunks(profiles, chunks):
+        pass
+    return {col: profile.sql_type() for col, profile in profiles.items()}
+
+
+def cast_integer_columns(chunk_df: pd.DataFrame, type_map: dict, columns) -> pd.DataFrame:
+    """Turn float64 columns typed as integers into nullable Int64 for the driver"""
+    integer_columns = {col: "Int64" for col in columns if is_integer_type(type_map[col])}
+    if not integer_columns:
+        return chunk_df
+    return chunk_df.astype(integer_columns)
+
+
+# Inferred layouts per dataset, so reloading a blob version (force, a second
+# target schema) does not scan the file again.
+_layout_cache = OrderedDict()
+_layout_lock = threading.Lock()
+
+
+def cached_layout(key):
+    if key is None:
+        return None
+    with _layout_lock:
+        layout = _layout_cache.get(key)
+        if layout is not None:
+            _layout_cache.move_to_end(key)
+        return layout
+
+
+def cache_layout(key, layout):
+    if key is None:
+        return
+    with _layout_lock:
+        _layout_cache[key] = layout
+        _layout_cache.move_to_end(key)
+        while len(_layout_cache) > LAYOUT_CACHE_SIZE:
+            _layout_cache.popitem(last=False)
@@ -1,9 +1,21 @@
-from azure.storage.blob import BlobServiceClient, BlobClient, BlobBlock
+from azure.core.exceptions import ResourceExistsError, ResourceNotFoundError
+from azure.storage.blob import BlobServiceClient, BlobClient, BlobBlock, ContentSettings
+from starlette.concurrency import run_in_threadpool
+from typing import Optional
+import base64
+import errno
+import hashlib
+import io
 import os
-import uuid
+import shutil
+import threading
 import logging
 import time
 from app.core.config import settings
+from app.core.metrics import BLOB_UPLOAD_MB_PER_SECOND
+from collections import deque
+from contextlib import ExitStack
+from dataclasses import dataclass
 from concurrent.futures import ThreadPoolExecutor
 
 # Set up logging to file
@@ -25,101 +37,512 @@ file_handler.setFormatter(formatter)
 # Add the handler to the logger
 logger.addHandler(file_handler)
 
-def upload_to_azure_blob(blob_path: str, local_path: str) -> bool:
+
+class ChecksumMismatch(ValueError):
+    """Uploaded bytes do not hash to the MD5 the client announced; nothing was committed"""
+
+
+_registry_lock = threading.Lock()
+_service_clients = {}  # connection string -> BlobServiceClient shared by the whole process
+_known_containers = set()  # (connection string, container name) known to exist
+
+
+def get_blob_service_client(conn_str: Optional[str] = None) -> BlobServiceClient:
+    """Process-wide client per connection string, so every upload reuses one HTTP connection pool."""
+    conn_str = conn_str or settings.AZURE_STORAGE_CONNECTION_STRING
+    if not conn_str:
+        raise ValueError("AZURE_STORAGE_CONNECTION_STRING is not set.")
+    with _registry_lock:
+        client = _service_clients.get(conn_str)
+        if client is None:
+            client = BlobServiceClient.from_connection_string(
+                conn_str,
+                retry_total=5,
+                retry_backoff_factor=0.8,
+                timeout=600  # 10 minutes
+            )
+            _service_clients[conn_str] = client
+    return client
+
+
+def get_container_client(container_name: Optional[str] = None):
+    """Client for the configured container; created if missing, checked once per process."""
+    container_name = container_name or settings.AZURE_STORAGE_CONTAINER_NAME
+    if not container_name:
+        raise ValueError("AZURE_STORAGE_CONTAINER_NAME is not set.")
+    blob_service_client = get_blob_service_client()
+    container_client = blob_service_client.get_container_client(container_name)
+    key = (settings.AZURE_STORAGE_CONNECTION_STRING, container_name)
+    if key not in _known_containers:
+        # Create container if it doesn't exist
+        if not container_client.exists():
+            try:
+                container_client.create_container()
+                logger.info(f"[INFO] Created container: {container_name}")
+            except ResourceExistsError:
+                pass
+        with _registry_lock:
+            _known_containers.add(key)
+    return container_client
+
+
+def forget_container(container_name: Optional[str] = None):
+    """Drop the cached existence of a container, so the next upload checks it again."""
+    container_name = container_name or settings.AZURE_STORAGE_CONTAINER_NAME
+    with _registry_lock:
+        _known_containers.discard((settings.AZURE_STORAGE_CONNECTION_STRING, container_name))
+
+
+class BandwidthLimiter:
     """
-    Uploads a local file to Azure Blob Storage.
-    
-    Args:
-        blob_path (str): The path in Azure Blob Storage where the file will be uploaded.
-        local_path (str): The local file path to upload.
-        
-    Returns:
-        bool: True if upload is successful, False otherwise.
+    Paces callers so that together they send at most `bytes_per_second`.
+
+    Each acquire reserves the next slot on a shared timeline and sleeps until
+    it starts, so every staging thread of every upload shares one budget.
     """
+
+    def __init__(self, bytes_per_second: float):
+        self.bytes_per_second = bytes_per_second
+        self._lock = threading.Lock()
+        self._next = time.monotonic()
+
+    def acquire(self, size: int):
+        with self._lock:
+            now = time.monotonic()
+            start = max(self._next, now)
+            self._next = start + size / self.bytes_per_second
+        if start > now:
+            time.sleep(start - now)
+
+
+_limiter = None
+
+
+def upload_bandwidth_limiter() -> Optional[BandwidthLimiter]:
+    """Process-wide limiter for BLOB_UPLOAD_MAX_MB_PER_SECOND, None when uncapped."""
+    global _limiter
+    rate = settings.BLOB_UPLOAD_MAX_MB_PER_SECOND * 1024 * 1024
+    if rate <= 0:
+        return None
+    with _registry_lock:
+        if _limiter is None or _limiter.bytes_per_second != rate:
+            _limiter = BandwidthLimiter(rate)
+        return _limiter
+
+
+def block_id_for(index: int, data: bytes) -> str:
+    """
+    Deterministic block ID: position plus the block's MD5, all the same length.
+
+    Re-uploading the same payload yields the same IDs, so a retry can skip the
+    blocks an earlier attempt already staged.
+    """
+    return f"{index:06d}-{hashlib.md5(data).hexdigest()}"
+
+
+def staged_block_ids(blob_client) -> set:
+    """IDs of the uncommitted blocks left on a blob by an earlier attempt."""
     try:
-        # Log start of upload
-        logger.debug(f"[DEBUG] Starting upload of {local_path} to {blob_path}")
-        start_time = time.time()
-
-        # Check if the file exists and is readable
-        if not os.path.exists(local_path):
-            logger.error(f"[ERROR] File not found: {local_path}")
-            return False
-
-        if not os.path.isfile(local_path):
-            logger.error(f"[ERROR] Not a file: {local_path}")
-            return False
-
-        # Get connection string from environment
-        conn_str = settings.AZURE_STORAGE_CONNECTION_STRING
-        if not conn_str:
-            logger.error("[ERROR] AZURE_STORAGE_CONNECTION_STRING is not set.")
-            return False
-
-        # Create a BlobServiceClient object using the connection string
-        blob_service_client = BlobServiceClient.from_connection_string(
-            conn_str,
-            retry_total=5,
-            retry_backoff_factor=0.8,
-            timeout=600  # 10 minutes
+        _, uncommitted = blob_client.get_block_list("uncommitted")
+    except ResourceNotFoundError:
+        return set()
+    return {block.id for block in uncommitted}
+
+
+class BlobBlockWriter:
+    """
+    Write-only file object that stages a blob block by block as data arrives.
+
+    Up to `concurrency` blocks are staged at once from a small thread pool, so
+    at most that many blocks (plus the one being filled) are held in memory and
+    nothing is written to local disk. Every block waits for its share of the
+    upload bandwidth cap first, if one is set. Blocks whose ID is in `staged` were
+    uploaded by an earlier attempt and are not sent again. The payload's MD5 is
+    computed on the way through; close() commits the block list with it as the
+    blob's Content-MD5 and returns it base64-encoded. A blob's Content-MD5 is
+    therefore always the server's own hash of what it holds.
+    """
+
+    def __init__(self, blob_client, block_size: Optional[int] = None, concurrency: Optional[int] = None, staged=()):
+        self.blob_client = blob_client
+        self.block_size = block_size or settings.BLOB_UPLOAD_BLOCK_SIZE_MB * 1024 * 1024
+        self.concurrency = max(1, concurrency or settings.BLOB_UPLOAD_CONCURRENCY)
+        self.staged = set(staged)
+        self.limiter = upload_bandwidth_limiter()
+        self.size = 0
+        self.skipped_blocks = 0
+        self.content_md5 = None
+        self.committed = False
+        self.closed = False
+        self._buffer = bytearray()
+        self._blocks = []
+        self._in_flight = deque()
+        self._md5 = hashlib.md5()
+        self._executor = (
+            ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="blob-stage")
+            if self.concurrency > 1 else None
         )
 
-        container_name = settings.AZURE_STORAGE_CONTAINER_NAME
-        if not container_name:
-            logger.error("[ERROR] AZURE_STORAGE_CONTAINER_NAME is not set.")
-            return False
+    def writable(self) -> bool:
+        return True
 
-        container_client = blob_service_client.get_container_client(container_name)
+    def write(self, data) -> int:
+        self._md5.update(data)
+        self._buffer += data
+        self.size += len(data)
+        while len(self._buffer) >= self.block_size:
+            self._stage(bytes(self._buffer[:self.block_size]))
+            del self._buffer[:self.block_size]
+        return len(data)
 
-        # Create container if it doesn't exist
-        if not container_client.exists():
-            container_client.create_container()
-            logger.info(f"[INFO] Created container: {container_name}")
+    def _stage(self, data: bytes):
+        block_id = block_id_for(len(self._blocks), data)
+        self._blocks.append(BlobBlock(block_id=block_id))
+        if block_id in self.staged:
+            self.skipped_blocks += 1
+            return
+        if self._executor is None:
+            self._send(block_id, data)
+            return
+        # Bounded: wait for the oldest block before queueing another
+        while len(self._in_flight) >= self.concurrency:
+            self._in_flight.popleft().result()
+        self._in_flight.append(self._executor.submit(self._send, block_id, data))
+
+    def _send(self, block_id: str, data: bytes):
+        if self.limiter is not None:
+            self.limiter.acquire(len(data))
+        self.blob_client.stage_block(block_id=block_id, data=data)
 
-        # Get a reference to the blob
-        blob_client = container_client.get_blob_client(blob_path)
+    def _drain(self):
+        while self._in_flight:
+            self._in_flight.popleft().result()
 
-        # Define chunk size (4MB)
-        chunk_size = 1024 * 1024 * 4  # 4 MB per chunk
-        block_list = []
+    def close(self, skip_if_md5: Optional[str] = None, metadata: Optional[dict] = None,
+              expected_md5: Optional[str] = None) -> str:
+        """
+        Commit (with metadata, if given) and return the base64 MD5. If it equals
+        skip_if_md5 (what the blob already holds) nothing is committed, so the
+        blob and its etag stay as they are and `committed` is False. If it
+        differs from expected_md5 (the client's claim), ChecksumMismatch is
+        raised and nothing is committed either.
+        """
+        if self.closed:
+            return self.content_md5
+        try:
+            if self._buffer:
+                self._stage(bytes(self._buffer))
+                self._buffer.clear()
+            self._drain()
+        finally:
+            self._shutdown()
+        digest = self._md5.digest()
+        self.content_md5 = base64.b64encode(digest).decode("ascii")
+        if expected_md5 and self.content_md5 != expected_md5:
+            self.closed = True
+            raise ChecksumMismatch(f"The uploaded data has MD5 {self.content_md5}, not {expected_md5}")
+        if self.content_md5 != skip_if_md5:
+            self.blob_client.commit_block_list(
+                self._blocks, content_settings=ContentSettings(content_md5=bytearray(digest)), metadata=metadata
+            )
+            self.committed = True
+        self.closed = True
+        return self.content_md5
+
+    def abort(self):
+        """Stop staging without committing; staged blocks stay for a retry (Azure drops them after 7 days)."""
+        for future in self._in_flight:
+            future.cancel()
+        self._in_flight.clear()
+        self._shutdown()
 
-        # Open the local file
-        with open(local_path, "rb") as f:
-            while True:
-                read_data = f.read(chunk_size)
-                if not read_data:
-                    break  # No more data to read
+    def _shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
 
-                # Generate a unique block ID
-                block_id = str(uuid.uuid4())
 
-                # Stage the block
-                blob_client.stage_block(block_id=block_id, data=read_data)
+class BlobReader(io.RawIOBase):
+    """
+    Seekable, read-only file object over a blob.
+
+    Every read is a ranged download, so code that needs random access (such as
+    zipfile reading an archive's central directory) can work on a blob without
+    copying it to local disk. Wrap it in io.BufferedReader to batch small reads.
+    """
 
-                # Add the block ID to the list
-                block_list.append(BlobBlock(block_id=block_id))
+    def __init__(self, blob_client, size: Optional[int] = None):
+        self.blob_client = blob_client
+        self.size = size if size is not None else blob_client.get_blob_properties().size
+        self._position = 0
 
-        # Commit all blocks
-        blob_client.commit_block_list(block_list)
+    def readable(self) -> bool:
+        return True
 
-        # Log end of upload
-        end_time = time.time()
-        duration = end_time - start_time
-        logger.debug(f"[DEBUG] Successfully uploaded file '{local_path}' to '{blob_path}' in {duration:.2f} seconds")
-        logger.debug(f"[DEBUG] Start time: {start_time}, End time: {end_time}, Duration: {duration:.2f} seconds")
+    def seekable(self) -> bool:
         return True
 
-    except Exception as e:
-        end_time = time.time()
-        duration = end_time - start_time if 'start_time' in locals() else 0
-        logger.error(f"[ERROR] Failed to upload {blob_path}: {str(e)}", exc_info=True)
-        logger.debug(f"[DEBUG] Start time: {start_time}, End time: {end_time}, Duration: {duration:.2f} seconds")
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._position, io.SEEK_END: self.size}[whence]
+        if base + offset < 0:
+            raise OSError(errno.EINVAL, f"Negative seek position {base + offset}")
+        self._position = base + offset
+        return self._position
+
+    def readinto(self, buffer) -> int:
+        length = min(len(buffer), self.size - self._position)
+        if length <= 0:
+            return 0
+        data = self.blob_client.download_blob(offset=self._position, length=length).readall()
+        buffer[:len(data)] = data
+        self._position += len(data)
+        return len(data)
+
+
+def open_blob(blob_path: str, size: Optional[int] = None):
+    """Buffered, seekable reader over a blob of the configured container."""
+    blob_client = get_container_client().get_blob_client(blob_path)
+    return io.BufferedReader(BlobReader(blob_client, size), buffer_size=settings.BLOB_UPLOAD_BLOCK_SIZE_MB * 1024 * 1024)
+
+
+def stored_fingerprint(blob_client) -> Optional[tuple[str, int]]:
+    """
+    (base64 MD5, size) of what a blob holds, None if it does not exist or has
+    no Content-MD5. Only that property counts: every writer here sets it from
+    its own hash of the committed bytes, never from a client's claim.
+    """
+    try:
+        properties = blob_client.get_blob_properties()
+    except ResourceNotFoundError:
+        return None
+    content_md5 = properties.content_settings.content_md5
+    if content_md5:
+        return base64.b64encode(bytes(content_md5)).decode("ascii"), properties.size
+    return None
+
+
+def list_blob_properties(prefix: str) -> dict:
+    """{blob name: BlobProperties, with metadata} of the blobs under a prefix"""
+    blobs = get_container_client().list_blobs(name_starts_with=prefix, include=["metadata"])
+    return {blob.name: blob for blob in blobs}
+
+
+def hash_stream(stream, chunk_size: int = 1024 * 1024 * 4) -> tuple[str, int]:
+    """(base64 MD5, size) of the rest of a stream, read to the end"""
+    md5, size = hashlib.md5(), 0
+    while True:
+        data = stream.read(chunk_size)
+        if not data:
+            break
+        md5.update(data)
+        size += len(data)
+    return base64.b64encode(md5.digest()).decode("ascii"), size
+
+
+def _seekable(stream) -> bool:
+    try:
+        return stream.seekable()
+    except (AttributeError, ValueError):
         return False
 
 
+def _observe_upload(blob_path: str, size: int, start_time: float):
+    duration = time.time() - start_time
+    if duration > 0:
+        BLOB_UPLOAD_MB_PER_SECOND.observe(size / 1024 / 1024 / duration)
+    logger.debug(f"[DEBUG] Successfully uploaded {size} bytes to '{blob_path}' in {duration:.2f} seconds")
+
+
+@dataclass
+class UploadResult:
+    """Outcome of one file upload; each worker fills in its own, so no shared counters."""
+    blob_path: str
+    size_bytes: int = 0
+    duration_seconds: float = 0.0
+    content_md5: Optional[str] = None  # base64, set when the upload succeeded
+    error: Optional[str] = None
+    deduplicated: bool = False  # the blob already held this content; nothing was committed
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def upload_stream(blob_path: str, stream, deduplicate: Optional[bool] = None,
+                  metadata: Optional[dict] = None) -> UploadResult:
+    """
+    Uploads a readable binary stream to Azure Blob Storage without a local copy.
+    metadata is stored with the blob when it is committed.
+
+    With BLOB_UPLOAD_DEDUPLICATE, content identical to what the blob already
+    holds is not committed again: a seekable stream is hashed first and not
+    sent at all, any other stream is compared once its MD5 is known.
+
+    A seekable stream is retried up to BLOB_UPLOAD_ATTEMPTS times; a retry
+    rewinds the stream and only stages the blocks the failed attempt had not.
+    Failures are logged and reported in the result, never raised.
+    """
+    result = UploadResult(blob_path)
+    start_time = time.time()
+    seekable = _seekable(stream)
+    attempts = max(1, settings.BLOB_UPLOAD_ATTEMPTS) if seekable else 1
+    origin = stream.tell() if seekable else None
+    stored_md5 = None
+    if settings.BLOB_UPLOAD_DEDUPLICATE if deduplicate is None else deduplicate:
+        try:
+            stored = stored_fingerprint(get_container_client().get_blob_client(blob_path))
+            stored_md5 = stored[0] if stored else None
+            if stored_md5 and seekable:
+                result.content_md5, result.size_bytes = hash_stream(stream)
+                stream.seek(origin)
+                if result.content_md5 == stored_md5:
+                    result.deduplicated = True
+                    result.duration_seconds = time.time() - start_time
+                    logger.debug(f"[DEBUG] Skipped {blob_path}: identical content is already stored")
+                    return result
+        except Exception as e:
+            logger.warning(f"[WARNING] Could not compare {blob_path} with the stored blob, uploading it: {str(e)}")
+            stored_md5 = None
+            if seekable:
+                stream.seek(origin)
+    for attempt in range(1, attempts + 1):
+        writer = None
+        try:
+            logger.debug(f"[DEBUG] Starting streamed upload to {blob_path} (attempt {attempt}/{attempts})")
+            blob_client = get_container_client().get_blob_client(blob_path)
+            writer = BlobBlockWriter(blob_client, staged=staged_block_ids(blob_client) if attempt > 1 else ())
+            shutil.copyfileobj(stream, writer, writer.block_size)
+            result.content_md5 = writer.close(skip_if_md5=stored_md5, metadata=metadata)
+            result.size_bytes = writer.size
+            result.deduplicated = not writer.committed
+            result.error = None
+            if writer.skipped_blocks:
+                logger.debug(f"[DEBUG] Resumed {blob_path}: {writer.skipped_blocks} block(s) were already staged")
+            if result.deduplicated:
+                logger.debug(f"[DEBUG] Not committing {blob_path}: identical content is already stored")
+            _observe_upload(blob_path, writer.size, start_time)
+            break
+        except Exception as e:
+            if writer is not None:
+                writer.abort()
+            forget_container()
+            result.error = str(e)
+            duration = time.time() - start_time
+            logger.error(f"[ERROR] Failed to upload {blob_path} after {duration:.2f} seconds (attempt {attempt}/{attempts}): {str(e)}", exc_info=True)
+            if attempt < attempts:
+                stream.seek(origin)
+    result.duration_seconds = time.time() - start_time
+    return result
+
+
+def upload_stream_to_azure_blob(blob_path: str, stream) -> Optional[str]:
+    """
+    Uploads a readable binary stream to Azure Blob Storage without a local copy.
+
+    Args:
+        blob_path (str): The path in Azure Blob Storage where the data will be uploaded.
+        stream: Any object with read(size), e.g. UploadFile.file or an open file.
+
+    Returns:
+        Optional[str]: The base64 Content-MD5 of the upload, None if it failed.
+    """
+    return upload_stream(blob_path, stream).content_md5
+
+
+def upload_streams_in_parallel(uploads, max_workers: Optional[int] = None,
+                               metadata: Optional[dict] = None) -> list[UploadResult]:
+    """
+    Upload several (blob_path, stream) pairs at once, BLOB_UPLOAD_FILE_CONCURRENCY at a time.
+    metadata maps blob paths to the metadata committed with them.
+
+    Together with the block concurrency inside each upload, a batch takes about
+    as long as its largest file. The total rate stays under
+    BLOB_UPLOAD_MAX_MB_PER_SECOND. Results are returned in input order.
+    """
+    uploads = list(uploads)
+    if not uploads:
+        return []
+    workers = max(1, min(max_workers or settings.BLOB_UPLOAD_FILE_CONCURRENCY, len(uploads)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="blob-upload") as executor:
+        metadata = metadata or {}
+        futures = [
+            executor.submit(upload_stream, blob_path, stream, metadata=metadata.get(blob_path))
+            for blob_path, stream in uploads
+        ]
+        results = []
+        for (blob_path, _), future in zip(uploads, futures):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                logger.error(f"[ERROR] Exception during upload of {blob_path}: {str(e)}", exc_info=True)
+                results.append(UploadResult(blob_path, error=str(e)))
+    return results
+
+
+async def stream_to_azure_blob(blob_path: str, chunks, expected_md5: Optional[str] = None) -> UploadResult:
+    """
+    Uploads an async iterator of byte chunks (e.g. Request.stream()) as it arrives.
+
+    Chunks are gathered into whole blocks and staged from a worker thread, so
+    the event loop is never blocked on storage calls. With
+    BLOB_UPLOAD_DEDUPLICATE, content identical to the stored blob is not
+    committed (the blob and its etag stay as they are). A stream that does not
+    hash to expected_md5 raises ChecksumMismatch uncommitted. Errors are raised.
+    """
+    start_time = time.time()
+    container_client = await run_in_threadpool(get_container_client)
+    blob_client = container_client.get_blob_client(blob_path)
+    stored = await run_in_threadpool(stored_fingerprint, blob_client) if settings.BLOB_UPLOAD_DEDUPLICATE else None
+    writer = BlobBlockWriter(blob_client)
+    pending = bytearray()
+    try:
+        async for chunk in chunks:
+            pending += chunk
+            if len(pending) >= writer.block_size:
+                await run_in_threadpool(writer.write, bytes(pending))
+                pending.clear()
+        if pending:
+            await run_in_threadpool(writer.write, bytes(pending))
+        content_md5 = await run_in_threadpool(writer.close, stored[0] if stored else None, None, expected_md5)
+    except BaseException:
+        writer.abort()
+        raise
+    _observe_upload(blob_path, writer.size, start_time)
+    return UploadResult(
+        blob_path, writer.size, time.time() - start_time, content_md5, deduplicated=not writer.committed,
+    )
+
+
+def upload_to_azure_blob(blob_path: str, local_path: str) -> bool:
+    """
+    Uploads a local file to Azure Blob Storage.
+    
+    Args:
+        blob_path (str): The path in Azure Blob Storage where the file will be uploaded.
+        local_path (str): The local file path to upload.
+        
+    Returns:
+        bool: True if upload is successful, False otherwise.
+    """
+    # Check if the file exists and is readable
+    if not os.path.exists(local_path):
+        logger.error(f"[ERROR] File not found: {local_path}")
+        return False
+
+    if not os.path.isfile(local_path):
+        logger.error(f"[ERROR] Not a file: {local_path}")
+        return False
+
+    with open(local_path, "rb") as f:
+        return upload_stream_to_azure_blob(blob_path, f) is not None
+
+
 def upload_files_in_parallel(files_to_upload: list[tuple[str, str]]) -> tuple[int, int]:
     """
-    Upload multiple files in parallel using thread pool.
+    Upload multiple local files in parallel (see upload_streams_in_parallel).
 
     Args:
         files_to_upload (list[tuple[str, str]): List of (blob_path, local_path) tuples.
@@ -127,24 +550,23 @@ def upload_files_in_parallel(files_to_upload: list[tuple[str, str]]) -> tuple[in
     Returns:
         tuple[int, int]: (success_count, failed_count)
     """
-    success_count = 0
-    failed_count = 0
-
-    def _upload_file(blob_path: str, local_path: str):
-        nonlocal success_count, failed_count
-        try:
-            if upload_to_azure_blob(blob_path, local_path):
-                success_count += 1
-                logger.debug(f"[DEBUG] Uploaded {local_path} to {blob_path}")
-            else:
-                failed_count += 1
-                logger.error(f"[ERROR] Failed to upload {local_path} to {blob_path}")
-        except Exception as e:
-            failed_count += 1
-            logger.error(f"[ERROR] Exception during upload of {local_path}: {str(e)}")
+    results = upload_local_files_in_parallel(files_to_upload)
+    success_count = sum(1 for result in results if result.ok)
+    return success_count, len(results) - success_count
 
-    with ThreadPoolExecutor(max_workers=10) as executor:
-        for blob_path, local_path in files_to_upload:
-            executor.submit(_upload_file, blob_path, local_path)
 
-    return success_count, failed_count
\ No newline at end of file
+def upload_local_files_in_parallel(files_to_upload: list[tuple[str, str]]) -> list[UploadResult]:
+    """Per-file results of uploading (blob_path, local_path) pairs in parallel."""
+    results = [None] * len(files_to_upload)
+    with ExitStack() as stack:
+        uploads, positions = [], []
+        for i, (blob_path, local_path) in enumerate(files_to_upload):
+            try:
+                uploads.append((blob_path, stack.enter_context(open(local_path, "rb"))))
+                positions.append(i)
+            except OSError as e:
+                logger.error(f"[ERROR] Cannot read {local_path}: {str(e)}")
+                results[i] = UploadResult(blob_path, error=str(e))
+        for i, result in zip(positions, upload_streams_in_parallel(uploads)):
+            results[i] = result
+    return results
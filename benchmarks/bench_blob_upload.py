@@ -0,0 +1,106 @@
+"""
+Upload throughput of BlobBlockWriter (app/utils/azure_blob.py) against a
+simulated storage account, and of a multi-file drop through
+upload_streams_in_parallel.
+
+Each stage_block call costs a fixed round trip plus size / per-connection
+bandwidth, which is what bounds a single Azure connection. Prints MB/s for
+each BLOB_UPLOAD_CONCURRENCY value, so the effect of staging blocks at once
+is visible without a storage account, then the wall time of --files files
+uploaded one after another and BLOB_UPLOAD_FILE_CONCURRENCY at a time.
+
+    python benchmarks/bench_blob_upload.py --size-mb 256 --rtt-ms 30 --conn-mbps 60 --files 30
+"""
+import argparse
+import io
+import os
+import sys
+import time
+
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, parent_dir)
+
+from app.core.config import settings
+from app.utils import azure_blob
+from app.utils.azure_blob import BlobBlockWriter
+
+
+class SimulatedBlobClient:
+    def __init__(self, rtt: float, bandwidth: float):
+        self.rtt = rtt
+        self.bandwidth = bandwidth
+        self.blocks = {}
+
+    def stage_block(self, block_id, data, **kwargs):
+        time.sleep(self.rtt + len(data) / self.bandwidth)
+        self.blocks[block_id] = len(data)
+
+    def commit_block_list(self, block_list, **kwargs):
+        time.sleep(self.rtt)
+        if sum(self.blocks[block.id] for block in block_list) <= 0:
+            raise SystemExit("nothing was staged")
+
+
+class SimulatedContainerClient:
+    def __init__(self, rtt: float, bandwidth: float):
+        self.rtt = rtt
+        self.bandwidth = bandwidth
+
+    def get_blob_client(self, blob):
+        return SimulatedBlobClient(self.rtt, self.bandwidth)
+
+
+def measure_files(sizes, file_concurrency: int) -> float:
+    """Wall seconds to upload one in-memory file per size with upload_streams_in_parallel"""
+    uploads = [(f"raw/BENCH/f{i}.sas7bdat", io.BytesIO(os.urandom(size))) for i, size in enumerate(sizes)]
+    start = time.perf_counter()
+    results = azure_blob.upload_streams_in_parallel(uploads, max_workers=file_concurrency)
+    if not all(result.ok for result in results):
+        raise SystemExit("an upload failed")
+    return time.perf_counter() - start
+
+
+def measure(payload: bytes, block_size: int, concurrency: int, rtt: float, bandwidth: float) -> float:
+    writer = BlobBlockWriter(SimulatedBlobClient(rtt, bandwidth), block_size=block_size, concurrency=concurrency)
+    start = time.perf_counter()
+    for i in range(0, len(payload), 1024 * 1024):
+        writer.write(payload[i:i + 1024 * 1024])
+    writer.close()
+    return len(payload) / 1024 / 1024 / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=int, default=128)
+    parser.add_argument("--block-mb", type=int, default=4)
+    parser.add_argument("--rtt-ms", type=float, default=30)
+    parser.add_argument("--conn-mbps", type=float, default=60, help="MB/s of one connection")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--files", type=int, default=30, help="files in the multi-file drop (0 = skip)")
+    args = parser.parse_args()
+
+    payload = os.urandom(args.size_mb * 1024 * 1024)
+    print(f"size={args.size_mb} MB block={args.block_mb} MB rtt={args.rtt_ms} ms connection={args.conn_mbps} MB/s")
+    baseline = None
+    for concurrency in args.concurrency:
+        rate = measure(payload, args.block_mb * 1024 * 1024, concurrency, args.rtt_ms / 1000, args.conn_mbps * 1024 * 1024)
+        baseline = baseline or rate
+        print(f"concurrency {concurrency:2d}  {rate:8.1f} MB/s  ({rate / baseline:.1f}x)")
+
+    if args.files:
+        # 1-16 MB files; the largest one alone sets the lower bound
+        sizes = [(1 + (i * 7) % 16) * 1024 * 1024 for i in range(args.files)]
+        container = SimulatedContainerClient(args.rtt_ms / 1000, args.conn_mbps * 1024 * 1024)
+        azure_blob.get_container_client = lambda: container
+        settings.BLOB_UPLOAD_BLOCK_SIZE_MB = args.block_mb
+        largest = measure_files([max(sizes)], 1)
+        sequential = measure_files(sizes, 1)
+        parallel = measure_files(sizes, settings.BLOB_UPLOAD_FILE_CONCURRENCY)
+        print(f"{args.files} files ({sum(sizes) / 1024 / 1024:.0f} MB), block concurrency {settings.BLOB_UPLOAD_CONCURRENCY}")
+        print(f"largest file alone     {largest:8.2f} s")
+        print(f"one after another      {sequential:8.2f} s")
+        print(f"{settings.BLOB_UPLOAD_FILE_CONCURRENCY} files at a time      {parallel:8.2f} s  ({sequential / parallel:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
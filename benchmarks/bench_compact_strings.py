@@ -0,0 +1,79 @@
+"""
+Memory benchmark for dictionary-encoded string columns (app/services/compact_strings.py).
+
+Writes an SDTM-shaped transport file (repetitive STUDYID/USUBJID/PARAMCD/
+AVISIT columns, one free-text column, numbers), decodes it, and prints the size
+of the string columns as decoded and compacted, the time compact_strings takes
+and the marshal_rows rate for both representations.
+
+    python benchmarks/bench_compact_strings.py --rows 500000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import pyreadstat
+
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, parent_dir)
+
+from app.services.compact_strings import compact_strings, is_compact
+from app.services.row_marshalling import marshal_rows
+
+VISITS = ["SCREENING", "BASELINE", "WEEK 2", "WEEK 4", "WEEK 8", "WEEK 12", "WEEK 24", "FOLLOW-UP"]
+PARAMS = ["ALT", "AST", "ALB", "BILI", "CREAT", "GLUC", "HGB", "PLAT", "WBC", "SODIUM"]
+
+
+def make_dataset(rows: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    subjects = np.array([f"STUDY01-{site:03d}-{n:04d}" for site in range(40) for n in range(50)], dtype=object)
+    return pd.DataFrame({
+        "STUDYID": np.full(rows, "STUDY01", dtype=object),
+        "USUBJID": subjects[rng.integers(0, len(subjects), size=rows)],
+        "PARAMCD": np.array(PARAMS, dtype=object)[rng.integers(0, len(PARAMS), size=rows)],
+        "AVISIT": np.array(VISITS, dtype=object)[rng.integers(0, len(VISITS), size=rows)],
+        "LBSPEC": np.array([f"specimen {i}" for i in range(rows)], dtype=object),
+        "AVAL": rng.normal(50, 10, size=rows).round(2),
+        "LBSEQ": np.arange(1, rows + 1, dtype="float64"),
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "lb.xpt")
+        pyreadstat.write_xport(make_dataset(args.rows), path, table_name="LB")
+        df, meta = pyreadstat.read_xport(path)
+    strings = [col for col, kind in meta.readstat_variable_types.items() if kind == "string"]
+
+    start = time.perf_counter()
+    compact, before, after = compact_strings(df, strings)
+    compact_seconds = time.perf_counter() - start
+    encoded = [col for col in strings if is_compact(compact[col])]
+
+    start = time.perf_counter()
+    plain_rows = marshal_rows(df)
+    plain_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    compact_rows = marshal_rows(compact)
+    compact_marshal_seconds = time.perf_counter() - start
+    if plain_rows[:1000] != compact_rows[:1000]:
+        raise SystemExit("compact rows differ from the decoded rows")
+
+    print(f"rows={args.rows} string columns={len(strings)} (compacted: {', '.join(encoded)})")
+    print(f"string columns decoded  {before / 1024 / 1024:10.2f} MB")
+    print(f"string columns compact  {after / 1024 / 1024:10.2f} MB  ({before / after:.1f}x smaller)")
+    print(f"compact_strings         {args.rows / compact_seconds:12,.0f} rows/s")
+    print(f"marshal decoded         {args.rows / plain_seconds:12,.0f} rows/s")
+    print(f"marshal compact         {args.rows / compact_marshal_seconds:12,.0f} rows/s")
+
+
+if __name__ == "__main__":
+    main()
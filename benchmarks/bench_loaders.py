@@ -0,0 +1,72 @@
+"""
+Compare bulk-load backends from app/services/loaders.py on a synthetic block.
+
+Each selected loader creates a scratch table, loads the same rows in CHUNK_SIZE
+blocks and prints rows/s. Needs the application settings (.env); sqlite writes
+to a temporary file, postgres_copy uses BULK_LOAD_DSN or DATABASE_URL and
+executemany uses the SQL Server connection settings.
+
+    python benchmarks/bench_loaders.py --loaders sqlite postgres_copy --rows 200000
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, parent_dir)
+
+from bench_marshal import make_block
+from app.core.config import settings
+from app.services.loaders import LOADERS, create_loader
+from app.services.type_inference import infer_sql_types, profile_columns
+
+
+def frame_kinds(df) -> dict:
+    """Column kinds (see converter.column_kinds) for a synthetic DataFrame"""
+    return {
+        col: "datetime" if dtype.kind == "M" else "number" if dtype.kind == "f" else "string"
+        for col, dtype in df.dtypes.items()
+    }
+
+
+def run_loader(name: str, df, schema_name: str, table_name: str) -> float:
+    loader = create_loader(name)
+    columns = list(df.columns)
+    type_map = infer_sql_types(profile_columns(frame_kinds(df)), [df])
+    conn = loader.connect()
+    try:
+        cursor = conn.cursor()
+        loader.ensure_schema(cursor, schema_name)
+        cursor.execute(f"DROP TABLE IF EXISTS {loader.qualified_name(schema_name, table_name)}")
+        loader.ensure_table(cursor, schema_name, table_name, columns, type_map)
+        loader.begin(cursor, schema_name, table_name, columns, type_map)
+        for i in range(0, len(df), settings.CHUNK_SIZE):
+            loader.load_chunk(cursor, df.iloc[i:i + settings.CHUNK_SIZE])
+        conn.commit()
+        cursor.execute(f"DROP TABLE {loader.qualified_name(schema_name, table_name)}")
+        conn.commit()
+    finally:
+        loader.release(conn)
+    return loader.rows_per_second
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--loaders", nargs="+", default=["sqlite"], choices=sorted(LOADERS))
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--cols", type=int, default=20)
+    parser.add_argument("--schema", default="bench")
+    args = parser.parse_args()
+
+    if "sqlite" in args.loaders:
+        settings.SQLITE_PATH = os.path.join(tempfile.mkdtemp(), "bench.db")
+    df = make_block(args.rows, args.cols)
+    print(f"rows={args.rows} cols={args.cols} chunk={settings.CHUNK_SIZE}")
+    for name in args.loaders:
+        rows_per_second = run_loader(name, df, args.schema, "bench_load")
+        print(f"{name:<14} {rows_per_second:12,.0f} rows/s")
+
+
+if __name__ == "__main__":
+    main()
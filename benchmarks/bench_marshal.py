@@ -0,0 +1,89 @@
+"""
+Micro-benchmark for the executemany row marshalling stage of process_file.
+
+Compares the previous cell-by-cell loop (itertuples + pd.isna per value) with the
+column-wise marshal_rows on a wide SDTM-shaped block and prints rows/s.
+
+    python benchmarks/bench_marshal.py --rows 100000 --cols 60
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, parent_dir)
+
+from app.services.row_marshalling import marshal_rows
+
+
+def make_block(rows: int, cols: int, seed: int = 0) -> pd.DataFrame:
+    """Wide block with a mix of text, numeric (with NaN) and datetime columns"""
+    rng = np.random.default_rng(seed)
+    data = {}
+    for i in range(cols):
+        kind = i % 4
+        if kind == 0:
+            data[f"CHR{i}"] = rng.choice(["SCREENING", "BASELINE", "WEEK 4", "WEEK 8", None], size=rows)
+        elif kind == 1:
+            values = rng.normal(size=rows)
+            values[rng.random(rows) < 0.1] = np.nan
+            data[f"NUM{i}"] = values
+        elif kind == 2:
+            data[f"SEQ{i}"] = np.arange(rows, dtype="float64")
+        else:
+            dates = pd.to_datetime("2020-01-01") + pd.to_timedelta(rng.integers(0, 10**8, size=rows), unit="s")
+            dates = pd.Series(dates)
+            dates[rng.random(rows) < 0.1] = pd.NaT
+            data[f"DTM{i}"] = dates
+    return pd.DataFrame(data)
+
+
+def marshal_rows_legacy(chunk_df: pd.DataFrame) -> list:
+    """The per-cell loop process_file used before marshal_rows"""
+    data_chunk = []
+    for row in chunk_df.itertuples(index=False):
+        row_data = []
+        for val in row:
+            if pd.isna(val):
+                row_data.append(None)
+            elif isinstance(val, pd.Timestamp):
+                row_data.append(val.to_pydatetime())
+            else:
+                row_data.append(val)
+        data_chunk.append(tuple(row_data))
+    return data_chunk
+
+
+def measure(func, df: pd.DataFrame, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(df)
+        best = min(best, time.perf_counter() - start)
+    return len(df) / best if best > 0 else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--cols", type=int, default=40)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    df = make_block(args.rows, args.cols)
+    if marshal_rows_legacy(df.head(1000)) != marshal_rows(df.head(1000)):
+        raise SystemExit("marshal_rows output differs from the legacy loop")
+
+    legacy = measure(marshal_rows_legacy, df, args.repeat)
+    vectorized = measure(marshal_rows, df, args.repeat)
+    print(f"rows={args.rows} cols={args.cols}")
+    print(f"legacy      {legacy:12,.0f} rows/s")
+    print(f"vectorized  {vectorized:12,.0f} rows/s  ({vectorized / legacy:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,335 @@
+"""
+End-to-end benchmark of the SAS import pipeline against local stand-ins.
+
+Generates synthetic SDTM/ADaM-shaped datasets, uploads them with
+upload_files_in_parallel into a filesystem blob store (benchmarks/local_blob.py)
+or Azurite, then imports the project with upload_sas_files (download → decode →
+insert) into SQLite or Postgres. Per-stage throughput and peak RSS are printed
+and saved as JSON; --compare prints the change against an earlier result file.
+
+pyreadstat cannot write sas7bdat, so synthetic datasets are SAS transport (XPT)
+files stored under .sas7bdat blob names and decoded with read_xport. That switch
+only exists in this process, so synthetic runs use thread mode without parallel
+partitions. --sas-dir benchmarks real .sas7bdat files (any execution mode).
+
+    python benchmarks/bench_pipeline.py --rows 200000 --cols 40
+    python benchmarks/bench_pipeline.py --loader postgres_copy --dsn postgresql://localhost/bench
+    python benchmarks/bench_pipeline.py --sas-dir ./sasdata --compare benchmarks/results/old.json
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pyreadstat
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, parent_dir)
+
+from local_blob import LocalBlobServiceClient
+from app.core.config import settings
+from app.core.metrics import SAS_DECODE_SECONDS
+from app.services import converter
+from app.utils import azure_blob
+
+# Azurite's well-known development account
+AZURITE_CONNECTION_STRING = (
+    "DefaultEndpointsProtocol=http;AccountName=devstoreaccount1;"
+    "AccountKey=Eby8vdM02xNOcqFlqUwJPLlmEtlCDXJ1OUzFT50uSRZ6IFsuFq2UVErCz4I6tq/K1SZFPTOtr/KBHBeksoGMGw==;"
+    "BlobEndpoint=http://127.0.0.1:10000/devstoreaccount1;"
+)
+DATASETS = {"SDTM": ["dm", "ae", "lb", "vs"], "ADAM": ["adsl", "adlb"]}
+TEST_CODES = ["ALT", "AST", "GLUC", "HGB", "SYSBP", "DIABP", "PULSE", "TEMP", "WEIGHT", "HEIGHT"]
+DATES = pd.date_range("2020-01-01", periods=1500, freq="D").date
+VISITS = ["SCREENING", "BASELINE", "WEEK 2", "WEEK 4", "WEEK 8", "WEEK 12", "END OF TREATMENT"]
+
+
+def configure(**values):
+    """Set settings here and in the environment, which spawned workers read theirs from"""
+    for key, value in values.items():
+        setattr(settings, key, value)
+        os.environ[key] = str(value)
+
+
+def make_dataset(name: str, domain: str, rows: int, cols: int, seed: int = 0):
+    """An SDTM/ADaM-shaped DataFrame and the SAS formats of its numeric date columns.
+
+    Identifier columns come first; the rest cycle through test codes, numeric
+    results with missing values, ISO 8601 text dates, DATE9 and DATETIME20
+    numbers and free text, the column mix of typical findings datasets.
+    """
+    rng = np.random.default_rng(seed)
+    subjects = rng.integers(1, max(2, rows // 20), size=rows)
+    data = {
+        "STUDYID": np.full(rows, "STUDY01", dtype=object),
+        "USUBJID": pd.Series(subjects).map("STUDY01-{:04d}".format).to_numpy(dtype=object),
+    }
+    if domain == "SDTM":
+        data["DOMAIN"] = np.full(rows, name.upper(), dtype=object)
+        data[f"{name.upper()[:2]}SEQ"] = np.arange(1, rows + 1, dtype="float64")
+    else:
+        data["PARAMCD"] = rng.choice(TEST_CODES, size=rows).astype(object)
+        data["AVISITN"] = rng.integers(0, len(VISITS), size=rows).astype("float64")
+    formats = {}
+    base = pd.Timestamp("2020-01-01")
+    for i in range(max(0, cols - len(data))):
+        kind = i % 6
+        if kind == 0:
+            data[f"TCD{i:03d}"] = rng.choice(TEST_CODES, size=rows).astype(object)
+        elif kind == 1:
+            values = rng.normal(100, 15, size=rows).round(2)
+            values[rng.random(rows) < 0.05] = np.nan
+            data[f"RES{i:03d}"] = values
+        elif kind == 2:
+            days = pd.to_timedelta(rng.integers(0, 1500, size=rows), unit="D")
+            data[f"DTC{i:03d}"] = (base + days).strftime("%Y-%m-%d").astype(object)
+        elif kind == 3:
+            data[f"DT{i:03d}"] = DATES[rng.integers(0, len(DATES), size=rows)]
+            formats[f"DT{i:03d}"] = "DATE9"
+        elif kind == 4:
+            data[f"DTM{i:03d}"] = base + pd.to_timedelta(rng.integers(0, 1500 * 86400, size=rows), unit="s")
+            formats[f"DTM{i:03d}"] = "DATETIME20"
+        else:
+            data[f"TXT{i:03d}"] = rng.choice(VISITS, size=rows).astype(object)
+    return pd.DataFrame(data), formats
+
+
+def generate_datasets(out_dir: str, rows: int, cols: int) -> list:
+    """Write every DATASETS entry as XPT; returns [(domain, table, path, rows)]"""
+    files = []
+    for seed, (domain, names) in enumerate(DATASETS.items()):
+        for offset, name in enumerate(names):
+            df, formats = make_dataset(name, domain, rows, cols, seed * 10 + offset)
+            path = os.path.join(out_dir, f"{name}.xpt")
+            pyreadstat.write_xport(df, path, table_name=name.upper(), file_format_version=8, variable_format=formats)
+            files.append((domain, name, path, rows))
+    return files
+
+
+def collect_sas_files(sas_dir: str) -> list:
+    """Real datasets: <sas_dir>/<ADAM|SDTM>/*.sas7bdat, or a flat directory treated as SDTM"""
+    files = []
+    for domain in DATASETS:
+        domain_dir = os.path.join(sas_dir, domain)
+        folder = domain_dir if os.path.isdir(domain_dir) else sas_dir if domain == "SDTM" else None
+        if folder is None:
+            continue
+        for filename in sorted(os.listdir(folder)):
+            if filename.lower().endswith(".sas7bdat"):
+                path = os.path.join(folder, filename)
+                rows = converter.read_sas_metadata(path).number_rows or 0
+                files.append((domain, os.path.splitext(filename)[0].lower(), path, rows))
+    return files
+
+
+def histogram_total(histogram, suffix: str) -> float:
+    return sum(value for name, _, value in histogram.samples() if name == suffix)
+
+
+def peak_rss_mb() -> dict:
+    if resource is None:
+        return {}
+    # ru_maxrss is KB on Linux and bytes on macOS
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return {
+        "self": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale, 1),
+        "children": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale, 1),
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=parent_dir, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def rate(amount: float, seconds: float) -> float:
+    return round(amount / seconds, 2) if seconds > 0 else 0.0
+
+
+def run(args, work_dir: str) -> dict:
+    project = args.project
+    # Before the datasets exist: a forked child would report the parent's RSS as its own peak
+    commit = git_commit()
+    configure(
+        BULK_LOADER=args.loader,
+        AZURE_STORAGE_CONTAINER_NAME=args.container,
+        IMPORT_EXECUTION_MODE=args.mode,
+    )
+    if args.chunk_size:
+        configure(CHUNK_SIZE=args.chunk_size)
+    if args.loader == "sqlite":
+        configure(SQLITE_PATH=os.path.join(work_dir, "bench.db"))
+    elif args.dsn:
+        configure(BULK_LOAD_DSN=args.dsn)
+    if args.blob == "local":
+        LocalBlobServiceClient.root = os.path.join(work_dir, "blobs")
+        azure_blob.BlobServiceClient = LocalBlobServiceClient
+        configure(AZURE_STORAGE_CONNECTION_STRING="local")
+    else:
+        configure(AZURE_STORAGE_CONNECTION_STRING=args.connection_string or AZURITE_CONNECTION_STRING)
+
+    # 1. Datasets
+    start = time.perf_counter()
+    if args.sas_dir:
+        files = collect_sas_files(args.sas_dir)
+        data = "sas7bdat"
+    else:
+        files = generate_datasets(work_dir, args.rows, args.cols)
+        data = "synthetic-xpt"
+        # See the module docstring: XPT decodes through the sas7bdat call sites
+        pyreadstat.read_sas7bdat = pyreadstat.read_xport
+        configure(IMPORT_EXECUTION_MODE="thread", PARALLEL_DECODE_PARTITIONS=1)
+    generate_seconds = time.perf_counter() - start
+    if not files:
+        raise SystemExit("No datasets to benchmark")
+    total_bytes = sum(os.path.getsize(path) for _, _, path, _ in files)
+    total_rows = sum(rows for _, _, _, rows in files)
+    total_mb = total_bytes / 1024 / 1024
+
+    # 2. Upload
+    uploads = [
+        (f"{settings.BASE_BLOB_PATH}/{project}/{domain}/{name}.sas7bdat", path)
+        for domain, name, path, _ in files
+    ]
+    start = time.perf_counter()
+    uploaded, failed = azure_blob.upload_files_in_parallel(uploads)
+    upload_seconds = time.perf_counter() - start
+    if failed:
+        raise SystemExit(f"{failed} uploads failed, see logs/upload.log")
+
+    # 3. Import: download → decode → insert
+    decode_before = histogram_total(SAS_DECODE_SECONDS, "_sum")
+    start = time.perf_counter()
+    result = converter.upload_sas_files(converter.ProjectRequest(project_name=project, force=True))
+    import_seconds = time.perf_counter() - start
+    if result.get("status") != "success" or result["files_processed"] != len(files):
+        raise SystemExit(f"Import failed: {result}")
+    # Worker processes forward samples asynchronously
+    time.sleep(0.5 if settings.IMPORT_EXECUTION_MODE == "process" else 0)
+    decode_seconds = histogram_total(SAS_DECODE_SECONDS, "_sum") - decode_before
+    pipeline = result["pipeline"]
+
+    return {
+        "benchmark": "pipeline",
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "config": {
+            "data": data,
+            "datasets": len(files),
+            "rows": total_rows,
+            "cols": args.cols if not args.sas_dir else None,
+            "mb": round(total_mb, 2),
+            "blob": args.blob,
+            "loader": settings.BULK_LOADER,
+            "execution_mode": settings.IMPORT_EXECUTION_MODE,
+            "chunk_size": settings.CHUNK_SIZE,
+            "download_workers": settings.DOWNLOAD_WORKERS,
+            "processing_workers": settings.PROCESSING_WORKERS,
+        },
+        "stages": {
+            "generate": {"seconds": round(generate_seconds, 3)},
+            "upload": {"seconds": round(upload_seconds, 3), "mb_per_second": rate(total_mb, upload_seconds)},
+            # busy_seconds add up over workers, so these are per-worker rates
+            "download": {
+                "busy_seconds": pipeline["download"]["busy_seconds"],
+                "mb_per_second": rate(total_mb, pipeline["download"]["busy_seconds"]),
+                "stall_seconds": pipeline["download"]["stall_seconds"],
+            },
+            "decode": {"seconds": round(decode_seconds, 3), "rows_per_second": rate(total_rows, decode_seconds)},
+            "process": {
+                "busy_seconds": pipeline["process"]["busy_seconds"],
+                "rows_per_second": rate(total_rows, pipeline["process"]["busy_seconds"]),
+                "stall_seconds": pipeline["process"]["stall_seconds"],
+            },
+            "import": {
+                "seconds": round(import_seconds, 3),
+                "rows_per_second": rate(total_rows, import_seconds),
+                "mb_per_second": rate(total_mb, import_seconds),
+                "peak_inflight_mb": round(pipeline["peak_inflight_bytes"] / 1024 / 1024, 2),
+            },
+        },
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def print_report(report: dict, previous: dict = None):
+    config = report["config"]
+    print(
+        f"{config['datasets']} datasets, {config['rows']:,} rows, {config['mb']} MB ({config['data']}), "
+        f"{config['loader']} via {config['blob']} blob, {config['execution_mode']} mode"
+    )
+    for stage, values in report["stages"].items():
+        line = "  ".join(f"{key}={value:,}" for key, value in values.items())
+        if previous and stage in previous.get("stages", {}):
+            changes = [
+                f"{key} {100 * (value / previous['stages'][stage][key] - 1):+.1f}%"
+                for key, value in values.items()
+                if key.endswith("_per_second") and previous["stages"][stage].get(key)
+            ]
+            if changes:
+                line += f"  ({', '.join(changes)} vs {previous.get('git_commit') or previous['timestamp']})"
+        print(f"{stage:<10} {line}")
+    print(f"peak RSS   {report['peak_rss_mb']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000, help="rows per synthetic dataset")
+    parser.add_argument("--cols", type=int, default=30, help="columns per synthetic dataset")
+    parser.add_argument("--sas-dir", help="benchmark these .sas7bdat files instead of synthetic data")
+    parser.add_argument("--loader", default="sqlite", choices=["sqlite", "postgres_copy", "executemany"])
+    parser.add_argument("--dsn", help="postgres_copy target (default: BULK_LOAD_DSN or DATABASE_URL)")
+    parser.add_argument("--blob", default="local", choices=["local", "azurite"])
+    parser.add_argument("--connection-string", help="Azurite connection string (default: local devstoreaccount1)")
+    parser.add_argument("--container", default="bench")
+    parser.add_argument("--project", default="BENCH")
+    parser.add_argument("--mode", default=settings.IMPORT_EXECUTION_MODE, choices=["thread", "process"])
+    parser.add_argument("--chunk-size", type=int)
+    parser.add_argument("--output", help="result file (default: benchmarks/results/pipeline-<time>.json)")
+    parser.add_argument("--compare", help="earlier result file to compare throughput with")
+    parser.add_argument("--keep", action="store_true", help="keep the generated data, blobs and database")
+    args = parser.parse_args()
+
+    previous = None
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+    work_dir = tempfile.mkdtemp(prefix="bench_pipeline_")
+    try:
+        report = run(args, work_dir)
+    finally:
+        if args.keep:
+            print(f"Kept {work_dir}")
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    output = args.output or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "results", f"pipeline-{datetime.now():%Y%m%d-%H%M%S}.json"
+    )
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print_report(report, previous)
+    print(f"Saved {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Micro-benchmark for SAS date/datetime/time decoding.
+
+Writes a transport file with date, datetime and time columns, then reads it the
+previous way (pyreadstat builds a Python date/datetime/time per value) and the
+current way (raw numbers, converted per block by app/services/temporal.py).
+Prints rows/s for both, plus the conversion step on its own.
+
+    python benchmarks/bench_temporal.py --rows 200000 --cols 12
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import pyreadstat
+
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, parent_dir)
+
+from app.services.temporal import convert_temporal, temporal_columns
+
+FORMATS = ("DATE9.", "DATETIME20.", "TIME8.", "E8601DA10.")
+
+
+def make_dataset(rows: int, cols: int, seed: int = 0):
+    """Raw SAS numbers (days or seconds) with ~10% missing, and their display formats"""
+    rng = np.random.default_rng(seed)
+    data, formats = {}, {}
+    for i in range(cols):
+        fmt = FORMATS[i % len(FORMATS)]
+        if fmt.startswith("DATETIME"):
+            values = rng.integers(1.5e9, 2e9, size=rows).astype("float64") + rng.random(rows).round(3)
+        elif fmt.startswith("TIME"):
+            values = rng.integers(0, 86400, size=rows).astype("float64")
+        else:
+            values = rng.integers(15000, 24000, size=rows).astype("float64")
+        values[rng.random(rows) < 0.1] = np.nan
+        name = f"{fmt[:2]}{i}"
+        data[name] = values
+        formats[name] = fmt
+    return pd.DataFrame(data), formats
+
+
+def read_legacy(path: str) -> pd.DataFrame:
+    df, _ = pyreadstat.read_xport(path)
+    return df
+
+
+def read_vectorized(path: str) -> pd.DataFrame:
+    df, meta = pyreadstat.read_xport(path, disable_datetime_conversion=True)
+    return convert_temporal(df, temporal_columns(meta))
+
+
+def measure(func, arg, rows: int, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(arg)
+        best = min(best, time.perf_counter() - start)
+    return rows / best if best > 0 else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--cols", type=int, default=12)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    df, formats = make_dataset(args.rows, args.cols)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "bench.xpt")
+        pyreadstat.write_xport(df, path, table_name="BENCH", variable_format=formats)
+        raw, meta = pyreadstat.read_xport(path, disable_datetime_conversion=True)
+        columns = temporal_columns(meta)
+
+        legacy = measure(read_legacy, path, args.rows, args.repeat)
+        vectorized = measure(read_vectorized, path, args.rows, args.repeat)
+        convert = measure(lambda frame: convert_temporal(frame, columns), raw, args.rows, args.repeat)
+
+    print(f"rows={args.rows} cols={args.cols} formats={','.join(FORMATS)}")
+    print(f"read, object conversion   {legacy:12,.0f} rows/s")
+    print(f"read, vectorized          {vectorized:12,.0f} rows/s  ({vectorized / legacy:.1f}x)")
+    print(f"convert_temporal only     {convert:12,.0f} rows/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Filesystem stand-in for the parts of azure-storage-blob the importer uses.
+
+Each blob is a file under the root directory; staged blocks are files under
+<root>/.blocks until commit_block_list concatenates them. Downloads stream the
+file in 4 MB chunks (or a byte range), so the benchmark measures real disk I/O
+instead of holding every dataset in memory.
+
+    LocalBlobServiceClient.root = "/tmp/blobs"
+    azure_blob.BlobServiceClient = LocalBlobServiceClient
+"""
+import hashlib
+import os
+from types import SimpleNamespace
+
+from azure.core import MatchConditions
+from azure.core.exceptions import ResourceModifiedError, ResourceNotFoundError
+
+CHUNK_SIZE = 4 * 1024 * 1024
+
+
+def _etag(stat) -> str:
+    return f'"0x{stat.st_mtime_ns:X}{stat.st_size:X}"'
+
+
+class LocalDownloader:
+    def __init__(self, path: str, offset: int = 0, length: int = None):
+        self._path = path
+        self._offset = offset or 0
+        self._length = length
+
+    def chunks(self):
+        remaining = self._length
+        with open(self._path, "rb") as f:
+            f.seek(self._offset)
+            while remaining is None or remaining > 0:
+                data = f.read(CHUNK_SIZE if remaining is None else min(CHUNK_SIZE, remaining))
+                if not data:
+                    return
+                if remaining is not None:
+                    remaining -= len(data)
+                yield data
+
+    def readall(self) -> bytes:
+        return b"".join(self.chunks())
+
+
+class LocalBlobClient:
+    def __init__(self, container, blob_name: str):
+        self.container = container
+        self.blob_name = blob_name
+        self._path = container.path(blob_name)
+
+    def get_blob_properties(self, **kwargs):
+        return self.container.properties(self.blob_name)
+
+    def download_blob(self, offset=None, length=None, etag=None, match_condition=None, **kwargs):
+        props = self.get_blob_properties()
+        if match_condition == MatchConditions.IfNotModified and etag != props.etag:
+            raise ResourceModifiedError("The condition specified using HTTP conditional header(s) is not met.")
+        return LocalDownloader(self._path, offset, length)
+
+    def stage_block(self, block_id: str, data, **kwargs):
+        path = self.container.block_path(self.blob_name, block_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data if isinstance(data, (bytes, bytearray, memoryview)) else data.read())
+
+    def commit_block_list(self, block_list, **kwargs):
+        os.makedirs(os.path.dirname(self._path), exist_ok=True)
+        partial = self._path + ".partial"
+        with open(partial, "wb") as out:
+            for block in block_list:
+                block_path = self.container.block_path(self.blob_name, getattr(block, "id", block))
+                with open(block_path, "rb") as f:
+                    while True:
+                        data = f.read(CHUNK_SIZE)
+                        if not data:
+                            break
+                        out.write(data)
+                os.remove(block_path)
+        os.replace(partial, self._path)
+
+    def upload_blob(self, data, overwrite=False, **kwargs):
+        os.makedirs(os.path.dirname(self._path), exist_ok=True)
+        with open(self._path, "wb") as f:
+            f.write(data if isinstance(data, (bytes, bytearray, memoryview)) else data.read())
+
+
+class LocalContainerClient:
+    def __init__(self, root: str, name: str):
+        self.container_name = name
+        self.root = os.path.join(root, name)
+
+    def path(self, blob_name: str) -> str:
+        return os.path.join(self.root, *blob_name.split("/"))
+
+    def block_path(self, blob_name: str, block_id: str) -> str:
+        key = hashlib.sha1(f"{blob_name}/{block_id}".encode()).hexdigest()
+        return os.path.join(self.root, ".blocks", key)
+
+    def exists(self) -> bool:
+        return os.path.isdir(self.root)
+
+    def create_container(self):
+        os.makedirs(self.root, exist_ok=True)
+
+    def properties(self, blob_name: str):
+        path = self.path(blob_name)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            raise ResourceNotFoundError(f"The specified blob does not exist: {blob_name}")
+        # Real listings carry the MD5 only for single-shot uploads; leave it unset
+        return SimpleNamespace(
+            name=blob_name, size=stat.st_size, etag=_etag(stat),
+            content_settings=SimpleNamespace(content_md5=None),
+        )
+
+    def list_blobs(self, name_starts_with: str = "", include=None):
+        names = []
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = [d for d in dirnames if d != ".blocks"]
+            for filename in filenames:
+                if filename.endswith(".partial"):
+                    continue
+                name = os.path.relpath(os.path.join(dirpath, filename), self.root).replace(os.sep, "/")
+                if name.startswith(name_starts_with):
+                    names.append(name)
+        return [self.properties(name) for name in sorted(names)]
+
+    def get_blob_client(self, blob):
+        return LocalBlobClient(self, getattr(blob, "name", blob))
+
+
+class LocalBlobServiceClient:
+    """Drop-in for BlobServiceClient; every instance shares the class-level root"""
+    root = None
+
+    def __init__(self, root: str = None):
+        self.root = root or LocalBlobServiceClient.root
+        if self.root is None:
+            raise ValueError("LocalBlobServiceClient.root is not set")
+
+    @classmethod
+    def from_connection_string(cls, conn_str, **kwargs):
+        return cls()
+
+    def get_container_client(self, name: str):
+        return LocalContainerClient(self.root, name)
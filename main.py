@@ -1,6 +1,8 @@
-from fastapi import FastAPI
+import time
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.routers.projects import router as api_router
+from app.core.metrics import HTTP_REQUEST_SECONDS, registry as metrics_registry
 
 def create_app():
     app = FastAPI()
@@ -14,8 +16,32 @@ def create_app():
         allow_headers=["*"],
     )
     
+    @app.middleware("http")
+    async def record_latency(request: Request, call_next):
+        start = time.perf_counter()
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            # Route template, not the raw path, so job ids do not explode the label set
+            route = request.scope.get("route")
+            template = getattr(route, "path", None) or "unmatched"
+            # Newer FastAPI keeps included routes unprefixed and records the include separately
+            included = (request.scope.get("fastapi") or {}).get("included_router")
+            if route is not None and included is not None:
+                template = included.include_context.prefix + template
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - start, method=request.method, route=template, status=status,
+            )
+
     # Include routers
     app.include_router(api_router, prefix="/api/projects")
+
+    @app.get("/metrics", include_in_schema=False)
+    def metrics():
+        return Response(metrics_registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
     
     return app
 
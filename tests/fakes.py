@@ -0,0 +1,154 @@
+"""In-memory stand-ins for the parts of azure-storage-blob the app uses, and helpers the tests share."""
+import base64
+import hashlib
+import sqlite3
+import threading
+from types import SimpleNamespace
+
+from azure.core import MatchConditions
+from azure.core.exceptions import ResourceModifiedError, ResourceNotFoundError
+
+MB = 1024 * 1024
+
+
+def b64md5(data: bytes) -> str:
+    """Base64 MD5, as in a Content-MD5 header"""
+    return base64.b64encode(hashlib.md5(data).digest()).decode("ascii")
+
+
+def sqlite_rows(path, query: str) -> list:
+    """Rows a query returns from the sqlite target database"""
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute(query).fetchall()
+    finally:
+        conn.close()
+
+
+class FakeDownloader:
+    def __init__(self, data: bytes, chunk_size: int = 4 * 1024 * 1024):
+        self._data = data
+        self._chunk_size = chunk_size
+
+    def readall(self) -> bytes:
+        return self._data
+
+    def chunks(self):
+        for i in range(0, len(self._data), self._chunk_size):
+            yield self._data[i:i + self._chunk_size]
+
+
+class FakeBlobClient:
+    def __init__(self, container, blob_name: str):
+        self.container = container
+        self.blob_name = blob_name
+        self.range_requests = []
+
+    def get_blob_properties(self, **kwargs):
+        return self.container.properties(self.blob_name)
+
+    def download_blob(self, offset=None, length=None, etag=None, match_condition=None, **kwargs):
+        data, current_etag = self.container.read(self.blob_name)
+        if match_condition == MatchConditions.IfNotModified and etag != current_etag:
+            raise ResourceModifiedError("The condition specified using HTTP conditional header(s) is not met.")
+        if offset is not None:
+            self.range_requests.append((offset, length))
+            data = data[offset:offset + length if length is not None else None]
+        return FakeDownloader(data)
+
+    def stage_block(self, block_id, data, **kwargs):
+        self.container.stage(self.blob_name, block_id, data)
+
+    def get_block_list(self, block_list_type="committed", **kwargs):
+        return [], [SimpleNamespace(id=block_id) for block_id in self.container.staged_ids(self.blob_name)]
+
+    def commit_block_list(self, block_list, content_settings=None, metadata=None, **kwargs):
+        content_md5 = content_settings.content_md5 if content_settings else None
+        self.container.commit(self.blob_name, [block.id for block in block_list], content_md5, metadata)
+
+    def upload_blob(self, data, overwrite=False, metadata=None, **kwargs):
+        self.container.put(self.blob_name, data, metadata)
+
+    def delete_blob(self, **kwargs):
+        self.container.delete(self.blob_name)
+
+
+class FakeContainerClient:
+    def __init__(self, name: str = "container"):
+        self.container_name = name
+        self._blobs = {}
+        self._version = 0
+        self._staged = {}
+        self._content_md5 = {}
+        self._metadata = {}
+        self._lock = threading.Lock()
+
+    def put(self, blob_name: str, data: bytes, metadata: dict = None):
+        with self._lock:
+            self._metadata[blob_name] = dict(metadata or {})
+            self._version += 1
+            self._blobs[blob_name] = (bytes(data), f'"0x{self._version:X}"')
+
+    def delete(self, blob_name: str):
+        with self._lock:
+            if self._blobs.pop(blob_name, None) is None:
+                raise ResourceNotFoundError(f"The specified blob does not exist: {blob_name}")
+            self._metadata.pop(blob_name, None)
+            self._content_md5.pop(blob_name, None)
+
+    def stage(self, blob_name: str, block_id: str, data: bytes):
+        with self._lock:
+            self._staged[(blob_name, block_id)] = bytes(data)
+
+    def staged_ids(self, blob_name: str) -> list:
+        with self._lock:
+            return [block_id for name, block_id in self._staged if name == blob_name]
+
+    def staged_blocks(self, blob_name: str) -> int:
+        return len(self.staged_ids(blob_name))
+
+    def commit(self, blob_name: str, block_ids, content_md5=None, metadata=None):
+        with self._lock:
+            data = b"".join(self._staged[(blob_name, block_id)] for block_id in block_ids)
+            self._staged = {key: value for key, value in self._staged.items() if key[0] != blob_name}
+            if content_md5 is not None:
+                self._content_md5[blob_name] = bytearray(content_md5)
+            else:
+                self._content_md5.pop(blob_name, None)
+        self.put(blob_name, data, metadata)
+
+    def read(self, blob_name: str):
+        with self._lock:
+            if blob_name not in self._blobs:
+                raise ResourceNotFoundError(f"The specified blob does not exist: {blob_name}")
+            return self._blobs[blob_name]
+
+    def properties(self, blob_name: str):
+        data, etag = self.read(blob_name)
+        content_md5 = self._content_md5.get(blob_name, bytearray(hashlib.md5(data).digest()))
+        return SimpleNamespace(
+            name=blob_name,
+            size=len(data),
+            etag=etag,
+            content_settings=SimpleNamespace(content_md5=content_md5),
+            metadata=dict(self._metadata.get(blob_name, {})),
+        )
+
+    def exists(self) -> bool:
+        return True
+
+    def list_blobs(self, name_starts_with: str = "", include=None):
+        with self._lock:
+            names = sorted(name for name in self._blobs if name.startswith(name_starts_with))
+        return [self.properties(name) for name in names]
+
+    def get_blob_client(self, blob):
+        return FakeBlobClient(self, getattr(blob, "name", blob))
+
+
+class FakeBlobServiceClient:
+    def __init__(self, container: FakeContainerClient = None):
+        self.container = container or FakeContainerClient()
+
+    def get_container_client(self, name: str):
+        return self.container
@@ -0,0 +1,65 @@
+import pytest
+
+from app.services import catalog_cache
+from app.services.loaders import ExecuteManyLoader, create_loader
+
+TYPE_MAP = {"USUBJID": "VARCHAR(20)", "AESEQ": "SMALLINT"}
+
+
+@pytest.fixture
+def sqlite_loader(sqlite_target):
+    loader = create_loader()
+    conn = loader.connect()
+    statements = []
+    conn.set_trace_callback(statements.append)
+    yield loader, conn.cursor(), statements
+    catalog_cache.invalidate(loader.catalog_key())
+    conn.close()
+
+
+def ddl(statements):
+    return [sql.split("(")[0].strip() for sql in statements if sql.lstrip().upper().startswith(("CREATE", "DROP"))]
+
+
+def test_refreshed_catalog_skips_known_ddl(sqlite_loader):
+    loader, cursor, statements = sqlite_loader
+    loader.ensure_table(cursor, "P1_SDTM", "dm", ["USUBJID"], TYPE_MAP)
+    catalog_cache.invalidate(loader.catalog_key())
+
+    catalog_cache.refresh(loader, cursor, ["P1_SDTM", "P1_ADAM"])
+    statements.clear()
+    loader.ensure_schema(cursor, "P1_SDTM")
+    loader.ensure_table(cursor, "P1_SDTM", "dm", ["USUBJID"], TYPE_MAP)
+    loader.drop_table(cursor, "P1_SDTM", "ae")  # known missing
+    loader.ensure_table(cursor, "P1_SDTM", "ae", list(TYPE_MAP), TYPE_MAP)
+    loader.ensure_table(cursor, "P1_SDTM", "ae", list(TYPE_MAP), TYPE_MAP)
+    loader.drop_table(cursor, "P1_SDTM", "ae")
+    loader.ensure_table(cursor, "P1_SDTM", "ae", list(TYPE_MAP), TYPE_MAP)
+
+    assert ddl(statements) == [
+        'CREATE TABLE IF NOT EXISTS "P1_SDTM.ae"',
+        'DROP TABLE IF EXISTS "P1_SDTM.ae"',
+        'CREATE TABLE IF NOT EXISTS "P1_SDTM.ae"',
+    ]
+    assert catalog_cache.table_columns(loader.catalog_key(), "P1_SDTM", "dm") == {"USUBJID": "VARCHAR(20)"}
+    assert catalog_cache.table_columns(loader.catalog_key(), "P1_ADAM", "adsl") is False
+
+
+def test_invalidated_schema_goes_back_to_the_database(sqlite_loader):
+    loader, cursor, statements = sqlite_loader
+    catalog_cache.refresh(loader, cursor, ["P1_SDTM"])
+    loader.ensure_table(cursor, "P1_SDTM", "dm", ["USUBJID"], TYPE_MAP)
+    cursor.connection.rollback()  # the CREATE never happened
+
+    catalog_cache.invalidate(loader.catalog_key(), "P1_SDTM")
+    statements.clear()
+    loader.ensure_table(cursor, "P1_SDTM", "dm", ["USUBJID"], TYPE_MAP)
+
+    assert ddl(statements) == ['CREATE TABLE IF NOT EXISTS "P1_SDTM.dm"']
+
+
+def test_sql_server_catalog_types_round_trip():
+    assert ExecuteManyLoader.catalog_type("varchar", 20, 0, 0) == "VARCHAR(20)"
+    assert ExecuteManyLoader.catalog_type("nvarchar", -1, 0, 0) == "NVARCHAR(MAX)"
+    assert ExecuteManyLoader.catalog_type("nvarchar", 40, 0, 0) == "NVARCHAR(20)"
+    assert ExecuteManyLoader.catalog_type("datetime2", 8, 27, 7) == "DATETIME2"
@@ -0,0 +1,185 @@
+import asyncio
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.routers import projects
+from app.core.config import settings
+from app.db.session import get_db
+from app.services import chunked_upload
+from main import app
+from tests.fakes import MB, b64md5
+
+
+@pytest.fixture
+def project(monkeypatch):
+    project = SimpleNamespace(ProjectNumber="P1", IsDatasetUploaded=False)
+    monkeypatch.setattr(projects, "get_project", lambda db, number: project if number == "P1" else None)
+    app.dependency_overrides[get_db] = lambda: SimpleNamespace(commit=lambda: None)
+    yield project
+    del app.dependency_overrides[get_db]
+
+
+def test_chunks_in_any_order_resume_and_commit(container, project):
+    client = TestClient(app)
+    payload = os.urandom(2 * MB + 12345)
+    chunks = [payload[i:i + MB] for i in range(0, len(payload), MB)]
+
+    created = client.post("/api/projects/uploads", json={
+        "ProjectNumber": "P1", "filename": "big data.zip", "size_bytes": len(payload), "chunk_size_mb": 1,
+    })
+    assert created.status_code == 201
+    upload = created.json()
+    assert (upload["blob_path"], upload["chunk_count"], upload["missing_chunks"]) == ("raw/P1/big_data.zip", 3, [0, 1, 2])
+    url = f"/api/projects/uploads/{upload['upload_id']}"
+
+    # Chunks 2 and 0 in parallel, then the connection "drops" before chunk 1
+    with ThreadPoolExecutor(2) as pool:
+        responses = list(pool.map(lambda i: client.put(f"{url}/chunks/{i}", content=chunks[i]), [2, 0]))
+    assert [r.json()["content_md5"] for r in responses] == [b64md5(chunks[2]), b64md5(chunks[0])]
+    assert client.post(f"{url}/complete").status_code == 409
+
+    status = client.get(url).json()
+    assert (status["missing_chunks"], status["bytes_received"]) == ([1], len(chunks[0]) + len(chunks[2]))
+    assert client.put(f"{url}/chunks/1", content=chunks[1], headers={"Content-MD5": b64md5(b"other")}).status_code == 400
+    assert client.put(f"{url}/chunks/1", content=chunks[1], headers={"Content-MD5": b64md5(chunks[1])}).status_code == 200
+
+    done = client.post(f"{url}/complete", json={"content_md5": b64md5(payload)})
+    assert done.status_code == 200
+    assert done.json()["state"] == "completed" and done.json()["missing_chunks"] == []
+    assert done.json()["extracted"] == []  # not a real archive
+    assert container.read("raw/P1/big_data.zip")[0] == payload
+    assert bytes(container.properties("raw/P1/big_data.zip").content_settings.content_md5) == hashlib.md5(payload).digest()
+    assert project.IsDatasetUploaded
+    assert client.put(f"{url}/chunks/0", content=chunks[0]).status_code == 409
+
+
+def test_rejects_bad_chunks_and_unknown_uploads(container, project):
+    client = TestClient(app)
+    upload = client.post("/api/projects/uploads", json={
+        "ProjectNumber": "P1", "filename": "adsl.sas7bdat", "size_bytes": MB + 10, "chunk_size_mb": 1,
+    }).json()
+    url = f"/api/projects/uploads/{upload['upload_id']}"
+
+    assert client.put(f"{url}/chunks/1", content=b"x" * 9).status_code == 400
+    assert client.put(f"{url}/chunks/0", content=b"x" * (MB + 1)).status_code == 400
+    assert client.put(f"{url}/chunks/2", content=b"x" * 10).status_code == 400
+    assert client.get("/api/projects/uploads/nope").status_code == 404
+    assert client.post("/api/projects/uploads", json={
+        "ProjectNumber": "P2", "filename": "adsl.sas7bdat", "size_bytes": 10,
+    }).status_code == 404
+    assert client.post("/api/projects/uploads", json={
+        "ProjectNumber": "P1", "filename": "run.exe", "size_bytes": 10,
+    }).status_code == 400
+    assert container.staged_blocks("raw/P1/adsl.sas7bdat") == 0
+
+
+def test_content_md5_is_checked_against_the_chunks_never_trusted(container, project):
+    client = TestClient(app)
+    payload, stored = os.urandom(MB + 10), os.urandom(MB + 10)
+    container.put("raw/P1/adsl.sas7bdat", stored)
+    etag = container.properties("raw/P1/adsl.sas7bdat").etag
+    # Announces the MD5 the blob already holds, then sends other bytes
+    upload = client.post("/api/projects/uploads", json={
+        "ProjectNumber": "P1", "filename": "adsl.sas7bdat", "size_bytes": len(payload), "chunk_size_mb": 1,
+        "content_md5": b64md5(stored),
+    }).json()
+    url = f"/api/projects/uploads/{upload['upload_id']}"
+    assert upload["state"] == "uploading"
+    for index in (1, 0):
+        client.put(f"{url}/chunks/{index}", content=payload[index * MB:(index + 1) * MB])
+
+    rejected = client.post(f"{url}/complete")
+
+    assert rejected.status_code == 422
+    assert container.properties("raw/P1/adsl.sas7bdat").etag == etag
+    assert client.post(f"{url}/complete", json={"content_md5": b64md5(b"other")}).status_code == 422
+
+    # Chunk 1 resent with other bytes after it was hashed: the commit holds the new
+    # bytes, and since the file's MD5 is no longer known, no Content-MD5
+    payload = payload[:MB] + os.urandom(10)
+    client.put(f"{url}/chunks/1", content=payload[MB:])
+    done = client.post(f"{url}/complete", json={"content_md5": b64md5(stored)})
+
+    assert done.status_code == 200 and done.json()["content_md5"] is None
+    assert container.read("raw/P1/adsl.sas7bdat")[0] == payload
+    assert container._content_md5.get("raw/P1/adsl.sas7bdat") is None
+
+
+def test_without_every_chunk_hashed_no_md5_is_stored(monkeypatch, container, project):
+    monkeypatch.setattr(settings, "CHUNKED_UPLOAD_HASH_BUFFER_MB", 1)
+    client = TestClient(app)
+    payload = os.urandom(3 * MB)
+    upload = client.post("/api/projects/uploads", json={
+        "ProjectNumber": "P1", "filename": "adlb.sas7bdat", "size_bytes": len(payload), "chunk_size_mb": 1,
+        "content_md5": b64md5(b"not the file"),
+    }).json()
+    url = f"/api/projects/uploads/{upload['upload_id']}"
+    # Two chunks ahead of chunk 0 overflow the 1 MB reorder buffer
+    for index in (2, 1, 0):
+        client.put(f"{url}/chunks/{index}", content=payload[index * MB:(index + 1) * MB])
+
+    done = client.post(f"{url}/complete").json()
+
+    assert done["state"] == "completed" and done["content_md5"] is None
+    assert container.read("raw/P1/adlb.sas7bdat")[0] == payload
+    assert container._content_md5.get("raw/P1/adlb.sas7bdat") is None
+
+
+def test_another_worker_resumes_the_upload_from_its_record(monkeypatch, container, project):
+    client = TestClient(app)
+    payload = os.urandom(2 * MB)
+    upload = client.post("/api/projects/uploads", json={
+        "ProjectNumber": "P1", "filename": "adae.sas7bdat", "size_bytes": len(payload), "chunk_size_mb": 1,
+        "content_md5": b64md5(payload),
+    }).json()
+    url = f"/api/projects/uploads/{upload['upload_id']}"
+    client.put(f"{url}/chunks/0", content=payload[:MB])
+    first_worker = chunked_upload.registry
+
+    # The next requests land on a worker that never saw the upload
+    monkeypatch.setattr(chunked_upload, "registry", chunked_upload.UploadRegistry())
+    status = client.get(url).json()
+    assert (status["state"], status["missing_chunks"]) == ("uploading", [1])
+    client.put(f"{url}/chunks/1", content=payload[MB:])
+    done = client.post(f"{url}/complete").json()
+
+    # It did not hash chunk 0, so the blob gets no MD5
+    assert done["state"] == "completed" and done["content_md5"] is None
+    assert container.read("raw/P1/adae.sas7bdat")[0] == payload
+    assert first_worker.get(upload["upload_id"]).state == "completed"
+
+
+def test_expired_session_records_are_pruned(monkeypatch, container, project):
+    client = TestClient(app)
+    start = {"ProjectNumber": "P1", "filename": "adae.sas7bdat", "size_bytes": 10}
+    old = client.post("/api/projects/uploads", json=start).json()["upload_id"]
+    monkeypatch.setattr(chunked_upload.time, "time", lambda: 1e10)
+
+    new = client.post("/api/projects/uploads", json=start).json()["upload_id"]
+
+    records = [blob.name for blob in container.list_blobs(chunked_upload.SESSION_PREFIX)]
+    assert records == [f"{chunked_upload.SESSION_PREFIX}{new}.json"]
+    assert chunked_upload.UploadRegistry().get(old) is None
+
+
+def test_chunk_lookup_runs_off_the_event_loop(monkeypatch, container, project):
+    client = TestClient(app)
+    upload = client.post("/api/projects/uploads", json={
+        "ProjectNumber": "P1", "filename": "adae.sas7bdat", "size_bytes": 10,
+    }).json()
+    get = chunked_upload.registry.get
+
+    def blocking_get(upload_id):
+        # Reading a session record is a storage round trip
+        with pytest.raises(RuntimeError):
+            asyncio.get_running_loop()
+        return get(upload_id)
+
+    monkeypatch.setattr(chunked_upload.registry, "get", blocking_get)
+
+    assert client.put(f"/api/projects/uploads/{upload['upload_id']}/chunks/0", content=b"x" * 10).status_code == 200
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+
+from app.services.compact_strings import compact_strings, is_compact
+from app.services.import_profile import parse_profile
+from app.services.row_marshalling import marshal_rows
+from app.services.type_inference import profile_columns
+
+
+def make_block(rows=1000):
+    return pd.DataFrame({
+        "USUBJID": [f"P1-{i % 20:03d}" for i in range(rows)],
+        "AVISIT": np.where(np.arange(rows) % 7 == 0, None, np.array(["BASELINE", "WEEK 4", "WEEK 12"])[np.arange(rows) % 3]),
+        "COMMENT": [f"free text {i}" for i in range(rows)],
+        "AVAL": np.arange(rows, dtype="float64"),
+    })
+
+
+def test_compact_strings_encodes_only_repetitive_columns():
+    df = make_block()
+
+    compact, before, after = compact_strings(df, ["USUBJID", "AVISIT", "COMMENT"])
+
+    assert is_compact(compact["USUBJID"]) and is_compact(compact["AVISIT"])
+    assert not is_compact(compact["COMMENT"])
+    assert compact["AVISIT"].isna().sum() == df["AVISIT"].isna().sum()
+    assert after < before
+    assert not is_compact(df["USUBJID"])
+
+
+def test_compact_strings_expand_only_when_marshalled():
+    df = make_block(50)
+    compact, _, _ = compact_strings(df, ["USUBJID", "AVISIT"])
+
+    assert marshal_rows(compact) == marshal_rows(df)
+    assert type(marshal_rows(compact)[0][0]) is str
+
+
+def test_inference_and_filters_work_on_the_codes():
+    df = make_block()
+    compact, _, _ = compact_strings(df.iloc[:500], ["USUBJID", "AVISIT"])
+    plain_profiles = profile_columns({"USUBJID": "string", "AVISIT": "string"})
+    compact_profiles = profile_columns({"USUBJID": "string", "AVISIT": "string"})
+    for col in ("USUBJID", "AVISIT"):
+        plain_profiles[col].update(df[col].iloc[:500])
+        compact_profiles[col].update(compact[col])
+    profile = parse_profile({"where": [["AVISIT", ">", "WEEK 10"], ["USUBJID", "not in", ["P1-001"]]]})
+
+    assert {col: p.sql_type() for col, p in compact_profiles.items()} == \
+        {col: p.sql_type() for col, p in plain_profiles.items()}
+    assert compact_profiles["AVISIT"].non_null == plain_profiles["AVISIT"].non_null
+    assert profile.apply(compact)["AVAL"].tolist() == profile.apply(df.iloc[:500])["AVAL"].tolist()
@@ -0,0 +1,123 @@
+import threading
+import time
+
+import pytest
+
+from app.core.config import settings
+from app.db.session import ConnectionPool
+
+
+class FakeConnection:
+    def __init__(self, connect_delay=0):
+        time.sleep(connect_delay)
+        self.autocommit = False
+        self.broken = False
+        self.closed = False
+
+    def cursor(self):
+        if self.broken:
+            raise RuntimeError("Communication link failure")
+        return self
+
+    def execute(self, sql):
+        pass
+
+    def fetchall(self):
+        return [(1,)]
+
+    def close(self):
+        self.closed = True
+
+    def rollback(self):
+        pass
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setattr(ConnectionPool, "_idle", type(ConnectionPool._idle)(list))
+    monkeypatch.setattr(ConnectionPool, "_count", type(ConnectionPool._count)(int))
+    monkeypatch.setattr(ConnectionPool, "_stats", type(ConnectionPool._stats)(ConnectionPool._stats.default_factory))
+    monkeypatch.setattr(ConnectionPool, "_create_connection", classmethod(lambda cls, db_name: FakeConnection()))
+    monkeypatch.setattr(settings, "MAX_DB_CONNECTIONS", 2)
+    monkeypatch.setattr(settings, "DB_POOL_WAIT_TIMEOUT_SECONDS", 2)
+    monkeypatch.setattr(settings, "DB_POOL_IDLE_TIMEOUT_SECONDS", 300)
+    monkeypatch.setattr(settings, "DB_POOL_PRE_PING", True)
+    return ConnectionPool
+
+
+def test_lease_returns_connection_for_reuse(pool):
+    with pool.lease("db") as first:
+        first.autocommit = True
+    with pool.lease("db") as second:
+        pass
+
+    assert second is first
+    assert second.autocommit is False
+    stats = pool.stats()["db"]
+    assert (stats["creates"], stats["hits"], stats["open"], stats["idle"]) == (1, 1, 1, 1)
+
+
+def test_waiter_gets_returned_connection_and_times_out_when_none_comes(pool, monkeypatch):
+    held = [pool.get_connection("db"), pool.get_connection("db")]
+    threading.Timer(0.2, pool.return_connection, args=(held[0], "db")).start()
+
+    start = time.monotonic()
+    conn = pool.get_connection("db")
+
+    assert conn is held[0]
+    assert 0.1 < time.monotonic() - start < 1.5
+    monkeypatch.setattr(settings, "DB_POOL_WAIT_TIMEOUT_SECONDS", 0.2)
+    with pytest.raises(RuntimeError):
+        pool.get_connection("db")
+    assert pool.stats()["db"]["timeouts"] == 1
+
+
+def test_slow_connect_does_not_block_idle_checkout(pool, monkeypatch):
+    with pool.lease("db"):
+        pass
+    monkeypatch.setattr(ConnectionPool, "_create_connection", classmethod(lambda cls, db_name: FakeConnection(1)))
+    idle = pool.get_connection("db")
+    opener = threading.Thread(target=pool.get_connection, args=("db",))
+    opener.start()
+    time.sleep(0.1)
+    pool.return_connection(idle, "db")
+
+    start = time.monotonic()
+    assert pool.get_connection("db") is idle
+    assert time.monotonic() - start < 0.5
+    opener.join()
+
+
+def test_broken_and_expired_connections_are_replaced(pool, monkeypatch):
+    conn = pool.get_connection("db")
+    pool.return_connection(conn, "db")
+    conn.broken = True
+
+    replacement = pool.get_connection("db")
+
+    assert replacement is not conn and conn.closed
+    pool.return_connection(replacement, "db")
+    monkeypatch.setattr(settings, "DB_POOL_IDLE_TIMEOUT_SECONDS", 0.05)
+    time.sleep(0.1)
+    assert pool.get_connection("db") is not replacement
+    assert replacement.closed
+    stats = pool.stats()["db"]
+    assert (stats["ping_failures"], stats["expired"], stats["open"]) == (1, 1, 1)
+
+
+def test_concurrent_leases_are_all_counted(pool):
+    def lease_many(worker):
+        for _ in range(300):
+            with pool.lease(f"db{worker % 4}"):
+                pass
+            pool.stats()
+
+    threads = [threading.Thread(target=lease_many, args=(worker,)) for worker in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = pool.stats()
+    assert sorted(stats) == ["db0", "db1", "db2", "db3"]
+    assert sum(s["hits"] + s["creates"] for s in stats.values()) == 8 * 300
@@ -0,0 +1,234 @@
+import os
+import shutil
+import sqlite3
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from app.core.config import settings
+from app.services import converter
+from app.services.import_manifest import ensure_manifest
+from app.services.load_checkpoint import read_checkpoints
+from app.services.loaders import create_loader
+from tests.fakes import sqlite_rows
+
+# Eight rows of a real sas7bdat: date_row (MMDDYY10), text_row ($722), integer_row
+SAS_FILE = os.path.join(os.path.dirname(__file__), "data", "dates.sas7bdat")
+SAS_ROWS = [
+    ("2018-01-02", "Some text", 6.0),
+    ("2018-02-05", "Some more text", 7.0),
+    ("2017-11-21", None, 8.0),  # long lorem ipsum value, checked by prefix
+    ("2016-05-19", "Text", 9.0),
+    ("1999-10-25", "Test", 10.0),
+    ("2016-06-15", "more", 11.0),
+    ("1973-07-14", "again", 12.0),
+    ("2001-04-03", "one more", 13.0),
+]
+
+
+@pytest.fixture
+def sqlite_target(monkeypatch, sqlite_target):
+    monkeypatch.setattr(settings, "CHUNK_SIZE", 3)
+    return sqlite_target
+
+
+@pytest.fixture
+def sas_copy(tmp_path):
+    """process_file deletes the file it loaded, so each test gets its own copy"""
+    return shutil.copy(SAS_FILE, tmp_path / "lb.sas7bdat")
+
+
+def loaded_rows(path, table="P1_SDTM.lb"):
+    return sqlite_rows(path, f'SELECT "date_row", "text_row", "integer_row" FROM "{table}" ORDER BY "integer_row"')
+
+
+def assert_sas_rows(rows):
+    assert len(rows) == len(SAS_ROWS)
+    for row, expected in zip(rows, SAS_ROWS):
+        assert row[0] == expected[0]
+        assert row[2] == expected[2]
+        if expected[1] is None:
+            assert row[1].startswith("Lorem ipsum dolor sit amet")
+        else:
+            assert row[1] == expected[1]
+
+
+def test_plan_partitions_splits_large_files_on_chunk_boundaries(monkeypatch, tmp_path):
+    sas_file = tmp_path / "adlb.sas7bdat"
+    sas_file.write_bytes(b"\0" * 2048)
+    monkeypatch.setattr(settings, "CHUNK_SIZE", 100)
+    monkeypatch.setattr(settings, "PARALLEL_DECODE_PARTITIONS", 3)
+    monkeypatch.setattr(settings, "PARALLEL_DECODE_THRESHOLD_MB", 0)
+
+    partitions = converter.plan_partitions(str(sas_file), 1050)
+
+    assert partitions == [(0, 400), (400, 400), (800, 250)]
+
+
+def test_plan_partitions_keeps_small_files_whole(monkeypatch, tmp_path):
+    sas_file = tmp_path / "dm.sas7bdat"
+    sas_file.write_bytes(b"\0" * 2048)
+    monkeypatch.setattr(settings, "CHUNK_SIZE", 100)
+    monkeypatch.setattr(settings, "PARALLEL_DECODE_PARTITIONS", 4)
+    monkeypatch.setattr(settings, "PARALLEL_DECODE_THRESHOLD_MB", 1)
+
+    assert converter.plan_partitions(str(sas_file), 1050) == []
+
+
+def test_iter_sas_chunks_streams_chunk_size_blocks(sqlite_target):
+    meta = converter.read_sas_metadata(SAS_FILE)
+
+    chunks = list(converter.iter_sas_chunks(SAS_FILE, meta))
+
+    assert [len(chunk) for chunk in chunks] == [3, 3, 2]
+    dates = [str(d.date()) for chunk in chunks for d in chunk["date_row"]]
+    assert dates == [row[0] for row in SAS_ROWS]
+
+
+def test_iter_sas_chunks_row_range_crosses_chunk_boundaries(monkeypatch, sqlite_target):
+    meta = converter.read_sas_metadata(SAS_FILE)
+
+    streamed = list(converter.iter_sas_chunks(SAS_FILE, meta, row_offset=2, row_limit=5))
+    monkeypatch.setattr(settings, "SAS_STREAMING_DECODE", False)
+    whole = list(converter.iter_sas_chunks(SAS_FILE, meta, row_offset=2, row_limit=5))
+
+    assert [len(chunk) for chunk in streamed] == [3, 2]
+    assert [v for chunk in streamed for v in chunk["integer_row"]] == [8.0, 9.0, 10.0, 11.0, 12.0]
+    assert [d for chunk in streamed for d in chunk["date_row"]] == [d for chunk in whole for d in chunk["date_row"]]
+
+
+def test_process_file_loads_sas_file_in_chunks(sqlite_target, sas_copy):
+    assert converter.process_file("P1_SDTM", "lb", str(sas_copy)) == "P1_SDTM.lb"
+
+    assert_sas_rows(loaded_rows(sqlite_target))
+    assert not os.path.exists(sas_copy)
+
+
+@pytest.fixture
+def partitioned_target(monkeypatch, sqlite_target):
+    """sqlite target that splits the fixture into two row ranges loaded by spawned workers
+
+    Spawned processes build their own settings from the environment, so the
+    values they need are set there as well.
+    """
+    values = {
+        "BULK_LOADER": "sqlite", "SQLITE_PATH": sqlite_target, "CHUNK_SIZE": 2,
+        "PARALLEL_DECODE_PARTITIONS": 2, "PARALLEL_DECODE_THRESHOLD_MB": 0,
+    }
+    for name, value in values.items():
+        monkeypatch.setattr(settings, name, value)
+        monkeypatch.setenv(name, str(value))
+    return sqlite_target
+
+
+def reject_rows_from(path, integer_row):
+    """Make inserts of rows with integer_row >= the given value fail, as a broken target would"""
+    conn = sqlite3.connect(path)
+    conn.execute(
+        f'CREATE TRIGGER "reject" BEFORE INSERT ON "P1_SDTM.lb" WHEN NEW."integer_row" >= {integer_row} '
+        "BEGIN SELECT RAISE(ABORT, 'rejected row'); END"
+    )
+    conn.commit()
+    conn.close()
+
+
+def create_fixture_table():
+    """The fixture's table (and the schema's manifest), created before a test breaks it"""
+    meta = converter.read_sas_metadata(SAS_FILE)
+    columns, type_map = converter.table_layout(meta)
+    loader = create_loader()
+    conn = loader.connect()
+    loader.ensure_table(conn.cursor(), "P1_SDTM", "lb", columns, type_map)
+    ensure_manifest(loader, conn.cursor(), "P1_SDTM")
+    conn.commit()
+    loader.release(conn)
+    return type_map
+
+
+def test_process_file_loads_partitions_in_worker_processes(partitioned_target, sas_copy):
+    assert converter.plan_partitions(SAS_FILE, 8) == [(0, 4), (4, 4)]
+
+    assert converter.process_file("P1_SDTM", "lb", str(sas_copy)) == "P1_SDTM.lb"
+
+    assert_sas_rows(loaded_rows(partitioned_target))
+
+
+def test_dead_worker_process_does_not_break_later_imports(monkeypatch, partitioned_target):
+    monkeypatch.setattr(settings, "IMPORT_EXECUTION_MODE", "process")
+    monkeypatch.setattr(settings, "PROCESSING_WORKERS", 1)
+    monkeypatch.setattr(converter, "_processing_executor", None)
+    executor = converter.shared_processing_executor()
+    try:
+        # As when the OS kills a worker that ran out of memory
+        with pytest.raises(BrokenProcessPool):
+            executor.submit(os._exit, 1).result()
+
+        replacement = converter.shared_processing_executor()
+
+        assert replacement is not executor
+        assert replacement.submit(converter.plan_partitions, SAS_FILE, 8).result() == [(0, 4), (4, 4)]
+    finally:
+        converter.shared_processing_executor().shutdown()
+
+
+def test_failed_partition_raises_and_keeps_finished_ranges(partitioned_target):
+    type_map = create_fixture_table()
+    reject_rows_from(partitioned_target, 12)
+
+    with pytest.raises(RuntimeError, match="1 of 2 partitions failed") as failure:
+        converter.load_partitions("P1_SDTM", "lb", SAS_FILE, [(0, 4), (4, 4)], type_map)
+
+    assert "rejected row" in str(failure.value.__cause__)
+    # The failed range rolled back as a whole, the other range committed
+    assert [row[2] for row in loaded_rows(partitioned_target)] == [6.0, 7.0, 8.0, 9.0]
+
+
+def test_failed_partition_resumes_from_its_checkpoint(monkeypatch, partitioned_target, sas_copy):
+    monkeypatch.setattr(settings, "LOAD_CHECKPOINT_CHUNKS", 1)
+    monkeypatch.setenv("LOAD_CHECKPOINT_CHUNKS", "1")
+    source = {"blob_name": "application/P1/SDTM/lb.sas7bdat", "etag": '"0x1"', "content_md5": None, "size_bytes": 0}
+    create_fixture_table()
+    reject_rows_from(partitioned_target, 12)
+    retry_copy = shutil.copy(sas_copy, sas_copy.parent / "retry.sas7bdat")
+
+    assert converter.process_file("P1_SDTM", "lb", str(sas_copy), source) is None
+
+    # Rows 10-11 of the failed range were checkpointed before rows 12-13 failed
+    assert [row[2] for row in loaded_rows(partitioned_target)] == [6.0, 7.0, 8.0, 9.0, 10.0, 11.0]
+    loader = create_loader()
+    conn = loader.connect()
+    assert read_checkpoints(loader, conn.cursor(), "P1_SDTM", source) == {0: (4, 4), 4: (4, 2)}
+    conn.execute('DROP TRIGGER "reject"')
+    conn.commit()
+    loader.release(conn)
+
+    assert converter.process_file("P1_SDTM", "lb", str(retry_copy), source) == "P1_SDTM.lb"
+
+    assert_sas_rows(loaded_rows(partitioned_target))
+    conn = loader.connect()
+    assert read_checkpoints(loader, conn.cursor(), "P1_SDTM", source) == {}
+    loader.release(conn)
+
+
+def column_types(path, table="P1_SDTM.lb"):
+    return {row[1]: row[2] for row in sqlite_rows(path, f'PRAGMA table_info("{table}")')}
+
+
+def test_changed_type_inference_does_not_reuse_the_sidecar(monkeypatch, sqlite_target, sas_copy, tmp_path):
+    pytest.importorskip("pyarrow")
+    monkeypatch.setattr(settings, "SAS_SIDECAR_CACHE", True)
+    monkeypatch.setattr(settings, "SAS_SIDECAR_DIR", str(tmp_path / "sidecars"))
+    source = {"blob_name": "application/P1/SDTM/lb.sas7bdat", "etag": '"0x1"', "content_md5": None, "size_bytes": 0}
+    retry_copy = shutil.copy(sas_copy, tmp_path / "retry.sas7bdat")
+    create_fixture_table()
+    assert converter.process_file("P1_SDTM", "lb", str(sas_copy), source) == "P1_SDTM.lb"
+    metadata_types = column_types(sqlite_target)
+    monkeypatch.setattr(settings, "SQL_TYPE_INFERENCE", "data")
+
+    assert converter.process_file("P1_SDTM", "lb", str(retry_copy), source, replace=True) == "P1_SDTM.lb"
+
+    data_types = column_types(sqlite_target)
+    assert data_types["text_row"] != metadata_types["text_row"]
+    assert data_types["integer_row"] != metadata_types["integer_row"]
+    assert_sas_rows(loaded_rows(sqlite_target))
+    assert len(os.listdir(settings.SAS_SIDECAR_DIR)) == 1
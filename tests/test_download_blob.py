@@ -0,0 +1,57 @@
+import os
+
+import pytest
+from azure.core.exceptions import ResourceModifiedError
+
+from app.core.config import settings
+from app.services.converter import download_blob
+from tests.fakes import MB
+
+
+@pytest.fixture(autouse=True)
+def adlb(container):
+    container.put("application/P1/ADAM/adlb.sas7bdat", os.urandom(5 * MB + 123))
+
+
+def test_parallel_ranged_download_reuses_listing_size(monkeypatch, container):
+    monkeypatch.setattr(settings, "DOWNLOAD_RANGE_CONCURRENCY", 3)
+    monkeypatch.setattr(settings, "DOWNLOAD_RANGE_SIZE_MB", 1)
+    listed = container.list_blobs("application/P1/ADAM/")[0]
+    blob_client = container.get_blob_client(listed)
+    blob_client.get_blob_properties = lambda **kwargs: pytest.fail("listing size should be reused")
+
+    tmp_path = download_blob(blob_client, listed.size, listed.etag)
+    try:
+        with open(tmp_path, "rb") as f:
+            assert f.read() == container.read(listed.name)[0]
+    finally:
+        os.remove(tmp_path)
+    assert sorted(blob_client.range_requests) == [(i * MB, MB) for i in range(5)] + [(5 * MB, 123)]
+
+
+def test_parallel_ranged_download_fails_when_blob_changes(monkeypatch, container):
+    monkeypatch.setattr(settings, "DOWNLOAD_RANGE_CONCURRENCY", 2)
+    monkeypatch.setattr(settings, "DOWNLOAD_RANGE_SIZE_MB", 1)
+    listed = container.list_blobs("application/P1/ADAM/")[0]
+    container.put(listed.name, os.urandom(listed.size))
+    blob_client = container.get_blob_client(listed)
+    download, requested = blob_client.download_blob, []
+    blob_client.download_blob = lambda **kwargs: requested.append(kwargs["offset"]) or download(**kwargs)
+
+    with pytest.raises(ResourceModifiedError):
+        download_blob(blob_client, listed.size, listed.etag)
+
+    # The ranges still queued behind the failed ones are not fetched
+    assert len(requested) < len(range(0, listed.size, MB))
+
+
+def test_single_stream_download_without_listing(monkeypatch, container):
+    monkeypatch.setattr(settings, "DOWNLOAD_RANGE_CONCURRENCY", 1)
+    blob_client = container.get_blob_client("application/P1/ADAM/adlb.sas7bdat")
+
+    tmp_path = download_blob(blob_client)
+    try:
+        assert os.path.getsize(tmp_path) == 5 * MB + 123
+    finally:
+        os.remove(tmp_path)
+    assert blob_client.range_requests == []
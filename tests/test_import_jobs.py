@@ -0,0 +1,91 @@
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.services import import_jobs
+from app.services.import_jobs import JobRegistry, report_progress
+from main import app
+
+
+def wait_for(job, states=("done", "failed"), timeout=5):
+    deadline = time.time() + timeout
+    while job.state not in states:
+        assert time.time() < deadline, f"job stuck in {job.state}"
+        time.sleep(0.01)
+
+
+def test_job_reports_per_file_progress(monkeypatch):
+    registry = JobRegistry()
+    monkeypatch.setattr(import_jobs, "registry", registry)
+    release = threading.Event()
+
+    def run(job):
+        job.add_file("application/P1/SDTM/dm.sas7bdat", "P1_SDTM", "dm", 2048)
+        job.add_file("application/P1/SDTM/ae.sas7bdat", "P1_SDTM", "ae", 1024, state="skipped")
+        key = (job.id, "application/P1/SDTM/dm.sas7bdat")
+        job.update_file(key[1], {"state": "downloading"})
+        job.update_file(key[1], {"add_bytes_transferred": 2048})
+        report_progress(key, state="inserting", rows_total=10)
+        report_progress(key, add_rows_inserted=4)
+        release.wait(5)
+        return {"status": "success"}
+
+    job = registry.submit("P1", False, run)
+    deadline = time.time() + 5
+    while job.as_dict()["rows_inserted"] < 4:
+        assert time.time() < deadline
+        time.sleep(0.01)
+
+    running = job.as_dict()
+    assert running["state"] == "running"
+    assert [f["state"] for f in running["files"]] == ["inserting", "skipped"]
+    assert running["files"][0]["bytes_transferred"] == 2048
+    assert running["files"][0]["rows_total"] == 10
+    release.set()
+    wait_for(job)
+    assert job.state == "done"
+
+
+def test_late_worker_report_does_not_reopen_finished_file():
+    job = import_jobs.ImportJob("P1")
+    job.add_file("dm.sas7bdat", "P1_SDTM", "dm")
+    job.update_file("dm.sas7bdat", {"state": "done"})
+
+    job.update_file("dm.sas7bdat", {"state": "inserting", "add_rows_inserted": 5})
+
+    assert job.as_dict()["files"][0]["state"] == "done"
+    assert job.as_dict()["rows_inserted"] == 5
+
+
+def test_one_active_job_per_project(monkeypatch):
+    registry = JobRegistry()
+    release = threading.Event()
+    first = registry.submit("P1", False, lambda job: release.wait(5) and {"status": "success"})
+
+    with pytest.raises(ValueError):
+        registry.submit("P1", True, lambda job: {"status": "success"})
+    release.set()
+    wait_for(first)
+    failed = registry.submit("P1", True, lambda job: {"status": "error", "message": "Database setup failed"})
+    wait_for(failed)
+    assert failed.state == "failed"
+    assert failed.error == "Database setup failed"
+
+
+def test_import_job_endpoints(monkeypatch):
+    registry = JobRegistry()
+    monkeypatch.setattr("app.api.routers.projects.import_jobs", registry)
+    monkeypatch.setattr("app.api.routers.projects.upload_sas_files", lambda req, job: {"status": "success"})
+    client = TestClient(app)
+
+    response = client.post("/api/projects/import-jobs", json={"project_name": "P1"})
+
+    assert response.status_code == 202
+    job_id = response.json()["job_id"]
+    wait_for(registry.get(job_id))
+    status = client.get(response.json()["status_url"])
+    assert status.status_code == 200
+    assert status.json()["state"] == "done"
+    assert client.get("/api/projects/import-jobs/unknown").status_code == 404
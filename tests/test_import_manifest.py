@@ -0,0 +1,119 @@
+import hashlib
+import os
+import sqlite3
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.config import settings
+from app.services import converter
+from app.services.import_manifest import blob_source, import_settings_digest, is_unchanged
+from app.services.import_profile import DatasetProfile
+from tests.fakes import FakeBlobServiceClient, sqlite_rows
+
+SAS_FILE = os.path.join(os.path.dirname(__file__), "data", "dates.sas7bdat")
+BLOB_NAME = "application/P1/SDTM/lb.sas7bdat"
+
+
+def make_blob(name="application/P1/SDTM/dm.sas7bdat", data=b"dm", etag='"0x8DC1"'):
+    md5 = bytearray(hashlib.md5(data).digest())
+    return SimpleNamespace(name=name, etag=etag, size=len(data), content_settings=SimpleNamespace(content_md5=md5))
+
+
+def test_blob_source_keeps_etag_and_encodes_md5():
+    source = blob_source(make_blob())
+
+    assert source["etag"] == '"0x8DC1"'
+    assert source["size_bytes"] == 2
+    assert source["content_md5"] == "YI59wRbecVcwYBK08L6CrA=="
+
+
+def test_is_unchanged_matches_on_etag_or_identical_content():
+    entry = blob_source(make_blob())
+
+    assert is_unchanged(entry, blob_source(make_blob()))
+    assert is_unchanged(entry, blob_source(make_blob(etag='"0x8DC2"')))
+    assert not is_unchanged(entry, blob_source(make_blob(data=b"dm2", etag='"0x8DC2"')))
+    assert not is_unchanged(None, blob_source(make_blob()))
+
+
+def test_is_unchanged_requires_the_same_import_settings(monkeypatch):
+    digest = import_settings_digest()
+    entry = dict(blob_source(make_blob()), settings_digest=digest)
+
+    assert is_unchanged(entry, dict(blob_source(make_blob()), settings_digest=digest))
+    assert not is_unchanged(entry, dict(blob_source(make_blob()), settings_digest=None))
+    assert import_settings_digest(DatasetProfile(("USUBJID",))) != digest
+    monkeypatch.setattr(settings, "SQL_TYPE_INFERENCE", "data")
+    assert import_settings_digest() != digest
+
+
+@pytest.fixture
+def project(monkeypatch, tmp_path, container, sqlite_target):
+    """Project P1 with one SDTM dataset in a fake container, imported into sqlite"""
+    with open(SAS_FILE, "rb") as f:
+        container.put(BLOB_NAME, f.read())
+    monkeypatch.setattr(converter, "get_blob_service_client", lambda: FakeBlobServiceClient(container))
+    monkeypatch.setattr(settings, "IMPORT_EXECUTION_MODE", "thread")
+    monkeypatch.setattr(settings, "IMPORT_PROFILE_DIR", str(tmp_path / "profiles"))
+    return container
+
+
+def import_project(force=False):
+    return converter.upload_sas_files(converter.ProjectRequest(project_name="P1", force=force))
+
+
+def table_rows():
+    return sqlite_rows(settings.SQLITE_PATH, 'SELECT COUNT(*) FROM "P1_SDTM.lb"')[0][0]
+
+
+def test_unchanged_blob_is_skipped_on_the_second_import(project):
+    first = import_project()
+    second = import_project()
+
+    assert first["tables_inserted"] == ["P1_SDTM.lb"]
+    assert second["tables_inserted"] == []
+    assert second["files_skipped"] == [BLOB_NAME]
+    assert table_rows() == 8
+
+
+def test_force_reimports_and_replaces_the_table(project):
+    import_project()
+
+    result = import_project(force=True)
+
+    assert result["tables_inserted"] == ["P1_SDTM.lb"]
+    assert result["files_skipped"] == []
+    assert table_rows() == 8
+
+
+def test_changed_blob_is_reimported(project):
+    import_project()
+    data, _ = project.read(BLOB_NAME)
+    project.put(BLOB_NAME, data + b"\0" * 512)
+
+    result = import_project()
+
+    assert result["tables_inserted"] == ["P1_SDTM.lb"]
+    assert table_rows() == 8
+
+
+def test_changed_import_settings_reimport_an_unchanged_blob(monkeypatch, project):
+    import_project()
+    monkeypatch.setattr(settings, "SAS_COMPACT_STRINGS", not settings.SAS_COMPACT_STRINGS)
+
+    result = import_project()
+
+    assert result["tables_inserted"] == ["P1_SDTM.lb"]
+    assert import_project()["files_skipped"] == [BLOB_NAME]
+    assert table_rows() == 8
+
+
+def test_manifest_from_an_older_version_is_recreated(project):
+    conn = sqlite3.connect(settings.SQLITE_PATH)
+    conn.execute('CREATE TABLE "P1_SDTM._import_manifest" ("blob_name" TEXT, "etag" TEXT)')
+    conn.commit()
+    conn.close()
+
+    assert import_project()["tables_inserted"] == ["P1_SDTM.lb"]
+    assert import_project()["files_skipped"] == [BLOB_NAME]
@@ -0,0 +1,67 @@
+import threading
+import time
+from types import SimpleNamespace
+
+from app.services.import_pipeline import ByteBudget, FileTask, ImportPipeline
+
+
+def make_task(name, size):
+    return FileTask("P1_SDTM", name, SimpleNamespace(blob_name=f"{name}.sas7bdat"), {}, size)
+
+
+def test_pipeline_respects_byte_budget_and_starts_largest_first():
+    in_flight, peak, started = 0, 0, []
+    lock = threading.Lock()
+
+    def download(task):
+        nonlocal in_flight, peak
+        with lock:
+            started.append(task.table_name)
+            in_flight += task.size
+            peak = max(peak, in_flight)
+        return task.table_name
+
+    def process(task, tmp_path):
+        nonlocal in_flight
+        time.sleep(0.01)
+        with lock:
+            in_flight -= task.size
+        return f"{task.schema_name}.{tmp_path}"
+
+    tasks = [make_task("dm", 10), make_task("lb", 60), make_task("ae", 30), make_task("vs", 50)]
+    pipeline = ImportPipeline(download, process, download_workers=1, processing_workers=2,
+                              max_inflight_bytes=80, queue_depth=1)
+
+    results = pipeline.run(tasks)
+
+    assert started == ["lb", "vs", "ae", "dm"]
+    assert peak <= 80
+    assert sorted(result for _, result in results) == ["P1_SDTM.ae", "P1_SDTM.dm", "P1_SDTM.lb", "P1_SDTM.vs"]
+    stats = pipeline.stats()
+    assert stats["download"]["items"] == 4
+    assert stats["process"]["items"] == 4
+    assert stats["peak_inflight_bytes"] <= 80
+
+
+def test_pipeline_reports_failed_downloads_and_releases_budget():
+    def download(task):
+        if task.table_name == "lb":
+            raise IOError("connection reset")
+        return task.table_name
+
+    pipeline = ImportPipeline(download, lambda task, tmp_path: tmp_path, download_workers=2,
+                              processing_workers=1, max_inflight_bytes=100, queue_depth=1)
+
+    results = dict((task.table_name, result) for task, result in pipeline.run([make_task("lb", 90), make_task("dm", 90)]))
+
+    assert results == {"lb": None, "dm": "dm"}
+    assert pipeline.budget.in_use == 0
+    assert pipeline.stats()["download"]["failed"] == 1
+
+
+def test_byte_budget_admits_oversized_file_when_idle():
+    budget = ByteBudget(10)
+
+    assert budget.acquire(50) < 1
+    budget.release(50)
+    assert budget.in_use == 0
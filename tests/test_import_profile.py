@@ -0,0 +1,58 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.core.config import settings
+from app.services.import_profile import DatasetProfile, dataset_profile, load_profiles, parse_profile
+
+COLUMNS = ["STUDYID", "USUBJID", "PARAMCD", "AVAL", "ADT", "ANL01FL"]
+
+
+def test_resolve_matches_file_spelling_and_keeps_file_order():
+    profile = parse_profile({"columns": ["aval", "usubjid", "NOTHERE"], "where": [["paramcd", "in", ["ALT"]]]})
+
+    resolved = profile.resolve(COLUMNS)
+
+    assert resolved.columns == ("USUBJID", "AVAL")
+    assert resolved.keep_columns(COLUMNS) == ["USUBJID", "AVAL"]
+    assert resolved.read_columns(COLUMNS) == ["USUBJID", "PARAMCD", "AVAL"]
+    with pytest.raises(ValueError):
+        parse_profile({"where": [["MISSING", "==", 1]]}).resolve(COLUMNS)
+
+
+def test_apply_filters_rows_like_sql_and_projects_columns():
+    df = pd.DataFrame({
+        "USUBJID": ["S1", "S2", "S3", "S4"],
+        "PARAMCD": ["ALT", "AST", "ALT", None],
+        "AVAL": [10.0, np.nan, 30.0, 40.0],
+        "ADT": pd.Series(["2024-01-01", "2024-02-01", "2023-12-31", "2024-03-01"], dtype="datetime64[s]"),
+    })
+    profile = parse_profile({
+        "columns": ["USUBJID", "AVAL"],
+        "where": [["PARAMCD", "!=", "AST"], ["ADT", ">=", "2024-01-01"]],
+    }).resolve(list(df.columns))
+
+    result = profile.apply(df)
+
+    # S2 is AST, S3 is too early and S4 has no PARAMCD
+    assert result.to_dict("list") == {"USUBJID": ["S1"], "AVAL": [10.0]}
+    assert DatasetProfile().apply(df) is df
+
+
+def test_load_profiles_prefers_domain_qualified_keys(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "IMPORT_PROFILE_DIR", str(tmp_path))
+    (tmp_path / "P1.json").write_text(json.dumps({
+        "ADAM/adlb": {"columns": ["USUBJID"]},
+        "adlb": {"columns": ["AVAL"]},
+    }))
+
+    profiles = load_profiles("P1")
+
+    assert dataset_profile(profiles, "ADAM", "adlb").columns == ("USUBJID",)
+    assert dataset_profile(profiles, "SDTM", "adlb").columns == ("AVAL",)
+    assert dataset_profile(profiles, "SDTM", "lb") is None
+    assert load_profiles("P2") == {}
+    with pytest.raises(ValueError):
+        parse_profile({"where": [["AVAL", "like", "1%"]]})
@@ -0,0 +1,101 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from app.core.config import settings
+from app.services import converter
+from app.services.import_profile import DatasetProfile
+from app.services.load_checkpoint import read_checkpoints
+from app.services.loaders import create_loader
+from tests.fakes import sqlite_rows
+
+SOURCE = {"blob_name": "application/P1/SDTM/lb.sas7bdat", "etag": '"0x1"'}
+TYPE_MAP = {"USUBJID": "VARCHAR(8)", "LBSEQ": "INT"}
+ROWS = pd.DataFrame({"USUBJID": [f"P1-{i:03d}" for i in range(10)], "LBSEQ": [float(i) for i in range(10)]})
+
+
+@pytest.fixture
+def sqlite_target(monkeypatch, sqlite_target):
+    monkeypatch.setattr(settings, "LOAD_CHECKPOINT_CHUNKS", 2)
+    monkeypatch.setattr(settings, "LOAD_RETRY_BACKOFF_SECONDS", 0)
+    loader = create_loader()
+    conn = loader.connect()
+    loader.ensure_table(conn.cursor(), "P1_SDTM", "lb", list(TYPE_MAP), TYPE_MAP)
+    read_checkpoints(loader, conn.cursor(), "P1_SDTM", SOURCE)
+    conn.commit()
+    conn.close()
+    return sqlite_target
+
+
+def fake_chunks(fail_at_row=None, error=ValueError("log full")):
+    """iter_table_chunks over ROWS in blocks of 2 that raises once before yielding fail_at_row"""
+    state = {"failed": False}
+
+    def iter_table_chunks(data_path, meta=None, row_offset=0, row_limit=0, profile=None, progress_key=None):
+        end = row_offset + row_limit if row_limit else len(ROWS)
+        for start in range(row_offset, end, 2):
+            if start == fail_at_row and not state["failed"]:
+                state["failed"] = True
+                raise error
+            yield ROWS.iloc[start:min(start + 2, end)]
+    return iter_table_chunks
+
+
+def loaded_rows(path):
+    return [row[0] for row in sqlite_rows(path, 'SELECT "LBSEQ" FROM "P1_SDTM.lb" ORDER BY "LBSEQ"')]
+
+
+def test_failed_range_resumes_from_last_checkpoint(monkeypatch, sqlite_target):
+    monkeypatch.setattr(converter, "iter_table_chunks", fake_chunks(fail_at_row=6))
+
+    with pytest.raises(ValueError):
+        converter.load_range_checkpointed("P1_SDTM", "lb", "lb.parquet", TYPE_MAP, SOURCE, 0, 10)
+
+    # Rows 0-3 were committed with their checkpoint, row 4-5 rolled back
+    assert loaded_rows(sqlite_target) == [0, 1, 2, 3]
+    loader = create_loader()
+    conn = loader.connect()
+    checkpoints = read_checkpoints(loader, conn.cursor(), "P1_SDTM", SOURCE)
+    conn.close()
+    assert checkpoints == {0: (10, 4)}
+
+    committed = converter.load_range_checkpointed(
+        "P1_SDTM", "lb", "lb.parquet", TYPE_MAP, SOURCE, 0, 10, checkpoints[0][1]
+    )
+
+    assert committed == 10
+    assert loaded_rows(sqlite_target) == list(range(10))
+
+
+def test_transient_error_retries_from_checkpoint(monkeypatch, sqlite_target):
+    transient = sqlite3.OperationalError("database is locked")
+    monkeypatch.setattr(converter, "iter_table_chunks", fake_chunks(fail_at_row=8, error=transient))
+
+    committed = converter.load_range_checkpointed("P1_SDTM", "lb", "lb.parquet", TYPE_MAP, SOURCE, 0, 10)
+
+    assert committed == 10
+    assert loaded_rows(sqlite_target) == list(range(10))
+
+
+def test_filtered_range_resumes_with_rows_read_and_counts_rows_inserted(monkeypatch, sqlite_target):
+    monkeypatch.setattr(converter, "iter_table_chunks", fake_chunks(fail_at_row=6))
+    profile = DatasetProfile(where=(("LBSEQ", ">=", 3),))
+
+    with pytest.raises(ValueError):
+        converter.load_range_checkpointed("P1_SDTM", "lb", "lb.parquet", TYPE_MAP, SOURCE, 0, 10, profile=profile)
+
+    assert loaded_rows(sqlite_target) == [3]
+    loader = create_loader()
+    conn = loader.connect()
+    checkpoints = read_checkpoints(loader, conn.cursor(), "P1_SDTM", SOURCE)
+    conn.close()
+    # The checkpoint is the read position, not the rows inserted
+    assert checkpoints == {0: (10, 4)}
+
+    inserted = converter.load_range_checkpointed(
+        "P1_SDTM", "lb", "lb.parquet", TYPE_MAP, SOURCE, 0, 10, checkpoints[0][1], profile=profile
+    )
+
+    assert inserted == 7
+    assert loaded_rows(sqlite_target) == list(range(3, 10))
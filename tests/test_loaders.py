@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.core.config import settings
+from app.services.loaders import PostgresCopyLoader, create_loader
+
+
+def test_sqlite_loader_round_trip(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "SQLITE_PATH", str(tmp_path / "import.db"))
+    df = pd.DataFrame({
+        "USUBJID": ["S1", "S2", None],
+        "AVAL": [1.5, np.nan, 3.0],
+        "ADTM": pd.to_datetime(["2024-01-01 08:30:00", None, "2024-03-01 00:00:00"]),
+    })
+    type_map = {"USUBJID": "NVARCHAR(20)", "AVAL": "FLOAT", "ADTM": "DATETIME2"}
+    loader = create_loader("sqlite")
+
+    conn = loader.connect()
+    try:
+        cursor = conn.cursor()
+        loader.ensure_table(cursor, "P1_SDTM", "lb", list(df.columns), type_map)
+        loader.begin(cursor, "P1_SDTM", "lb", list(df.columns), type_map)
+        assert loader.load_chunk(cursor, df.iloc[:2]) == 2
+        assert loader.load_chunk(cursor, df.iloc[2:]) == 1
+        conn.commit()
+        rows = cursor.execute('SELECT * FROM "P1_SDTM.lb"').fetchall()
+    finally:
+        loader.release(conn)
+
+    assert rows == [
+        ("S1", 1.5, "2024-01-01 08:30:00"),
+        ("S2", None, None),
+        (None, 3.0, "2024-03-01 00:00:00"),
+    ]
+    assert loader.rows == 3
+    assert loader.rows_per_second > 0
+
+
+def test_postgres_copy_translates_tsql_types():
+    loader = PostgresCopyLoader()
+
+    assert loader.column_type("NVARCHAR(40)") == "VARCHAR(40)"
+    assert loader.column_type("DATETIME2") == "TIMESTAMP"
+    assert loader.column_type("FLOAT") == "DOUBLE PRECISION"
+    assert loader.column_type("DECIMAL(8,2)") == "DECIMAL(8,2)"
+
+
+def test_create_loader_rejects_unknown_backend():
+    with pytest.raises(ValueError):
+        create_loader("bcp")
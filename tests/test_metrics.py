@@ -0,0 +1,70 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core import metrics
+from app.core.metrics import Counter, Gauge, Histogram, Registry
+from main import app
+
+
+def test_registry_renders_prometheus_text():
+    registry = Registry()
+    latency = registry.register(Histogram("decode_seconds", "Decode time", buckets=(0.1, 1)))
+    files = registry.register(Counter("files", "Files by outcome", ("outcome",)))
+    inflight = registry.register(Gauge("in_flight", "Files in flight"))
+    latency.observe(0.05)
+    latency.observe(0.5)
+    latency.observe(3)
+    files.inc(outcome="done")
+    files.inc(2, outcome='fa"il')
+    inflight.inc(3)
+    inflight.dec()
+
+    lines = registry.render().splitlines()
+
+    assert "# TYPE decode_seconds histogram" in lines
+    assert 'decode_seconds_bucket{le="0.1"} 1' in lines
+    assert 'decode_seconds_bucket{le="1"} 2' in lines
+    assert 'decode_seconds_bucket{le="+Inf"} 3' in lines
+    assert "decode_seconds_sum 3.55" in lines
+    assert "decode_seconds_count 3" in lines
+    assert 'files_total{outcome="done"} 1' in lines
+    assert 'files_total{outcome="fa\\"il"} 2' in lines
+    assert "in_flight 2" in lines
+    with pytest.raises(ValueError):
+        files.inc(stage="download")
+
+
+def test_worker_samples_are_forwarded(monkeypatch):
+    forwarded = []
+
+    class FakeQueue:
+        def put(self, sample):
+            forwarded.append(sample)
+
+    gauge = Gauge("pool", "Pool occupancy", ("state",))
+    monkeypatch.setattr(metrics, "_worker_queue", FakeQueue())
+    gauge.inc(state="in_use")
+
+    assert gauge.samples() == []
+    assert forwarded == [("pool", "inc", ("in_use",), 1)]
+
+
+def test_metrics_endpoint_reports_route_latency():
+    client = TestClient(app)
+    client.get("/api/projects/import-jobs/abc123")
+
+    body = client.get("/metrics").text
+
+    assert 'route="/api/projects/import-jobs/{job_id}"' in body
+    assert "abc123" not in body
+    assert "# TYPE import_files_in_flight gauge" in body
+
+
+def test_route_label_uses_template_when_param_matches_static_segment():
+    client = TestClient(app)
+    client.get("/api/projects/import-jobs/import-jobs")
+
+    body = client.get("/metrics").text
+
+    assert 'route="/api/projects/import-jobs/{job_id}"' in body
+    assert "{job_id}/{job_id}" not in body
@@ -0,0 +1,61 @@
+from datetime import date, datetime, time
+
+import numpy as np
+import pandas as pd
+
+from app.services.row_marshalling import marshal_rows
+from app.services.temporal import convert_temporal
+
+
+def test_marshal_rows_replaces_missing_values_with_none():
+    df = pd.DataFrame({
+        "USUBJID": ["S1", None, "S3"],
+        "AVAL": [1.5, np.nan, 3.0],
+        "ADTM": pd.to_datetime(["2024-01-01 08:30", None, "2024-03-01 00:00"]),
+    })
+
+    rows = marshal_rows(df)
+
+    assert rows == [
+        ("S1", 1.5, datetime(2024, 1, 1, 8, 30)),
+        (None, None, None),
+        ("S3", 3.0, datetime(2024, 3, 1)),
+    ]
+    assert type(rows[0][2]) is datetime
+
+
+def test_marshal_rows_keeps_block_offsets():
+    df = pd.DataFrame({"AVAL": np.arange(10, dtype="float64")})
+
+    rows = marshal_rows(df.iloc[5:8])
+
+    assert rows == [(5.0,), (6.0,), (7.0,)]
+
+
+def test_marshal_rows_turns_sas_dates_and_times_into_driver_objects():
+    df = pd.DataFrame({
+        "ADT": pd.Series(["2024-01-05", None], dtype="datetime64[s]"),
+        "ATM": pd.Series([pd.Timedelta(hours=8, minutes=30), pd.NaT], dtype="timedelta64[us]"),
+    })
+
+    rows = marshal_rows(df, {"ADT": "DATE", "ATM": "TIME"})
+
+    assert rows == [(date(2024, 1, 5), time(8, 30)), (None, None)]
+    assert type(rows[0][0]) is date
+
+
+def test_marshal_rows_turns_dates_outside_years_1_to_9999_into_none():
+    df = convert_temporal(pd.DataFrame({
+        "ADT": [-715509.0, 2936549.0, -800000.0, 2936550.0],
+        "ADTM": [-715509.0 * 86400, 2936550.0 * 86400 - 0.5, -800000.0 * 86400, 2936550.0 * 86400 - 1e-7],
+        "DTDT": [-715509.0 * 86400, 2936549.0 * 86400, -715509.0 * 86400 - 1, 2936550.0 * 86400],
+    }), {"ADT": "date", "ADTM": "datetime", "DTDT": "dtdate"})
+
+    rows = marshal_rows(df, {"ADT": "DATE", "ADTM": "DATETIME2", "DTDT": "DATE"})
+
+    assert rows == [
+        (date(1, 1, 1), datetime(1, 1, 1), date(1, 1, 1)),
+        (date(9999, 12, 31), datetime(9999, 12, 31, 23, 59, 59, 500000), date(9999, 12, 31)),
+        (None, None, None),
+        (None, None, None),
+    ]
@@ -0,0 +1,77 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from app.core.config import settings
+from app.services import sidecar_cache
+
+KINDS = {"USUBJID": "string", "AVAL": "number", "ADT": "date", "ATM": "time"}
+TYPES = {"USUBJID": "VARCHAR(6)", "AVAL": "FLOAT", "ADT": "DATE", "ATM": "TIME"}
+
+
+def make_chunks(rows, chunk_size):
+    for start in range(0, rows, chunk_size):
+        index = range(start, min(rows, start + chunk_size))
+        yield pd.DataFrame({
+            "USUBJID": [f"P1-{i:03d}" for i in index],
+            "AVAL": [float(i) if i % 5 else np.nan for i in index],
+            "ADT": pd.Series([date(2024, 1, 1 + i % 28) for i in index], dtype="datetime64[s]"),
+            "ATM": pd.Series([pd.Timedelta(minutes=i) if i % 7 else pd.NaT for i in index], dtype="timedelta64[us]"),
+        })
+
+
+@pytest.fixture
+def sidecar_dir(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "SAS_SIDECAR_CACHE", True)
+    monkeypatch.setattr(settings, "SAS_SIDECAR_DIR", str(tmp_path))
+    return tmp_path
+
+
+def test_sidecar_round_trip_keeps_layout_and_row_ranges(sidecar_dir):
+    source = {"blob_name": "application/P1/ADAM/adlb.sas7bdat", "etag": '"0x1"'}
+    path = sidecar_cache.sidecar_path(source)
+
+    rows = sidecar_cache.write_sidecar(path, list(KINDS), KINDS, make_chunks(25, 10), lambda: TYPES)
+
+    assert rows == 25
+    assert sidecar_cache.has_sidecar(source)
+    assert sidecar_cache.read_sidecar_layout(path) == (list(KINDS), TYPES, 25)
+    chunks = list(sidecar_cache.iter_sidecar_chunks(path, 4, row_offset=8, row_limit=9))
+    combined = pd.concat(chunks, ignore_index=True)
+    assert max(len(chunk) for chunk in chunks) <= 4
+    assert combined["USUBJID"].tolist() == [f"P1-{i:03d}" for i in range(8, 17)]
+    assert combined["AVAL"].isna().tolist() == [i % 5 == 0 for i in range(8, 17)]
+    assert combined["ADT"].iloc[0] == pd.Timestamp(2024, 1, 9)
+    assert isinstance(chunks[0]["USUBJID"].dtype, pd.CategoricalDtype)
+    assert combined["ATM"].dtype == "timedelta64[us]"
+    assert combined["ATM"].iloc[0] == pd.Timedelta(minutes=8)
+    assert combined["ATM"].isna().tolist() == [i % 7 == 0 for i in range(8, 17)]
+
+
+def test_new_blob_version_replaces_old_sidecar(sidecar_dir):
+    old = {"blob_name": "application/P1/SDTM/dm.sas7bdat", "etag": '"0x1"'}
+    new = dict(old, etag='"0x2"')
+    sidecar_cache.write_sidecar(sidecar_cache.sidecar_path(old), list(KINDS), KINDS, make_chunks(3, 10), lambda: TYPES)
+
+    sidecar_cache.write_sidecar(sidecar_cache.sidecar_path(new), list(KINDS), KINDS, make_chunks(3, 10), lambda: TYPES)
+
+    assert not sidecar_cache.has_sidecar(old)
+    assert sidecar_cache.has_sidecar(new)
+    assert [p.name for p in sidecar_dir.iterdir()] == [sidecar_cache.sidecar_path(new).rsplit("/", 1)[1]]
+
+
+def test_failed_write_leaves_no_sidecar(sidecar_dir):
+    source = {"blob_name": "application/P1/SDTM/ae.sas7bdat", "etag": '"0x1"'}
+
+    def failing_chunks():
+        yield from make_chunks(3, 10)
+        raise IOError("decode failed")
+
+    with pytest.raises(IOError):
+        sidecar_cache.write_sidecar(sidecar_cache.sidecar_path(source), list(KINDS), KINDS, failing_chunks(), lambda: TYPES)
+
+    assert list(sidecar_dir.iterdir()) == []
@@ -0,0 +1,189 @@
+import asyncio
+import hashlib
+import io
+import os
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.config import settings
+from app.services import project_service
+from app.utils import azure_blob
+from app.utils.azure_blob import BlobBlockWriter
+from tests.fakes import FakeBlobClient, FakeBlobServiceClient, FakeContainerClient, b64md5
+
+
+def test_block_writer_stages_full_blocks_and_commits_md5(container):
+    payload = os.urandom(10 * 1024 + 7)
+    writer = BlobBlockWriter(container.get_blob_client("raw/P1/adsl.sas7bdat"), block_size=4096, concurrency=1)
+
+    for i in range(0, len(payload), 1000):
+        writer.write(payload[i:i + 1000])
+        assert len(writer._buffer) < 4096
+    assert container.staged_blocks("raw/P1/adsl.sas7bdat") == 2
+
+    assert writer.close() == b64md5(payload)
+    assert container.read("raw/P1/adsl.sas7bdat")[0] == payload
+    properties = container.properties("raw/P1/adsl.sas7bdat")
+    assert bytes(properties.content_settings.content_md5) == hashlib.md5(payload).digest()
+    assert writer.size == len(payload)
+
+
+def test_upload_project_files_streams_without_temp_copy(monkeypatch, container):
+    monkeypatch.setattr(tempfile, "mkdtemp", lambda *a, **k: pytest.fail("upload must not touch local disk"))
+    payload = os.urandom(9 * 1024 * 1024)
+    uploads = [
+        SimpleNamespace(filename="ad sl.sas7bdat", file=io.BytesIO(payload)),
+        SimpleNamespace(filename="notes.txt", file=io.BytesIO(b"skip")),
+    ]
+
+    results = project_service.upload_project_files("P1", uploads)
+
+    assert [(result.blob_path, result.ok) for result in results] == [("raw/P1/ad_sl.sas7bdat", True)]
+    assert container.read("raw/P1/ad_sl.sas7bdat")[0] == payload
+    assert [blob.name for blob in container.list_blobs("raw/")] == ["raw/P1/ad_sl.sas7bdat"]
+
+
+def test_stream_uploaded_file_from_async_chunks(container):
+    parts = [os.urandom(64 * 1024) for _ in range(80)]
+
+    async def body():
+        for part in parts:
+            yield part
+
+    result = asyncio.run(project_service.stream_uploaded_file("P1", "lb.xlsx", body()))
+
+    payload = b"".join(parts)
+    assert result == {"blob_path": "raw/P1/lb.xlsx", "size_bytes": len(payload), "content_md5": b64md5(payload), "deduplicated": False, "extracted": []}
+    assert container.read("raw/P1/lb.xlsx")[0] == payload
+    with pytest.raises(ValueError):
+        asyncio.run(project_service.stream_uploaded_file("P1", "run.exe", body()))
+
+
+def test_block_writer_stages_blocks_concurrently(container):
+    blob_client = container.get_blob_client("raw/P1/adae.sas7bdat")
+    stage_block = blob_client.stage_block
+    active, peak, lock = [0], [0], threading.Lock()
+
+    def slow_stage(block_id, data, **kwargs):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.02)
+        stage_block(block_id, data)
+        with lock:
+            active[0] -= 1
+
+    blob_client.stage_block = slow_stage
+    payload = os.urandom(16 * 1024)
+    writer = BlobBlockWriter(blob_client, block_size=1024, concurrency=4)
+    writer.write(payload)
+
+    assert writer.close() == b64md5(payload)
+    assert container.read("raw/P1/adae.sas7bdat")[0] == payload
+    assert 1 < peak[0] <= 4
+
+
+def test_retry_only_stages_blocks_the_failed_attempt_missed(monkeypatch, container):
+    monkeypatch.setattr(settings, "BLOB_UPLOAD_BLOCK_SIZE_MB", 1)
+    monkeypatch.setattr(settings, "BLOB_UPLOAD_CONCURRENCY", 1)
+    monkeypatch.setattr(settings, "BLOB_UPLOAD_ATTEMPTS", 2)
+    staged = []
+    stage = FakeBlobClient.stage_block
+
+    def flaky_stage(self, block_id, data, **kwargs):
+        if len(staged) == 3:
+            staged.append(None)
+            raise ConnectionError("connection reset")
+        staged.append(block_id)
+        stage(self, block_id, data)
+
+    monkeypatch.setattr(FakeBlobClient, "stage_block", flaky_stage)
+    payload = os.urandom(6 * 1024 * 1024)
+
+    assert azure_blob.upload_stream_to_azure_blob("raw/P1/adlb.sas7bdat", io.BytesIO(payload)) == b64md5(payload)
+    assert container.read("raw/P1/adlb.sas7bdat")[0] == payload
+    assert len(staged) == 7  # 3 staged, 1 failed, then only the 3 missing ones
+    assert [block_id[:6] for block_id in staged if block_id] == ["000000", "000001", "000002", "000003", "000004", "000005"]
+
+
+def test_service_client_and_container_check_are_shared(monkeypatch):
+    monkeypatch.setattr(azure_blob, "_service_clients", {})
+    monkeypatch.setattr(azure_blob, "_known_containers", set())
+    container = FakeContainerClient()
+    exists_calls = []
+    monkeypatch.setattr(container, "exists", lambda: exists_calls.append(1) or True)
+    created = []
+    monkeypatch.setattr(
+        azure_blob.BlobServiceClient, "from_connection_string",
+        lambda *args, **kwargs: created.append(args) or FakeBlobServiceClient(container),
+    )
+
+    for name in ("a.sas7bdat", "b.sas7bdat", "c.sas7bdat"):
+        assert azure_blob.upload_stream_to_azure_blob(f"raw/P1/{name}", io.BytesIO(b"data"))
+
+    assert len(created) == 1
+    assert len(exists_calls) == 1
+
+
+class BrokenStream(io.BytesIO):
+    def read(self, size=-1):
+        raise OSError("client disconnected")
+
+
+def test_files_upload_concurrently_with_per_file_results(monkeypatch, container):
+    monkeypatch.setattr(settings, "BLOB_UPLOAD_FILE_CONCURRENCY", 4)
+    active, peak, lock = [0], [0], threading.Lock()
+    stage = FakeBlobClient.stage_block
+
+    def slow_stage(self, block_id, data, **kwargs):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.02)
+        stage(self, block_id, data)
+        with lock:
+            active[0] -= 1
+
+    monkeypatch.setattr(FakeBlobClient, "stage_block", slow_stage)
+    payloads = {f"raw/P1/f{i}.sas7bdat": os.urandom(1000 + i) for i in range(8)}
+    uploads = [(path, io.BytesIO(data)) for path, data in payloads.items()]
+    uploads.insert(3, ("raw/P1/broken.sas7bdat", BrokenStream()))
+
+    results = azure_blob.upload_streams_in_parallel(uploads)
+
+    assert [result.blob_path for result in results] == [path for path, _ in uploads]
+    assert peak[0] > 1
+    broken = results.pop(3)
+    assert not broken.ok and "client disconnected" in broken.error
+    for result in results:
+        assert result.ok and result.size_bytes == len(payloads[result.blob_path])
+        assert result.content_md5 == b64md5(payloads[result.blob_path]) and result.duration_seconds > 0
+        assert container.read(result.blob_path)[0] == payloads[result.blob_path]
+
+
+def test_upload_files_in_parallel_counts_each_file_once(tmp_path, container):
+    files = []
+    for i in range(5):
+        path = tmp_path / f"ae{i}.sas7bdat"
+        path.write_bytes(os.urandom(100))
+        files.append((f"raw/P1/ae{i}.sas7bdat", str(path)))
+    files.append(("raw/P1/missing.sas7bdat", str(tmp_path / "missing.sas7bdat")))
+
+    assert azure_blob.upload_files_in_parallel(files) == (5, 1)
+
+
+def test_bandwidth_limiter_is_shared_across_threads():
+    limiter = azure_blob.BandwidthLimiter(bytes_per_second=200_000)
+    start = time.monotonic()
+    threads = [threading.Thread(target=limiter.acquire, args=(20_000,)) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Six 20 KB slots at 200 KB/s: the last one starts 0.5 s in
+    assert time.monotonic() - start >= 0.45
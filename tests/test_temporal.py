@@ -0,0 +1,50 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+from app.services.temporal import convert_temporal, format_family, temporal_class, temporal_columns
+
+
+def test_format_family_strips_width_and_decimals():
+    assert format_family("DATE9.") == "DATE"
+    assert format_family("datetime20.3") == "DATETIME"
+    assert format_family("E8601DT19.") == "E8601DT"
+    assert format_family("YYMMDD10") == "YYMMDD"
+    assert format_family("") is None
+    assert temporal_class("DTDATE9.") == "dtdate"
+    assert temporal_class("TIME8.") == "time"
+    assert temporal_class("BEST12.") is None
+
+
+def test_temporal_columns_skips_strings_and_plain_numbers():
+    meta = SimpleNamespace(
+        column_names=["ADT", "ADTM", "ATM", "AVAL", "AVALC"],
+        original_variable_types={"ADT": "DATE9", "ADTM": "DATETIME20", "ATM": "TIME8", "AVAL": "BEST12", "AVALC": "$DATE9"},
+        readstat_variable_types={"ADT": "double", "ADTM": "double", "ATM": "double", "AVAL": "double", "AVALC": "string"},
+    )
+
+    assert temporal_columns(meta) == {"ADT": "date", "ADTM": "datetime", "ATM": "time"}
+
+
+def test_convert_temporal_uses_the_sas_epoch_and_missing_values():
+    df = pd.DataFrame({
+        "ADT": [0.0, 23011.0, np.nan, 1e12],
+        "ADTM": [0.0, 1988193600.25, np.nan, np.inf],
+        "DTDT": [86399.0, 1988193600.0, np.nan, -np.inf],
+        "ATM": [0.0, 30600.5, np.nan, 86400.0 + 60],
+        "AVAL": [1.0, 2.0, 3.0, 4.0],
+    })
+
+    converted = convert_temporal(df, {"ADT": "date", "ADTM": "datetime", "DTDT": "dtdate", "ATM": "time"})
+
+    assert converted["ADT"].tolist()[:2] == [pd.Timestamp(1960, 1, 1), pd.Timestamp(2023, 1, 1)]
+    assert converted["ADTM"].tolist()[:2] == [pd.Timestamp(1960, 1, 1), pd.Timestamp("2023-01-01 12:00:00.250")]
+    assert converted["DTDT"].tolist()[:2] == [pd.Timestamp(1960, 1, 1), pd.Timestamp(2023, 1, 1)]
+    assert converted["ATM"].tolist() == [
+        pd.Timedelta(0), pd.Timedelta(hours=8, minutes=30, milliseconds=500), pd.NaT, pd.Timedelta(minutes=1),
+    ]
+    assert converted[["ADT", "ADTM", "DTDT"]].iloc[2:].isna().all().all()
+    assert converted["ADT"].dtype == "datetime64[s]" and converted["ATM"].dtype == "timedelta64[us]"
+    assert df["ADT"].dtype == "float64"
+    assert converted["AVAL"].tolist() == [1.0, 2.0, 3.0, 4.0]
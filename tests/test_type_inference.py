@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+
+from app.services.loaders import ExecuteManyLoader
+from app.services.type_inference import cast_integer_columns, infer_sql_types, profile_columns
+
+
+def test_infer_sql_types_picks_narrowest_type_over_all_blocks():
+    kinds = {
+        "USUBJID": "string", "AETERM": "string", "AESEQ": "number", "AVAL": "number",
+        "COUNT": "number", "EMPTY": "number", "ADT": "date", "ADTM": "datetime", "ATM": "time",
+    }
+    blocks = [
+        pd.DataFrame({"USUBJID": ["P1-001", "P1-002"], "AETERM": ["HEADACHE", None],
+                      "AESEQ": [1.0, np.nan], "AVAL": [1.0, 2.0], "COUNT": [1.0, 40000.0],
+                      "EMPTY": [np.nan, np.nan]}),
+        pd.DataFrame({"USUBJID": ["P1-0003", ""], "AETERM": ["CÉPHALÉE", "NAUSEA"],
+                      "AESEQ": [2.0, 3.0], "AVAL": [2.5, np.inf], "COUNT": [-3.0, 5.0],
+                      "EMPTY": [np.nan, np.nan]}),
+    ]
+
+    types = infer_sql_types(profile_columns(kinds, {"USUBJID": 200, "AETERM": 200}), blocks)
+
+    assert types == {
+        "USUBJID": "VARCHAR(7)", "AETERM": "NVARCHAR(8)", "AESEQ": "SMALLINT", "AVAL": "FLOAT",
+        "COUNT": "INT", "EMPTY": "FLOAT", "ADT": "DATE", "ADTM": "DATETIME2", "ATM": "TIME",
+    }
+
+
+def test_metadata_types_follow_the_storage_width():
+    profiles = profile_columns({"USUBJID": "string", "COMMENT": "string", "AVAL": "number"},
+                               {"USUBJID": 20, "COMMENT": 32767, "AVAL": 8})
+
+    types = {col: profile.metadata_type() for col, profile in profiles.items()}
+
+    assert types == {"USUBJID": "NVARCHAR(20)", "COMMENT": "NVARCHAR(MAX)", "AVAL": "FLOAT"}
+
+
+def test_cast_integer_columns_keeps_nulls():
+    chunk = pd.DataFrame({"AESEQ": [1.0, np.nan], "AVAL": [1.5, 2.0]})
+
+    cast = cast_integer_columns(chunk, {"AESEQ": "SMALLINT", "AVAL": "FLOAT"}, ["AESEQ", "AVAL"])
+
+    assert list(cast["AESEQ"].to_numpy(dtype=object, na_value=None)) == [1, None]
+    assert cast["AVAL"].dtype == np.float64
+
+
+def test_executemany_input_sizes_follow_declared_types():
+    assert ExecuteManyLoader.input_size("VARCHAR(12)")[1:] == (12, 0)
+    assert ExecuteManyLoader.input_size("NVARCHAR(MAX)")[1:] == (0, 0)
+    assert ExecuteManyLoader.input_size("FLOAT") != ExecuteManyLoader.input_size("INT")
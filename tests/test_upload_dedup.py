@@ -0,0 +1,133 @@
+import io
+import os
+import zipfile
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.routers import projects
+from app.core.config import settings
+from app.db.session import get_db
+from app.services.project_service import upload_project_files, upload_report
+from app.utils import azure_blob
+from main import app
+from tests.fakes import FakeBlobClient, b64md5
+
+
+class ForwardOnly:
+    """A request-body-like stream: read() only, no seek"""
+
+    def __init__(self, data: bytes):
+        self._stream = io.BytesIO(data)
+
+    def read(self, size=-1):
+        return self._stream.read(size)
+
+
+@pytest.fixture(autouse=True)
+def deduplicate(monkeypatch):
+    monkeypatch.setattr(settings, "BLOB_UPLOAD_DEDUPLICATE", True)
+
+
+def test_identical_seekable_upload_is_not_sent(monkeypatch, container):
+    payload = os.urandom(100_000)
+    assert azure_blob.upload_stream("raw/P1/adsl.sas7bdat", io.BytesIO(payload)).ok
+    etag = container.properties("raw/P1/adsl.sas7bdat").etag
+    monkeypatch.setattr(FakeBlobClient, "stage_block", lambda *a, **k: pytest.fail("identical content was sent"))
+
+    result = azure_blob.upload_stream("raw/P1/adsl.sas7bdat", io.BytesIO(payload))
+
+    assert result.ok and result.deduplicated
+    assert (result.size_bytes, result.content_md5) == (len(payload), b64md5(payload))
+    assert container.properties("raw/P1/adsl.sas7bdat").etag == etag
+
+
+def test_identical_forward_only_upload_is_not_committed(container):
+    payload = os.urandom(100_000)
+    azure_blob.upload_stream("raw/P1/adsl.sas7bdat", ForwardOnly(payload))
+    etag = container.properties("raw/P1/adsl.sas7bdat").etag
+
+    assert azure_blob.upload_stream("raw/P1/adsl.sas7bdat", ForwardOnly(payload)).deduplicated
+    assert container.properties("raw/P1/adsl.sas7bdat").etag == etag
+
+    changed = azure_blob.upload_stream("raw/P1/adsl.sas7bdat", ForwardOnly(payload[::-1]))
+    assert changed.ok and not changed.deduplicated
+    assert container.read("raw/P1/adsl.sas7bdat")[0] == payload[::-1]
+
+
+def test_reuploaded_zip_reports_deduplicated_files(container):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zf:
+        zf.writestr("adsl.sas7bdat", os.urandom(5000))
+        zf.writestr("dm.sas7bdat", os.urandom(5000))
+    files = lambda: [SimpleNamespace(filename="study.zip", file=io.BytesIO(buffer.getvalue())),
+                     SimpleNamespace(filename="ae.sas7bdat", file=io.BytesIO(b"ae" * 100))]
+
+    first = upload_report(upload_project_files("P1", files()))
+    second = upload_report(upload_project_files("P1", files()))
+
+    paths = ["raw/P1/study.zip", "raw/P1/ae.sas7bdat", "application/P1/ADAM/adsl.sas7bdat", "application/P1/SDTM/dm.sas7bdat"]
+    assert sorted(first["uploaded_files"]) == sorted(paths) and first["deduplicated_files"] == []
+    assert second["uploaded_files"] == [] and sorted(second["deduplicated_files"]) == sorted(paths)
+
+
+def test_reextracted_zip_replaces_a_same_size_dataset_with_other_content(container):
+    def zip_of(members):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w") as zf:
+            for name, data in members.items():
+                zf.writestr(name, data)
+        return buffer.getvalue()
+
+    # sas7bdat files are page-aligned, so different datasets often share a size
+    old_dm, new_dm = os.urandom(4096), os.urandom(4096)
+    study1 = zip_of({"dm.sas7bdat": old_dm, "ae.sas7bdat": b"ae" * 100})
+    study2 = zip_of({"dm.sas7bdat": new_dm})
+    upload = lambda name, payload: upload_report(
+        upload_project_files("P1", [SimpleNamespace(filename=name, file=io.BytesIO(payload))])
+    )
+    upload("study1.zip", study1)
+    upload("study2.zip", study2)
+    assert container.read("application/P1/SDTM/dm.sas7bdat")[0] == new_dm
+
+    again = upload("study1.zip", study1)
+
+    # study1.zip itself is unchanged, yet its dm member must replace study2's
+    assert container.read("application/P1/SDTM/dm.sas7bdat")[0] == old_dm
+    assert again["uploaded_files"] == ["application/P1/SDTM/dm.sas7bdat"]
+    assert sorted(again["deduplicated_files"]) == ["application/P1/SDTM/ae.sas7bdat", "raw/P1/study1.zip"]
+
+
+def test_endpoints_skip_files_storage_already_holds(monkeypatch, container):
+    project = SimpleNamespace(IsDatasetUploaded=False)
+    monkeypatch.setattr(projects, "get_project", lambda db, number: project)
+    app.dependency_overrides[get_db] = lambda: SimpleNamespace(commit=lambda: None)
+    client = TestClient(app)
+    payload = os.urandom(50_000)
+    try:
+        first = client.put("/api/projects/upload/P1/lb.sas7bdat", content=payload).json()
+        etag = container.properties("raw/P1/lb.sas7bdat").etag
+        # A Content-MD5 header is a claim to check, never a reason to skip the body
+        forged = client.put("/api/projects/upload/P1/lb.sas7bdat", content=b"",
+                            headers={"Content-MD5": b64md5(payload)})
+        again = client.put("/api/projects/upload/P1/lb.sas7bdat", content=payload,
+                           headers={"Content-MD5": b64md5(payload)}).json()
+        upload = client.post("/api/projects/uploads", json={
+            "ProjectNumber": "P1", "filename": "lb.sas7bdat", "size_bytes": len(payload), "content_md5": b64md5(payload),
+        }).json()
+        client.put(f"/api/projects/uploads/{upload['upload_id']}/chunks/0", content=payload)
+        completed = client.post(f"/api/projects/uploads/{upload['upload_id']}/complete").json()
+        chunk = client.put(f"/api/projects/uploads/{upload['upload_id']}/chunks/0", content=payload)
+    finally:
+        del app.dependency_overrides[get_db]
+
+    assert first["deduplicated"] is False
+    assert forged.status_code == 400
+    assert again["deduplicated"] is True and again["size_bytes"] == len(payload)
+    assert container.read("raw/P1/lb.sas7bdat")[0] == payload
+    # The announced MD5 is not trusted: the chunks are sent, hashed, and then not committed
+    assert upload["state"] == "uploading"
+    assert completed["state"] == "deduplicated" and completed["content_md5"] == b64md5(payload)
+    assert container.properties("raw/P1/lb.sas7bdat").etag == etag
+    assert chunk.status_code == 409
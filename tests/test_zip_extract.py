@@ -0,0 +1,69 @@
+import io
+import os
+import zipfile
+
+from app.core.config import settings
+from app.services import project_service
+from app.services.project_service import classify_sas_file, extract_uploaded_zip, extract_zip_to_blob
+
+
+def make_zip(members: dict) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for name, data in members.items():
+            zf.writestr(name, data)
+    return buffer.getvalue()
+
+
+MEMBERS = {
+    "study/adam/ADSL.sas7bdat": os.urandom(300_000),
+    "study/adam/adlb2.sas7bdat": b"adlb" * 50_000,
+    "study/sdtm/dm.sas7bdat": os.urandom(1000),
+    "study/sdtm/suppdm.sas7bdat": b"supp" * 100,
+    "study/define.xml": b"<xml/>",
+    "study/sdtm/": b"",
+}
+
+
+def test_classify_sas_file():
+    assert [classify_sas_file(name) for name in ("adsl.sas7bdat", "ADAE1.sas7bdat", "suppae.sas7bdat", "lb.sas7bdat")] == [
+        "ADAM", "ADAM", "SDTM", "SDTM",
+    ]
+    assert classify_sas_file("readme.sas7bdat") is None
+    assert classify_sas_file("dm.xpt") is None
+
+
+def test_zip_members_stream_into_domain_folders(monkeypatch, container):
+    monkeypatch.setattr(settings, "BLOB_UPLOAD_BLOCK_SIZE_MB", 1)
+    archive = io.BytesIO(make_zip(MEMBERS))
+
+    results = extract_zip_to_blob("P1", archive)
+
+    assert sorted(result.blob_path for result in results if result.ok) == [
+        "application/P1/ADAM/ADSL.sas7bdat",
+        "application/P1/ADAM/adlb2.sas7bdat",
+        "application/P1/SDTM/dm.sas7bdat",
+        "application/P1/SDTM/suppdm.sas7bdat",
+    ]
+    assert container.read("application/P1/ADAM/ADSL.sas7bdat")[0] == MEMBERS["study/adam/ADSL.sas7bdat"]
+    assert container.read("application/P1/SDTM/suppdm.sas7bdat")[0] == MEMBERS["study/sdtm/suppdm.sas7bdat"]
+
+
+def test_zip_in_blob_storage_is_read_with_ranged_downloads(container):
+    container.put("raw/P1/study.zip", make_zip(MEMBERS))
+
+    extracted = extract_uploaded_zip("P1", "raw/P1/study.zip")
+
+    assert len(extracted) == 4
+    assert container.read("application/P1/ADAM/adlb2.sas7bdat")[0] == MEMBERS["study/adam/adlb2.sas7bdat"]
+    container.put("raw/P1/broken.zip", b"not a zip")
+    assert extract_uploaded_zip("P1", "raw/P1/broken.zip") == []
+
+
+def test_uploaded_zip_is_extracted(container):
+    payload = make_zip(MEMBERS)
+    uploads = [type("Upload", (), {"filename": "study.zip", "file": io.BytesIO(payload)})()]
+
+    assert all(result.ok for result in project_service.upload_project_files("P1", uploads))
+    assert container.read("raw/P1/study.zip")[0] == payload
+    assert len(container.list_blobs("application/P1/")) == 4